@@ -21,7 +21,7 @@ def analyze_slots(owner_id: int) -> list:
     with get_private_session(owner_id) as db:
         for char_id in iter_characters(owner_id):
             jobs = db.query(IndustryJob).filter_by(character_id=char_id).all()
-            queues = get_industry_queues(owner_id, char_id)  # <-- Small fix: queues only need char_id
+            queues = get_industry_queues(owner_id, char_id, db)
 
             def to_utc_aware(dt):
                 return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
@@ -0,0 +1,175 @@
+# analysis/profit.py
+
+import logging
+from collections import deque, defaultdict
+from datetime import datetime
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db.database import get_private_session
+from db.models import MarketTransaction, FifoLot, FifoProgress, RealizedPnl
+
+logger = logging.getLogger(__name__)
+
+# ──────── FIFO Matching ───────────────────────────────────────────────────────
+
+def _day(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+def _match(transactions, lots: dict, pnl: dict):
+    """
+    Run transactions (ordered by ID) through per-type FIFO queues. `lots` maps type_id to a deque of
+    open buy lots [transaction_id, date, quantity, unit_price]; `pnl` accumulates per (type_id, day)
+    [quantity, revenue, cost, unmatched_quantity].
+    """
+    for tx_id, date, type_id, quantity, unit_price, is_buy in transactions:
+        queue = lots[type_id]
+        if is_buy:
+            queue.append([tx_id, date, quantity, unit_price])
+            continue
+
+        totals = pnl[(type_id, _day(date))]
+        remaining = quantity
+        while remaining and queue:
+            lot = queue[0]
+            taken = min(remaining, lot[2])
+            totals[0] += taken
+            totals[1] += taken * unit_price
+            totals[2] += taken * lot[3]
+            lot[2] -= taken
+            remaining -= taken
+            if not lot[2]:
+                queue.popleft()
+        totals[3] += remaining      # sold with no buy on record (e.g. before history starts)
+
+def _update_character(db, character_id: int, rebuild: bool) -> int:
+    progress = db.get(FifoProgress, character_id)
+    if rebuild:
+        db.execute(delete(FifoLot).where(FifoLot.character_id == character_id))
+        db.execute(delete(RealizedPnl).where(RealizedPnl.character_id == character_id))
+        since = None
+    else:
+        since = progress.last_transaction_id if progress else None
+
+    query = select(
+        MarketTransaction.transaction_id, MarketTransaction.date, MarketTransaction.type_id,
+        MarketTransaction.quantity, MarketTransaction.unit_price, MarketTransaction.is_buy,
+    ).where(MarketTransaction.character_id == character_id).order_by(MarketTransaction.transaction_id)
+    if since is not None:
+        query = query.where(MarketTransaction.transaction_id > since)
+    transactions = db.execute(query).all()
+    if not transactions:
+        return 0
+
+    # Only the open lots of types that traded since the last run are loaded and rewritten.
+    type_ids = {t[2] for t in transactions}
+    lots = defaultdict(deque)
+    if not rebuild:
+        for lot in db.execute(
+            select(FifoLot.type_id, FifoLot.transaction_id, FifoLot.date, FifoLot.quantity, FifoLot.unit_price)
+            .where(FifoLot.character_id == character_id, FifoLot.type_id.in_(type_ids))
+            .order_by(FifoLot.type_id, FifoLot.transaction_id)
+        ):
+            lots[lot[0]].append([lot[1], lot[2], lot[3], lot[4]])
+
+    pnl = defaultdict(lambda: [0, 0.0, 0.0, 0])
+    _match(transactions, lots, pnl)
+
+    db.execute(delete(FifoLot).where(FifoLot.character_id == character_id, FifoLot.type_id.in_(type_ids)))
+    lot_rows = [
+        {"character_id": character_id, "type_id": type_id, "transaction_id": tx_id,
+         "date": date, "quantity": quantity, "unit_price": unit_price}
+        for type_id, queue in lots.items() for tx_id, date, quantity, unit_price in queue
+    ]
+    if lot_rows:
+        db.execute(sqlite_insert(FifoLot), lot_rows)
+
+    if pnl:
+        insert = sqlite_insert(RealizedPnl)
+        db.execute(insert.on_conflict_do_update(
+            index_elements=["character_id", "type_id", "day"],
+            set_={
+                "quantity": RealizedPnl.quantity + insert.excluded.quantity,
+                "revenue": RealizedPnl.revenue + insert.excluded.revenue,
+                "cost": RealizedPnl.cost + insert.excluded.cost,
+                "profit": RealizedPnl.profit + insert.excluded.profit,
+                "unmatched_quantity": RealizedPnl.unmatched_quantity + insert.excluded.unmatched_quantity,
+            },
+        ), [
+            {"character_id": character_id, "type_id": type_id, "day": day, "quantity": q,
+             "revenue": revenue, "cost": cost, "profit": revenue - cost, "unmatched_quantity": unmatched}
+            for (type_id, day), (q, revenue, cost, unmatched) in pnl.items()
+        ])
+
+    if progress is None:
+        progress = FifoProgress(character_id=character_id)
+        db.add(progress)
+    progress.last_transaction_id = transactions[-1][0]
+    progress.updated_at = datetime.utcnow()
+    return len(transactions)
+
+def update_fifo(owner_id: int, character_id: int = None, rebuild: bool = False) -> int:
+    """
+    Match transactions stored since the last run into FIFO lots and add their realized P&L.
+    Each character is updated in one transaction; rebuild=True recomputes from full history.
+    Returns the number of transactions processed.
+    """
+    with get_private_session(owner_id) as db:
+        if character_id is None:
+            character_ids = [c for (c,) in db.execute(select(MarketTransaction.character_id).distinct())]
+        else:
+            character_ids = [character_id]
+
+        processed = 0
+        for char_id in character_ids:
+            count = _update_character(db, char_id, rebuild)
+            db.commit()
+            if count:
+                logger.info(f"[Profit] Matched {count} transactions for {char_id}")
+            processed += count
+        return processed
+
+# ──────── Queries ─────────────────────────────────────────────────────────────
+
+def realized_pnl(owner_id: int, character_id: int = None, type_id: int = None,
+                 start: datetime = None, end: datetime = None) -> list:
+    """Return realized P&L rows per (character, type, day), optionally filtered, oldest day first."""
+    query = select(RealizedPnl)
+    if character_id is not None:
+        query = query.where(RealizedPnl.character_id == character_id)
+    if type_id is not None:
+        query = query.where(RealizedPnl.type_id == type_id)
+    if start is not None:
+        query = query.where(RealizedPnl.day >= _day(start))
+    if end is not None:
+        query = query.where(RealizedPnl.day <= _day(end))
+
+    with get_private_session(owner_id) as db:
+        return [
+            {
+                "character_id": r.character_id,
+                "type_id": r.type_id,
+                "day": r.day.date().isoformat(),
+                "quantity": r.quantity,
+                "revenue": r.revenue,
+                "cost": r.cost,
+                "profit": r.profit,
+                "unmatched_quantity": r.unmatched_quantity,
+            }
+            for r in db.scalars(query.order_by(RealizedPnl.day, RealizedPnl.character_id, RealizedPnl.type_id))
+        ]
+
+def open_lots(owner_id: int, character_id: int = None, type_id: int = None) -> list:
+    """Return unmatched buy lots (inventory still carrying a cost basis), oldest first."""
+    query = select(FifoLot)
+    if character_id is not None:
+        query = query.where(FifoLot.character_id == character_id)
+    if type_id is not None:
+        query = query.where(FifoLot.type_id == type_id)
+
+    with get_private_session(owner_id) as db:
+        return [
+            {"character_id": l.character_id, "type_id": l.type_id, "transaction_id": l.transaction_id,
+             "quantity": l.quantity, "unit_price": l.unit_price}
+            for l in db.scalars(query.order_by(FifoLot.transaction_id))
+        ]
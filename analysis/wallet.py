@@ -0,0 +1,66 @@
+# analysis/wallet.py
+
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func
+
+from db.database import get_private_session
+from db.models import WalletDaily
+
+logger = logging.getLogger(__name__)
+
+# group_by name -> wallet_daily columns the rows are grouped on
+GROUPINGS = {
+    "ref_type": ("ref_type",),
+    "day": ("day",),
+    "character": ("character_id",),
+    "day_ref_type": ("day", "ref_type"),
+    "character_ref_type": ("character_id", "ref_type"),
+}
+
+# ──────── Queries ─────────────────────────────────────────────────────────────
+
+def _as_day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+def wallet_summary(owner_id: int, start=None, end=None, days: int = None, character_ids: list = None,
+                   ref_types: list = None, group_by: str = "ref_type") -> list:
+    """
+    Sum the owner's daily wallet aggregates over a day range (inclusive), across all their
+    characters unless character_ids is given. days=N means the last N days including today.
+    """
+    if group_by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping '{group_by}', expected one of {list(GROUPINGS)}")
+    if days is not None:
+        start = datetime.utcnow().date() - timedelta(days=days - 1)
+
+    keys = [getattr(WalletDaily, name) for name in GROUPINGS[group_by]]
+    query = select(
+        *keys,
+        func.sum(WalletDaily.total), func.sum(WalletDaily.income), func.sum(WalletDaily.expense),
+        func.sum(WalletDaily.count), func.min(WalletDaily.min_amount), func.max(WalletDaily.max_amount),
+    ).group_by(*keys).order_by(*keys)
+    if start is not None:
+        query = query.where(WalletDaily.day >= _as_day(start))
+    if end is not None:
+        query = query.where(WalletDaily.day <= _as_day(end))
+    if character_ids:
+        query = query.where(WalletDaily.character_id.in_(character_ids))
+    if ref_types:
+        query = query.where(WalletDaily.ref_type.in_(ref_types))
+
+    with get_private_session(owner_id) as db:
+        results = []
+        for row in db.execute(query):
+            n = len(keys)
+            item = {name: (v.isoformat() if isinstance(v, date) else v) for name, v in zip(GROUPINGS[group_by], row[:n])}
+            total, income, expense, count, low, high = row[n:]
+            item.update({"total": total, "income": income, "expense": expense, "count": count,
+                         "min_amount": low, "max_amount": high})
+            results.append(item)
+        return results
+
+def income_by_ref_type(owner_id: int, days: int = 90) -> list:
+    """Income per ref_type over the last `days` days across all of an owner's characters, largest first."""
+    rows = wallet_summary(owner_id, days=days, group_by="ref_type")
+    return sorted((r for r in rows if r["income"]), key=lambda r: r["income"], reverse=True)
@@ -0,0 +1,147 @@
+# bench/query_indexes.py
+
+"""
+EXPLAIN QUERY PLAN and timings for our hot queries, before and after the schema migrations.
+
+    python -m bench.query_indexes [--orders 1000000] [--repeat 20]
+
+Builds throwaway public and private databases with the baseline (pre-migration)
+schema, fills them with synthetic rows, then runs db.migrations on both.
+"""
+
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+
+from db.migrations import run_migrations
+
+PUBLIC_QUERIES = [
+    ("best sell in region",
+     "SELECT MIN(price) FROM market_orders WHERE region_id = ? AND type_id = ? AND is_buy = 0",
+     lambda: (10000002, random.randrange(5000))),
+    ("buy book in region",
+     "SELECT price, volume FROM market_orders WHERE region_id = ? AND type_id = ? AND is_buy = 1 ORDER BY price DESC",
+     lambda: (10000002, random.randrange(5000))),
+    ("best sell across regions",
+     "SELECT MIN(price) FROM market_orders WHERE type_id = ? AND is_buy = 0",
+     lambda: (random.randrange(5000),)),
+    ("orders at station",
+     "SELECT type_id, price FROM market_orders WHERE location_id = ? AND type_id = ?",
+     lambda: (60003760, random.randrange(5000))),
+]
+
+PRIVATE_QUERIES = [
+    ("assets at location",
+     "SELECT type_id, quantity FROM assets WHERE character_id = ? AND location_id = ?",
+     lambda: (random.randrange(20), 60000000 + random.randrange(200))),
+    ("structure discovery",
+     "SELECT DISTINCT location_id FROM assets WHERE location_id > 2147483647",
+     lambda: ()),
+    ("wallet last 30 days",
+     "SELECT SUM(amount) FROM wallet_transactions WHERE character_id = ? AND date >= ?",
+     lambda: (random.randrange(20), "2026-09-01")),
+    ("wallet by ref_type",
+     "SELECT SUM(amount) FROM wallet_transactions WHERE character_id = ? AND ref_type = ? AND date >= ?",
+     lambda: (random.randrange(20), "market_transaction", "2026-01-01")),
+    ("active manufacturing jobs",
+     "SELECT COUNT(*) FROM industry_jobs WHERE character_id = ? AND activity_id = 1 AND end_date > ?",
+     lambda: (random.randrange(20), "2026-10-01")),
+]
+
+def build_public(path: str, orders: int):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE market_orders (
+            id INTEGER PRIMARY KEY, region_id INTEGER, type_id INTEGER, price FLOAT,
+            volume FLOAT, is_buy BOOLEAN, location_id INTEGER, last_seen DATETIME
+        )
+    """)
+    regions = [10000002 + i for i in range(60)]
+    conn.executemany(
+        "INSERT INTO market_orders VALUES (?, ?, ?, ?, ?, ?, ?, NULL)",
+        ((i, random.choice(regions), random.randrange(5000), random.uniform(1, 1e6), 10.0,
+          random.random() < 0.4, 60003760 if i % 3 == 0 else 60000000 + random.randrange(5000))
+         for i in range(orders)),
+    )
+    conn.commit()
+    return conn
+
+def build_private(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE assets (item_id BIGINT PRIMARY KEY, character_id INTEGER, type_id INTEGER,
+                             location_id INTEGER, quantity INTEGER, location_flag INTEGER);
+        CREATE INDEX ix_assets_character_id ON assets (character_id);
+        CREATE TABLE wallet_transactions (id BIGINT PRIMARY KEY, character_id INTEGER, amount FLOAT,
+                             date DATETIME, ref_type VARCHAR, context_id BIGINT, context_id_type INTEGER);
+        CREATE INDEX ix_wallet_transactions_character_id ON wallet_transactions (character_id);
+        CREATE TABLE industry_jobs (job_id BIGINT PRIMARY KEY, character_id INTEGER, activity_id INTEGER,
+                             facility_id BIGINT, end_date DATETIME);
+        CREATE INDEX ix_industry_jobs_character_id ON industry_jobs (character_id);
+        CREATE TABLE skill_queue (character_id INTEGER, queue_position INTEGER, skill_id INTEGER,
+                             finish_level INTEGER, finish_date DATETIME, PRIMARY KEY (character_id, queue_position));
+        -- created by create_all() before the migrations run; v2 backfills it from the journal
+        CREATE TABLE wallet_daily (character_id INTEGER, day DATE, ref_type VARCHAR, total FLOAT, income FLOAT,
+                             expense FLOAT, count INTEGER, min_amount FLOAT, max_amount FLOAT,
+                             PRIMARY KEY (character_id, day, ref_type));
+    """)
+    ref_types = ["market_transaction", "brokers_fee", "transaction_tax", "bounty_prizes", "industry_job_tax"]
+    conn.executemany(
+        "INSERT INTO assets VALUES (?, ?, ?, ?, ?, NULL)",
+        ((i, random.randrange(20), random.randrange(5000),
+          60000000 + random.randrange(200) if i % 10 else 1_000_000_000_000 + random.randrange(50), 1)
+         for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO wallet_transactions VALUES (?, ?, ?, ?, ?, NULL, NULL)",
+        ((i, random.randrange(20), random.uniform(-1e6, 1e6),
+          f"2026-{random.randint(1, 10):02d}-{random.randint(1, 28):02d}", random.choice(ref_types))
+         for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO industry_jobs VALUES (?, ?, ?, ?, ?)",
+        ((i, random.randrange(20), random.choice([1, 3, 4, 5, 8]), 60003760,
+          f"2026-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}")
+         for i in range(rows // 10)),
+    )
+    conn.commit()
+    return conn
+
+def measure(conn, queries, repeat: int) -> dict:
+    results = {}
+    for label, sql, params in queries:
+        plan = " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params()))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params()).fetchall()
+        results[label] = ((time.perf_counter() - start) / repeat * 1e3, plan)
+    return results
+
+def report(title: str, before: dict, after: dict):
+    print(f"\n== {title} ==")
+    for label in before:
+        (t0, p0), (t1, p1) = before[label], after[label]
+        print(f"{label:<28}{t0:>10.3f} ms -> {t1:>8.3f} ms  ({t0 / t1 if t1 else float('inf'):.0f}x)")
+        print(f"    before: {p0}\n    after:  {p1}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(42)
+
+    folder = tempfile.mkdtemp(prefix="eve_bench_")
+    public = build_public(os.path.join(folder, "public.db"), args.orders)
+    private = build_private(os.path.join(folder, "private.db"), args.rows)
+
+    public_before = measure(public, PUBLIC_QUERIES, args.repeat)
+    private_before = measure(private, PRIVATE_QUERIES, args.repeat)
+    run_migrations(public, "market")
+    run_migrations(private, "private")
+    report("public", public_before, measure(public, PUBLIC_QUERIES, args.repeat))
+    report("private", private_before, measure(private, PRIVATE_QUERIES, args.repeat))
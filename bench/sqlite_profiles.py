@@ -0,0 +1,111 @@
+# bench/sqlite_profiles.py
+
+"""
+Read latency while a concurrent ingest is writing, per SQLite storage profile.
+
+    python -m bench.sqlite_profiles [--rows 200000] [--seconds 5]
+
+A writer thread inserts market-order-sized rows in small commits (like
+fetch_all_market_data does page by page) while a reader thread runs point
+lookups. "default" is SQLite's stock rollback journal with synchronous=FULL.
+"""
+
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+from db.storage_profiles import PROFILES, apply_profile
+
+ROWS_PER_COMMIT = 500
+
+def setup(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE market_orders (
+            id INTEGER PRIMARY KEY, region_id INTEGER, type_id INTEGER,
+            price REAL, volume REAL, is_buy BOOLEAN, location_id INTEGER
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO market_orders VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((i, 10000002, i % 5000, 1.0 + i, 10.0, i % 2, 60003760) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+def run(profile: str, rows: int, seconds: float) -> dict:
+    folder = tempfile.mkdtemp(prefix="eve_bench_")
+    path = os.path.join(folder, "bench.db")
+    setup(path, rows)
+
+    stop = threading.Event()
+    written = [0]
+    latencies = []
+    errors = [0]
+
+    def connect():
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        if profile != "default":
+            apply_profile(conn, profile)
+        return conn
+
+    def writer():
+        conn = connect()
+        next_id = rows
+        while not stop.is_set():
+            conn.executemany(
+                "INSERT OR REPLACE INTO market_orders VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((i, 10000002, i % 5000, 2.0, 5.0, 0, 60003760) for i in range(next_id, next_id + ROWS_PER_COMMIT)),
+            )
+            conn.commit()
+            next_id += ROWS_PER_COMMIT
+            written[0] += ROWS_PER_COMMIT
+        conn.close()
+
+    def reader():
+        conn = connect()
+        while not stop.is_set():
+            key = random.randrange(rows)
+            start = time.perf_counter()
+            try:
+                conn.execute("SELECT price, volume FROM market_orders WHERE id = ?", (key,)).fetchone()
+                latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                errors[0] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3 if latencies else float("nan")
+    return {
+        "profile": profile,
+        "reads": len(latencies),
+        "p50_ms": pick(0.50),
+        "p99_ms": pick(0.99),
+        "max_ms": latencies[-1] * 1e3 if latencies else float("nan"),
+        "read_errors": errors[0],
+        "rows_written": written[0],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'reads':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}{'written':>10}")
+    for name in ("default", *PROFILES):
+        r = run(name, args.rows, args.seconds)
+        print(f"{r['profile']:<10}{r['reads']:>10}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['max_ms']:>10.1f}"
+              f"{r['read_errors']:>8}{r['rows_written']:>10}")
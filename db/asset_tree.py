@@ -0,0 +1,166 @@
+# db/asset_tree.py
+
+import logging
+from sqlalchemy import select, delete, func
+
+from db.database import get_private_session
+from db.models import Asset, AssetNode, AssetLocationRollup
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+# ESI location ID ranges; anything at or above STRUCTURE_MIN_ID that isn't one of our items is a structure.
+STATION_IDS = range(60_000_000, 64_000_000)
+SOLAR_SYSTEM_IDS = range(30_000_000, 33_000_000)
+STRUCTURE_MIN_ID = 1_000_000_000_000
+
+MAX_DEPTH = 16      # containers in ships in containers; deeper means a cycle in bad data
+
+# IDs per "IN (...)" filter, under SQLite's bound-parameter limit
+ID_CHUNK = 500
+
+# ──────── Building ────────────────────────────────────────────────────────────
+
+def location_kind(location_id: int) -> str:
+    if location_id in STATION_IDS:
+        return "station"
+    if location_id in SOLAR_SYSTEM_IDS:
+        return "solar_system"
+    if location_id >= STRUCTURE_MIN_ID:
+        return "structure"
+    return "other"
+
+def _resolve(assets: dict) -> list:
+    """
+    Turn { item_id: (character_id, type_id, location_id, quantity) } into asset_tree rows, following
+    location_id through containing items up to the first location that isn't one of the items.
+    """
+    roots = {}      # item_id -> (root_location_id, depth)
+
+    def root_of(item_id):
+        path = []
+        current = item_id
+        while current in assets and current not in roots and len(path) <= MAX_DEPTH:
+            path.append(current)
+            current = assets[current][2]
+        if current in roots:
+            root, depth = roots[current]
+            depth += 1
+        else:
+            root, depth = current, 0
+        for node in reversed(path):
+            roots[node] = (root, depth)
+            depth += 1
+        return roots[item_id]
+
+    rows = []
+    for item_id, (character_id, type_id, location_id, quantity) in assets.items():
+        root, depth = root_of(item_id)
+        rows.append({
+            "item_id": item_id, "character_id": character_id, "type_id": type_id, "quantity": quantity,
+            "parent_item_id": location_id if location_id in assets else None,
+            "root_location_id": root, "root_location_kind": location_kind(root), "depth": depth,
+        })
+    return rows
+
+def _refresh_rollups(db, root_ids: set) -> None:
+    root_ids = list(root_ids)
+    for i in range(0, len(root_ids), ID_CHUNK):
+        chunk = root_ids[i:i + ID_CHUNK]
+        db.execute(delete(AssetLocationRollup).where(AssetLocationRollup.root_location_id.in_(chunk)))
+        db.execute(AssetLocationRollup.__table__.insert().from_select(
+            ["root_location_id", "type_id", "root_location_kind", "quantity", "item_count", "character_count"],
+            select(
+                AssetNode.root_location_id, AssetNode.type_id, func.max(AssetNode.root_location_kind),
+                func.sum(AssetNode.quantity), func.count(), func.count(AssetNode.character_id.distinct()),
+            ).where(AssetNode.root_location_id.in_(chunk)).group_by(AssetNode.root_location_id, AssetNode.type_id),
+        ))
+
+def build_asset_tree(owner_id: int, character_id: int = None, db=None) -> int:
+    """
+    Rebuild the asset tree of one character (or all of the owner's characters) and the rollups of
+    every root location it touched, in one transaction. Returns the number of items indexed.
+    Pass an open session as `db` to rebuild inside the caller's transaction; the caller commits.
+    """
+    if db is None:
+        with get_private_session(owner_id) as db:
+            count = build_asset_tree(owner_id, character_id, db)
+            db.commit()
+            return count
+
+    query = select(Asset.item_id, Asset.character_id, Asset.type_id, Asset.location_id, Asset.quantity)
+    old_roots = select(AssetNode.root_location_id).distinct()
+    if character_id is not None:
+        query = query.where(Asset.character_id == character_id)
+        old_roots = old_roots.where(AssetNode.character_id == character_id)
+
+    # Items only ever sit in their own character's containers, so a character's tree is self-contained.
+    assets = {r[0]: tuple(r[1:]) for r in db.execute(query)}
+    rows = _resolve(assets)
+    touched = {r for (r,) in db.execute(old_roots)} | {row["root_location_id"] for row in rows}
+
+    if character_id is None:
+        db.execute(delete(AssetNode))
+        db.execute(delete(AssetLocationRollup))
+    else:
+        db.execute(delete(AssetNode).where(AssetNode.character_id == character_id))
+        # items handed over from another character still sit in that character's tree
+        item_ids = list(assets)
+        for i in range(0, len(item_ids), ID_CHUNK):
+            moved = AssetNode.item_id.in_(item_ids[i:i + ID_CHUNK])
+            touched.update(r for (r,) in db.execute(select(AssetNode.root_location_id).where(moved)))
+            db.execute(delete(AssetNode).where(moved))
+    if rows:
+        db.execute(AssetNode.__table__.insert(), rows)
+    _refresh_rollups(db, touched)
+
+    logger.debug(f"[AssetTree] Owner {owner_id} character {character_id}: {len(rows)} items, {len(touched)} locations")
+    return len(rows)
+
+# ──────── Queries ─────────────────────────────────────────────────────────────
+
+def location_contents(owner_id: int, root_location_id: int) -> list:
+    """Return [{type_id, quantity, item_count, character_count}] for everything at a location, across all toons."""
+    with get_private_session(owner_id) as db:
+        return [
+            {"type_id": r.type_id, "quantity": r.quantity, "item_count": r.item_count,
+             "character_count": r.character_count}
+            for r in db.scalars(
+                select(AssetLocationRollup).where(AssetLocationRollup.root_location_id == root_location_id)
+                .order_by(AssetLocationRollup.type_id)
+            )
+        ]
+
+def locations_holding(owner_id: int, type_id: int) -> list:
+    """Return every root location holding a type, largest quantity first."""
+    with get_private_session(owner_id) as db:
+        return [
+            {"root_location_id": r.root_location_id, "root_location_kind": r.root_location_kind,
+             "quantity": r.quantity, "item_count": r.item_count}
+            for r in db.scalars(
+                select(AssetLocationRollup).where(AssetLocationRollup.type_id == type_id)
+                .order_by(AssetLocationRollup.quantity.desc())
+            )
+        ]
+
+def location_summary(owner_id: int) -> list:
+    """Return one row per root location with its item and type counts."""
+    with get_private_session(owner_id) as db:
+        return [
+            {"root_location_id": root, "root_location_kind": kind, "types": types, "items": items}
+            for root, kind, types, items in db.execute(
+                select(
+                    AssetLocationRollup.root_location_id, func.max(AssetLocationRollup.root_location_kind),
+                    func.count(), func.sum(AssetLocationRollup.item_count),
+                ).group_by(AssetLocationRollup.root_location_id).order_by(func.sum(AssetLocationRollup.item_count).desc())
+            )
+        ]
+
+def container_contents(owner_id: int, item_id: int) -> list:
+    """Return the items directly inside a container or ship."""
+    with get_private_session(owner_id) as db:
+        return [
+            {"item_id": n.item_id, "type_id": n.type_id, "quantity": n.quantity, "character_id": n.character_id}
+            for n in db.scalars(select(AssetNode).where(AssetNode.parent_item_id == item_id).order_by(AssetNode.item_id))
+        ]
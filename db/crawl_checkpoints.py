@@ -0,0 +1,137 @@
+# db/crawl_checkpoints.py
+
+import logging
+from datetime import datetime
+
+from db.database import get_public_session
+from db.models import CrawlRun, CrawlCheckpoint, CrawlPage
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+# Regions in these states are finished for the run they belong to; anything else is retried on resume.
+FINISHED_STATES = ("done", "not_modified")
+
+# ──────── Runs ────────────────────────────────────────────────────────────────
+
+def begin_crawl(crawl: str, region_ids: list, fresh: bool = False) -> tuple:
+    """
+    Return (run_id, resumed). An unfinished run of the same crawl is resumed unless fresh=True,
+    in which case it is closed and a new run started.
+    """
+    with get_public_session() as db:
+        run = db.query(CrawlRun).filter(CrawlRun.crawl == crawl, CrawlRun.state == "running") \
+            .order_by(CrawlRun.run_id.desc()).first()
+        if run and not fresh:
+            done = db.query(CrawlCheckpoint).filter(
+                CrawlCheckpoint.crawl == crawl, CrawlCheckpoint.run_id == run.run_id,
+                CrawlCheckpoint.state.in_(FINISHED_STATES),
+            ).count()
+            logger.info(f"[Crawl] Resuming {crawl} run {run.run_id}: {done}/{run.region_count} regions already done")
+            return run.run_id, True
+        if run:
+            run.state = "abandoned"
+            run.finished_at = datetime.utcnow()
+
+        run = CrawlRun(crawl=crawl, state="running", region_count=len(region_ids), started_at=datetime.utcnow())
+        db.add(run)
+        db.commit()
+        logger.info(f"[Crawl] Started {crawl} run {run.run_id} over {len(region_ids)} regions")
+        return run.run_id, False
+
+def finish_crawl(run_id: int) -> None:
+    with get_public_session() as db:
+        run = db.get(CrawlRun, run_id)
+        run.state = "complete"
+        run.finished_at = datetime.utcnow()
+        db.commit()
+
+def pending_regions(crawl: str, run_id: int, region_ids: list) -> list:
+    """Return the regions not yet finished in this run, in their original order."""
+    with get_public_session() as db:
+        finished = {r for (r,) in db.query(CrawlCheckpoint.region_id).filter(
+            CrawlCheckpoint.crawl == crawl, CrawlCheckpoint.run_id == run_id,
+            CrawlCheckpoint.state.in_(FINISHED_STATES),
+        )}
+    return [r for r in region_ids if r not in finished]
+
+# ──────── Region / Page Progress ──────────────────────────────────────────────
+
+def region_checkpoint(crawl: str, region_id: int):
+    """Return the region's checkpoint row (detached), or None."""
+    with get_public_session() as db:
+        cp = db.get(CrawlCheckpoint, (crawl, region_id))
+        if cp is not None:
+            db.expunge(cp)
+        return cp
+
+def mark_region(crawl: str, region_id: int, run_id: int, state: str, **fields) -> None:
+    """Upsert a region's checkpoint (state plus any of pages_done, total_pages, generation)."""
+    with get_public_session() as db:
+        cp = db.get(CrawlCheckpoint, (crawl, region_id))
+        if cp is None:
+            cp = CrawlCheckpoint(crawl=crawl, region_id=region_id)
+            db.add(cp)
+        cp.run_id = run_id
+        cp.state = state
+        for name, value in fields.items():
+            setattr(cp, name, value)
+        cp.updated_at = datetime.utcnow()
+        db.commit()
+
+def mark_page_done(crawl: str, region_id: int, run_id: int, page: int, etag: str = None) -> None:
+    """Record a completed page and its ETag, and advance the region's page counter."""
+    now = datetime.utcnow()
+    with get_public_session() as db:
+        db.merge(CrawlPage(crawl=crawl, region_id=region_id, page=page, etag=etag, run_id=run_id, completed_at=now))
+        cp = db.get(CrawlCheckpoint, (crawl, region_id))
+        if cp is not None:
+            cp.pages_done = max(cp.pages_done or 0, page)
+            cp.updated_at = now
+        db.commit()
+
+def page_etag(crawl: str, region_id: int, page: int):
+    """Return the ETag stored for a completed page, or None."""
+    with get_public_session() as db:
+        row = db.get(CrawlPage, (crawl, region_id, page))
+        return row.etag if row else None
+
+# ──────── Status ──────────────────────────────────────────────────────────────
+
+def crawl_status(crawl: str = None) -> dict:
+    """Return { crawl: progress of its latest run } for the status API."""
+    with get_public_session() as db:
+        query = db.query(CrawlRun)
+        if crawl is not None:
+            query = query.filter(CrawlRun.crawl == crawl)
+        latest = {}
+        for run in query.order_by(CrawlRun.run_id):
+            latest[run.crawl] = run
+
+        status = {}
+        for name, run in latest.items():
+            checkpoints = db.query(CrawlCheckpoint).filter(
+                CrawlCheckpoint.crawl == name, CrawlCheckpoint.run_id == run.run_id
+            ).all()
+            states = {}
+            for cp in checkpoints:
+                states[cp.state] = states.get(cp.state, 0) + 1
+
+            finished = sum(states.get(s, 0) for s in FINISHED_STATES)
+            status[name] = {
+                "run_id": run.run_id,
+                "state": run.state,
+                "started_at": run.started_at.isoformat() if run.started_at else None,
+                "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+                "regions": run.region_count,
+                "regions_finished": finished,
+                "progress": finished / run.region_count if run.region_count else 1.0,
+                "states": states,
+                "in_progress": [
+                    {"region_id": cp.region_id, "pages_done": cp.pages_done, "total_pages": cp.total_pages}
+                    for cp in checkpoints if cp.state == "running"
+                ],
+                "failed": [cp.region_id for cp in checkpoints if cp.state == "failed"],
+            }
+        return status
@@ -1,11 +1,14 @@
 # db/database.py
 
 import os
-import sqlite3
 import logging
+import threading
+from collections import OrderedDict
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from db.models import Base
+from db.models import Base, PrivateBase
+from db.storage_profiles import attach_profile, connect_sqlite
+from db.migrations import migrate_engine
 
 # ──────── Globals ─────────────────────────────────────────────────────────────
 
@@ -14,9 +17,18 @@ logger = logging.getLogger(__name__)
 PRIVATE_DATA_FOLDER = os.getenv("EVE_PRIVATE_DATABASE_FOLDER", "_privateData")
 PUBLIC_DATABASE_FILE = os.getenv("EVE_PUBLIC_DATABASE_FILE", os.path.join("_publicData", "public.db"))
 
+PRIVATE_ENGINE_CACHE_SIZE = int(os.getenv("EVE_PRIVATE_ENGINE_CACHE", "32"))
+
 # Public DB internals
 _public_engine = None
 _PublicSession = None
+_IngestSession = None       # same file, "ingest" storage profile, for bulk writers
+
+# Private DB internals: owner_id -> (engine, sessionmaker), least recently used first
+_private_engines = OrderedDict()
+_private_lock = threading.Lock()
+_private_schema_ready = set()     # owners whose DB got create_all + migrations in this process
+_schema_locks = {}                # owner_id -> lock held while that owner's schema is brought up to date
 
 # ──────── Public Database ─────────────────────────────────────────────────────
 
@@ -27,7 +39,7 @@ def initialize_public_database():
     if _public_engine is None:
         abs_path = os.path.abspath(PUBLIC_DATABASE_FILE).replace("\\", "/")
         db_url = f"sqlite:///{abs_path}"
-        _public_engine = create_engine(db_url, echo=False, future=True)
+        _public_engine = attach_profile(create_engine(db_url, echo=False, future=True))
         _PublicSession = sessionmaker(bind=_public_engine)
         logger.info(f"[PublicDB] Initialized public database at {abs_path}")
 
@@ -37,44 +49,103 @@ def get_public_session():
         initialize_public_database()
     return _PublicSession()
 
+def get_public_ingest_session():
+    """Return a new session for the public database on the "ingest" storage profile, for bulk writes."""
+    global _IngestSession
+    if _IngestSession is None:
+        abs_path = os.path.abspath(PUBLIC_DATABASE_FILE).replace("\\", "/")
+        engine = attach_profile(create_engine(f"sqlite:///{abs_path}", echo=False, future=True), "ingest")
+        _IngestSession = sessionmaker(bind=engine)
+    return _IngestSession()
+
 def create_public_tables():
     """Create tables on the public database."""
     if _public_engine is None:
         initialize_public_database()
     Base.metadata.create_all(_public_engine)
+    migrate_engine(_public_engine, "public", "market")
     logger.info("[PublicDB] Tables created.")
 
 def raw_sqlite_connection():
     """Open a raw connection to the public SQLite database."""
     abs_path = os.path.abspath(PUBLIC_DATABASE_FILE)
-    return sqlite3.connect(abs_path)
+    return connect_sqlite(abs_path)
 
 # ──────── Private Toon Databases ──────────────────────────────────────────────
 
-def get_private_session(owner_id: int):
-    """Return a new session for a toon-specific private database."""
+def private_db_url(owner_id: int) -> str:
+    """Return the SQLAlchemy URL of an owner's private database."""
     toon_folder = os.path.join(PRIVATE_DATA_FOLDER, str(owner_id))
     toon_db_path = os.path.join(toon_folder, f"{owner_id}.db")
 
     abs_path = os.path.abspath(toon_db_path).replace("\\", "/")
-    db_url = f"sqlite:///{abs_path}"
-
-    engine = create_engine(db_url, echo=False, future=True)
-    Session = sessionmaker(bind=engine)
+    return f"sqlite:///{abs_path}"
+
+def _ensure_private_schema(owner_id: int, engine) -> None:
+    """Run create_all and the private migrations once per owner and process, holding only that owner's lock."""
+    with _private_lock:
+        owner_lock = _schema_locks.setdefault(owner_id, threading.Lock())
+    with owner_lock:
+        if owner_id in _private_schema_ready:
+            return
+        # DBs created before a schema change only get the new tables/columns here, not just at login
+        os.makedirs(os.path.join(PRIVATE_DATA_FOLDER, str(owner_id)), exist_ok=True)
+        PrivateBase.metadata.create_all(engine)
+        migrate_engine(engine, "private")
+        _private_schema_ready.add(owner_id)
+
+def _private_entry(owner_id: int) -> tuple:
+    """
+    Return the cached (engine, sessionmaker) for an owner, creating it and evicting the LRU entry if needed.
+    The first engine for an owner in a process also brings its schema up to date, outside the global
+    lock so a long migration only holds up that owner.
+    """
+    owner_id = int(owner_id)
+    with _private_lock:
+        entry = _private_engines.get(owner_id)
+        if entry is not None:
+            _private_engines.move_to_end(owner_id)
+            return entry
+
+    engine = attach_profile(create_engine(private_db_url(owner_id), echo=False, future=True))
+    _ensure_private_schema(owner_id, engine)
+
+    with _private_lock:
+        existing = _private_engines.get(owner_id)
+        if existing is not None:
+            # another thread opened this owner meanwhile; keep its engine
+            _private_engines.move_to_end(owner_id)
+            engine.dispose()
+            return existing
+
+        entry = (engine, sessionmaker(bind=engine))
+        _private_engines[owner_id] = entry
+        logger.debug(f"[PrivateDB] Created engine for owner {owner_id} ({len(_private_engines)} cached)")
+
+        while len(_private_engines) > PRIVATE_ENGINE_CACHE_SIZE:
+            evicted_owner, (evicted_engine, _) = _private_engines.popitem(last=False)
+            evicted_engine.dispose()
+            logger.debug(f"[PrivateDB] Evicted engine for owner {evicted_owner}")
+
+        return entry
+
+def get_private_engine(owner_id: int):
+    """Return the shared engine (and connection pool) for an owner's private database."""
+    return _private_entry(owner_id)[0]
 
-    logger.debug(f" Connected to database at {abs_path}")
-
-    return Session()
+def get_private_session(owner_id: int):
+    """Return a new session for a toon-specific private database."""
+    return _private_entry(owner_id)[1]()
 print("[DB] get_private_session defined ✅")
 
+def dispose_private_engines():
+    """Dispose every cached private engine and its connection pool."""
+    with _private_lock:
+        while _private_engines:
+            _, (engine, _) = _private_engines.popitem(last=False)
+            engine.dispose()
+
 def create_private_tables(character_id: int):
     """Create tables in a character's private database."""
-    toon_folder = os.path.join(PRIVATE_DATA_FOLDER, str(character_id))
-    toon_db_path = os.path.join(toon_folder, f"{character_id}.db")
-
-    abs_path = os.path.abspath(toon_db_path).replace("\\", "/")
-    db_url = f"sqlite:///{abs_path}"
-
-    engine = create_engine(db_url, echo=False, future=True)
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(get_private_engine(character_id))
     logger.info(f"[PrivateDB] Tables created for toon {character_id}.")
@@ -4,6 +4,9 @@ import os
 import logging
 from sqlalchemy import create_engine
 from db.models import Base, PrivateBase
+from db.database import get_private_engine
+from db.storage_profiles import attach_profile
+from db.migrations import migrate_engine
 
 # ──────── Logger ────────────────────────────────────────────────────────────────
 logger = logging.getLogger(__name__)
@@ -17,8 +20,10 @@ PRIVATE_DATA_FOLDER = os.getenv("EVE_PRIVATE_DATABASE_FOLDER", "_privateData")
 def initialize_public_database():
     """Initialize the public (shared) database and create tables."""
     abs_path = os.path.abspath(PUBLIC_DB_PATH).replace("\\", "/")
-    engine = create_engine(f"sqlite:///{abs_path}", future=True)
+    engine = attach_profile(create_engine(f"sqlite:///{abs_path}", future=True))
     Base.metadata.create_all(engine)
+    migrate_engine(engine, "public", "market")
+    engine.dispose()
     logger.info(f"[DBInitializer] Public database initialized at {abs_path}")
 
 # ──────── Private Database Initialization ───────────────────────────────────────
@@ -31,8 +36,9 @@ def initialize_private_database(owner_id: int):
     private_db_path = os.path.join(toon_folder, f"{owner_id}.db")
     abs_path = os.path.abspath(private_db_path).replace("\\", "/")
 
-    engine = create_engine(f"sqlite:///{abs_path}", future=True)
+    engine = get_private_engine(owner_id)
     PrivateBase.metadata.create_all(engine)
+    migrate_engine(engine, "private")
     logger.info(f"[DBInitializer] Private database initialized for owner {owner_id} at {abs_path}")
 
 # ──────── Full System Initialization ────────────────────────────────────────────
@@ -0,0 +1,119 @@
+# db/market_generations.py
+
+import os
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import func
+
+from db.database import get_public_session
+from db.models import MarketOrder, MarketGeneration, MarketCurrent
+from db.market_shards import get_market_session, pinned_generations
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+# Retired generations stay readable this long after a newer one is published, so readers in
+# other processes that pinned them can finish.
+GENERATION_GRACE = int(os.getenv("EVE_MARKET_GENERATION_GRACE", "600"))
+# A generation still "building" after this long belongs to a crashed ingest.
+GENERATION_STALE = int(os.getenv("EVE_MARKET_GENERATION_STALE", str(6 * 3600)))
+
+# ──────── Ingest Lifecycle ────────────────────────────────────────────────────
+
+def begin_generation(region_id: int) -> int:
+    """Allocate a new, unpublished generation for a region's ingest. Its rows stay invisible until published."""
+    with get_public_session() as db:
+        gen = MarketGeneration(region_id=region_id, state="building", started_at=datetime.utcnow())
+        db.add(gen)
+        db.commit()
+        logger.debug(f"[MarketGen] Region {region_id}: building generation {gen.generation}")
+        return gen.generation
+
+def publish_generation(region_id: int, generation: int, order_count: int = 0) -> None:
+    """
+    Make a generation the one readers see, retiring the previous one. The pointer flip and the
+    state changes happen in one transaction on public.db.
+    """
+    now = datetime.utcnow()
+    with get_public_session() as db:
+        current = db.get(MarketCurrent, region_id)
+        if current is None:
+            current = MarketCurrent(region_id=region_id)
+            db.add(current)
+        elif current.generation is not None:
+            db.query(MarketGeneration).filter(MarketGeneration.generation == current.generation) \
+                .update({"state": "retired", "retired_at": now})
+
+        current.generation = generation
+        current.published_at = now
+        db.query(MarketGeneration).filter(MarketGeneration.generation == generation) \
+            .update({"state": "published", "published_at": now, "order_count": order_count})
+        db.commit()
+
+    logger.info(f"[MarketGen] Region {region_id}: published generation {generation} ({order_count} orders)")
+
+def generation_order_count(region_id: int, generation: int) -> int:
+    """Return how many orders a generation holds, for ingests that didn't count them as they went."""
+    with get_market_session(region_id) as db:
+        return db.query(func.count()).filter(MarketOrder.generation == generation).scalar()
+
+def generation_state(generation: int):
+    """Return a generation's state, or None if it no longer exists."""
+    with get_public_session() as db:
+        gen = db.get(MarketGeneration, generation)
+        return gen.state if gen else None
+
+def abandon_generation(generation: int) -> None:
+    """Mark a failed ingest's generation for garbage collection without publishing it."""
+    with get_public_session() as db:
+        db.query(MarketGeneration).filter(MarketGeneration.generation == generation) \
+            .update({"state": "failed", "retired_at": datetime.utcnow()})
+        db.commit()
+
+# ──────── Garbage Collection ──────────────────────────────────────────────────
+
+def collect_generations(region_id: int = None, now: datetime = None) -> int:
+    """
+    Delete the orders of retired/failed generations past the grace period (and of ingests that
+    crashed mid-build), skipping generations pinned in this process. Returns rows deleted.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=GENERATION_GRACE)
+    pinned = pinned_generations()
+
+    with get_public_session() as db:
+        query = db.query(MarketGeneration).filter(
+            ((MarketGeneration.state.in_(("retired", "failed"))) & (MarketGeneration.retired_at < cutoff))
+            | ((MarketGeneration.state == "building")
+               & (MarketGeneration.started_at < now - timedelta(seconds=GENERATION_STALE)))
+        )
+        if region_id is not None:
+            query = query.filter(MarketGeneration.region_id == region_id)
+        doomed = [(g.generation, g.region_id) for g in query if g.generation not in pinned]
+
+        # unversioned rows left from before generations, once the region has a published one
+        legacy = db.query(MarketCurrent.region_id).filter(MarketCurrent.published_at < cutoff)
+        if region_id is not None:
+            legacy = legacy.filter(MarketCurrent.region_id == region_id)
+        legacy = [r for (r,) in legacy]
+
+    deleted = 0
+    for generation, gen_region in doomed:
+        with get_market_session(gen_region) as db:
+            deleted += db.query(MarketOrder).filter(MarketOrder.generation == generation).delete(synchronize_session=False)
+            db.commit()
+        with get_public_session() as db:
+            db.query(MarketGeneration).filter(MarketGeneration.generation == generation).delete()
+            db.commit()
+
+    for legacy_region in legacy:
+        with get_market_session(legacy_region) as db:
+            deleted += db.query(MarketOrder).filter(
+                MarketOrder.region_id == legacy_region, MarketOrder.generation == 0
+            ).delete(synchronize_session=False)
+            db.commit()
+
+    if deleted:
+        logger.info(f"[MarketGen] Collected {len(doomed)} generation(s), {deleted} orders deleted")
+    return deleted
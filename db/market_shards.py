@@ -0,0 +1,186 @@
+# db/market_shards.py
+
+import os
+import glob
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import create_engine, func, or_, and_
+from sqlalchemy.orm import sessionmaker
+
+from db.database import get_public_session, get_public_ingest_session
+from db.models import MarketOrder, MarketCurrent
+from db.storage_profiles import attach_profile
+from db.migrations import migrate_engine
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+# "off" keeps every order in public.db, "region" gives each region its own file,
+# "bucket:<n>" hashes regions into n files.
+MARKET_SHARDING = os.getenv("EVE_MARKET_SHARDING", "off")
+MARKET_SHARD_FOLDER = os.getenv("EVE_MARKET_SHARD_FOLDER", os.path.join("_publicData", "market"))
+
+SHARD_TABLES = [MarketOrder.__table__]
+
+_shards = {}                # shard name -> (engine, sessionmaker)
+_shard_lock = threading.Lock()
+
+_pins = Counter()           # generation -> readers in this process holding it
+_pin_lock = threading.Lock()
+
+# ──────── Shard Routing ───────────────────────────────────────────────────────
+
+def sharding_enabled() -> bool:
+    return MARKET_SHARDING != "off"
+
+def shard_name(region_id):
+    """Return the shard holding a region's orders, or None when it lives in public.db."""
+    if region_id is None or not sharding_enabled():
+        return None
+    if MARKET_SHARDING == "region":
+        return f"region_{int(region_id)}"
+    if MARKET_SHARDING.startswith("bucket:"):
+        buckets = int(MARKET_SHARDING.split(":", 1)[1])
+        return f"bucket_{int(region_id) % buckets:03d}"
+    raise ValueError(f"Invalid EVE_MARKET_SHARDING '{MARKET_SHARDING}', expected off, region or bucket:<n>")
+
+def shard_path(name: str) -> str:
+    return os.path.abspath(os.path.join(MARKET_SHARD_FOLDER, f"{name}.db")).replace("\\", "/")
+
+def existing_shards() -> list:
+    """Return the names of every shard file on disk."""
+    return sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(MARKET_SHARD_FOLDER, "*.db")))
+
+def _shard_entry(name: str) -> tuple:
+    """Return the cached (engine, sessionmaker) for a shard, creating the file and its tables on first use."""
+    with _shard_lock:
+        entry = _shards.get(name)
+        if entry is None:
+            os.makedirs(MARKET_SHARD_FOLDER, exist_ok=True)
+            # shards are mostly bulk-written by market crawls
+            engine = attach_profile(create_engine(f"sqlite:///{shard_path(name)}", echo=False, future=True), "ingest")
+            MarketOrder.metadata.create_all(engine, tables=SHARD_TABLES)
+            migrate_engine(engine, "market")
+            entry = _shards[name] = (engine, sessionmaker(bind=engine))
+            logger.info(f"[MarketShards] Opened shard {name}")
+        return entry
+
+# ──────── Sessions ────────────────────────────────────────────────────────────
+
+def get_market_session(region_id=None):
+    """Return a session (on the ingest storage profile) on the database that stores a region's market orders."""
+    name = shard_name(region_id)
+    if name is None:
+        return get_public_ingest_session()
+    return _shard_entry(name)[1]()
+
+def _read_sessions(region_ids=None):
+    """Yield sessions covering the requested regions (all shards plus public.db when unrestricted)."""
+    if not sharding_enabled():
+        yield get_public_session()
+        return
+
+    if region_ids is None:
+        names = existing_shards()
+        yield get_public_session()      # structure orders without a region stay in public.db
+    else:
+        names = sorted({shard_name(r) for r in region_ids if r is not None})
+        if None in region_ids:
+            yield get_public_session()
+    for name in names:
+        yield _shard_entry(name)[1]()
+
+# ──────── Generations ─────────────────────────────────────────────────────────
+
+def current_generations(region_ids=None) -> dict:
+    """Return { region_id: published generation } from the market_current pointer table."""
+    with get_public_session() as db:
+        query = db.query(MarketCurrent.region_id, MarketCurrent.generation)
+        if region_ids is not None:
+            query = query.filter(MarketCurrent.region_id.in_([r for r in region_ids if r is not None]))
+        return dict(query.all())
+
+def pinned_generations() -> set:
+    """Generations some reader in this process is still using; garbage collection skips them."""
+    with _pin_lock:
+        return {g for g, n in _pins.items() if n > 0}
+
+@contextmanager
+def pin_generations(region_ids=None):
+    """
+    Pin the currently published generations for the duration of a block, so every read inside it
+    sees the same snapshot of each region even if an ingest publishes a newer one meanwhile.
+    """
+    generations = current_generations(region_ids)
+    with _pin_lock:
+        _pins.update(generations.values())
+    try:
+        yield generations
+    finally:
+        with _pin_lock:
+            _pins.subtract(generations.values())
+            for g in [g for g, n in _pins.items() if n <= 0]:
+                del _pins[g]
+
+def _generation_filter(generations: dict):
+    """Rows of the given published generations, plus unversioned rows (generation 0) of regions never published."""
+    unversioned = and_(
+        MarketOrder.generation == 0,
+        or_(MarketOrder.region_id.is_(None), MarketOrder.region_id.notin_(list(generations))),
+    )
+    if not generations:
+        return unversioned
+    return or_(MarketOrder.generation.in_(list(generations.values())), unversioned)
+
+# ──────── Query Layer ─────────────────────────────────────────────────────────
+
+def _filtered(query, region_ids, type_ids, is_buy, location_id, generations):
+    query = query.filter(_generation_filter(generations))
+    if region_ids is not None:
+        query = query.filter(MarketOrder.region_id.in_([r for r in region_ids if r is not None]))
+    if type_ids is not None:
+        query = query.filter(MarketOrder.type_id.in_(list(type_ids)))
+    if is_buy is not None:
+        query = query.filter(MarketOrder.is_buy == is_buy)
+    if location_id is not None:
+        query = query.filter(MarketOrder.location_id == location_id)
+    return query
+
+def query_market_orders(region_ids=None, type_ids=None, is_buy=None, location_id=None, generations=None) -> list:
+    """
+    Return market orders matching the filters from every shard involved, merged and sorted
+    by (type_id, is_buy, price) with buy orders highest-first. Only published generations are
+    read; pass the mapping from pin_generations() to read a pinned snapshot.
+    """
+    if generations is None:
+        generations = current_generations()
+
+    orders = []
+    for db in _read_sessions(region_ids):
+        with db:
+            query = _filtered(db.query(MarketOrder), region_ids, type_ids, is_buy, location_id, generations)
+            orders.extend(query.all())
+            db.expunge_all()
+
+    orders.sort(key=lambda o: (o.type_id, o.is_buy, -o.price if o.is_buy else o.price))
+    return orders
+
+def best_prices(type_ids=None, region_ids=None, is_buy: bool = False, location_id=None, generations=None) -> dict:
+    """Return { type_id: best price } (lowest sell or highest buy) across the relevant shards."""
+    if generations is None:
+        generations = current_generations()
+
+    aggregate = func.max(MarketOrder.price) if is_buy else func.min(MarketOrder.price)
+    pick = max if is_buy else min
+    prices = {}
+
+    for db in _read_sessions(region_ids):
+        with db:
+            query = _filtered(db.query(MarketOrder.type_id, aggregate), region_ids, type_ids, is_buy, location_id, generations)
+            for type_id, price in query.group_by(MarketOrder.type_id):
+                prices[type_id] = price if type_id not in prices else pick(prices[type_id], price)
+
+    return prices
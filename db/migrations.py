@@ -0,0 +1,209 @@
+# db/migrations.py
+
+import logging
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+MARKET_ORDER_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_market_orders_region_type_side_price "
+    "ON market_orders (region_id, type_id, is_buy, price)",
+    "CREATE INDEX IF NOT EXISTS ix_market_orders_type_side_price "
+    "ON market_orders (type_id, is_buy, price)",
+    "CREATE INDEX IF NOT EXISTS ix_market_orders_location_type "
+    "ON market_orders (location_id, type_id)",
+]
+
+# Rebuilds wallet_daily rows from wallet_transactions (same grouping as store_wallet_journal).
+WALLET_DAILY_BACKFILL = """
+    INSERT OR REPLACE INTO wallet_daily
+        (character_id, day, ref_type, total, income, expense, count, min_amount, max_amount)
+    SELECT character_id, date(date), COALESCE(ref_type, ''), SUM(amount),
+           SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END), SUM(CASE WHEN amount < 0 THEN amount ELSE 0 END),
+           COUNT(*), MIN(amount), MAX(amount)
+    FROM wallet_transactions
+    GROUP BY character_id, date(date), COALESCE(ref_type, '')
+"""
+
+# Trigram FTS5 index over asset, bookmark and structure names (see db/search_index.py). The rowid
+# encodes (kind, ref_id) so documents can be replaced without a lookup table.
+SEARCH_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index "
+    "USING fts5(name, detail, kind UNINDEXED, ref_id UNINDEXED, tokenize='trigram')"
+)
+
+# ──────── Steps ───────────────────────────────────────────────────────────────
+
+def _add_order_generation(dbapi_conn):
+    """
+    Rebuild market_orders with a (id, generation) primary key; existing rows become generation 0.
+    The rebuild runs in one transaction (committed by run_migrations), and a market_orders_v1 left
+    by an interrupted earlier attempt is copied over and dropped.
+    """
+    cursor = dbapi_conn.cursor()
+    try:
+        tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(market_orders)")]
+        if "market_orders_v1" not in tables and "generation" in columns:
+            return      # created by create_all() with the current model
+
+        # legacy sqlite3 autocommits DDL outside a transaction; SQLite itself can roll it back
+        if not dbapi_conn.in_transaction:
+            cursor.execute("BEGIN")
+        if "market_orders_v1" not in tables:
+            cursor.execute("ALTER TABLE market_orders RENAME TO market_orders_v1")
+            columns = []
+        if "generation" not in columns:
+            cursor.execute("DROP TABLE IF EXISTS market_orders")
+            cursor.execute("""
+                CREATE TABLE market_orders (
+                    id INTEGER NOT NULL, generation INTEGER NOT NULL DEFAULT 0, region_id INTEGER,
+                    type_id INTEGER, price FLOAT, volume FLOAT, is_buy BOOLEAN, location_id INTEGER,
+                    last_seen DATETIME, PRIMARY KEY (id, generation)
+                )
+            """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO market_orders (id, generation, region_id, type_id, price, volume, is_buy, location_id, last_seen)
+            SELECT id, 0, region_id, type_id, price, volume, is_buy, location_id, last_seen FROM market_orders_v1
+        """)
+        cursor.execute("DROP TABLE market_orders_v1")
+        for ddl in MARKET_ORDER_INDEXES:
+            cursor.execute(ddl)
+    finally:
+        cursor.close()
+
+def _backfill_wallet_daily(dbapi_conn):
+    """Fill wallet_daily from the journal, when both tables are present in this database."""
+    cursor = dbapi_conn.cursor()
+    try:
+        tables = {row[0] for row in cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('wallet_daily', 'wallet_transactions')"
+        )}
+        if len(tables) == 2:
+            cursor.execute(WALLET_DAILY_BACKFILL)
+    finally:
+        cursor.close()
+
+def _add_asset_name(dbapi_conn):
+    """Add the player-given item name to assets (containers and ships)."""
+    cursor = dbapi_conn.cursor()
+    try:
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(assets)")]
+        if "name" not in columns:
+            cursor.execute("ALTER TABLE assets ADD COLUMN name VARCHAR")
+    finally:
+        cursor.close()
+
+def _add_queue_start_date(dbapi_conn):
+    """Keep each queue entry's start date, which tells a training skill from a paused queue."""
+    cursor = dbapi_conn.cursor()
+    try:
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(skill_queue)")]
+        if not columns:
+            return      # no skill_queue table in this database
+        if "start_date" not in columns:
+            cursor.execute("ALTER TABLE skill_queue ADD COLUMN start_date DATETIME")
+    finally:
+        cursor.close()
+
+# ──────── Migrations ──────────────────────────────────────────────────────────
+
+# Versioned schema migrations per kind. Each entry is (version, description, steps); a step is an
+# SQL string or a callable taking the DBAPI connection. A database file can carry several kinds
+# (the public DB is "public" + "market", a market shard only "market"); the applied version of each
+# kind is tracked in its schema_migrations table. Migrations run in order, after create_all().
+MIGRATIONS = {
+    "public": [],
+    "market": [
+        (1, "Composite indexes for market order lookups", [
+            *MARKET_ORDER_INDEXES,
+            "ANALYZE market_orders",
+        ]),
+        (2, "Generation-versioned market orders", [
+            _add_order_generation,
+            "CREATE INDEX IF NOT EXISTS ix_market_orders_generation_type_side_price "
+            "ON market_orders (generation, type_id, is_buy, price)",
+            "ANALYZE market_orders",
+        ]),
+    ],
+    "private": [
+        (1, "Composite indexes for asset, wallet and industry queries", [
+            "CREATE INDEX IF NOT EXISTS ix_assets_character_location ON assets (character_id, location_id)",
+            "CREATE INDEX IF NOT EXISTS ix_assets_character_type ON assets (character_id, type_id)",
+            "CREATE INDEX IF NOT EXISTS ix_assets_location ON assets (location_id)",
+            "CREATE INDEX IF NOT EXISTS ix_wallet_transactions_character_date "
+            "ON wallet_transactions (character_id, date)",
+            "CREATE INDEX IF NOT EXISTS ix_wallet_transactions_character_ref_type_date "
+            "ON wallet_transactions (character_id, ref_type, date)",
+            "CREATE INDEX IF NOT EXISTS ix_industry_jobs_character_activity_end "
+            "ON industry_jobs (character_id, activity_id, end_date)",
+            "CREATE INDEX IF NOT EXISTS ix_industry_jobs_facility ON industry_jobs (facility_id)",
+            "ANALYZE",
+        ]),
+        (2, "Backfill daily wallet aggregates from the journal", [
+            _backfill_wallet_daily,
+        ]),
+        (3, "Asset names and the FTS5 search index", [
+            _add_asset_name,
+            SEARCH_INDEX_DDL,
+        ]),
+        (4, "Skill queue start dates", [
+            _add_queue_start_date,
+        ]),
+    ],
+}
+
+# ──────── Runner ──────────────────────────────────────────────────────────────
+
+def schema_version(dbapi_conn, kind: str) -> int:
+    """Return the migration version of a kind recorded in a database (0 if none)."""
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute("CREATE TABLE IF NOT EXISTS schema_migrations (kind TEXT PRIMARY KEY, version INTEGER)")
+        cursor.execute("SELECT version FROM schema_migrations WHERE kind = ?", (kind,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    finally:
+        cursor.close()
+
+def run_migrations(dbapi_conn, kind: str) -> int:
+    """Apply every pending migration of a kind ('public', 'market' or 'private'). Returns the number applied."""
+    if kind not in MIGRATIONS:
+        raise ValueError(f"Unknown migration kind '{kind}', expected one of {sorted(MIGRATIONS)}")
+
+    current = schema_version(dbapi_conn, kind)
+    applied = 0
+    for version, description, steps in MIGRATIONS[kind]:
+        if version <= current:
+            continue
+        logger.info(f"[Migrations] {kind} v{version}: {description}")
+        cursor = dbapi_conn.cursor()
+        try:
+            for step in steps:
+                if callable(step):
+                    step(dbapi_conn)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT OR REPLACE INTO schema_migrations (kind, version) VALUES (?, ?)", (kind, version)
+            )
+            dbapi_conn.commit()
+        except Exception:
+            dbapi_conn.rollback()
+            logger.exception(f"[Migrations] {kind} v{version} failed, database left at v{current}")
+            raise
+        finally:
+            cursor.close()
+        current = version
+        applied += 1
+
+    return applied
+
+def migrate_engine(engine, *kinds: str) -> int:
+    """Run pending migrations of one or more kinds through one of an engine's pooled connections."""
+    conn = engine.raw_connection()
+    try:
+        return sum(run_migrations(conn, kind) for kind in kinds)
+    finally:
+        conn.close()
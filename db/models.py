@@ -1,6 +1,6 @@
 # db/models.py
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, JSON, BigInteger, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, JSON, BigInteger, ForeignKey, Index
 from sqlalchemy.orm import declarative_base
 import datetime
 
@@ -34,7 +34,8 @@ class Stargate(Base):
 
 class MarketOrder(Base):
     __tablename__ = "market_orders"
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    generation = Column(Integer, primary_key=True, default=0)   # market_generations.generation, 0 = unversioned
     region_id = Column(Integer)
     type_id = Column(Integer)
     price = Column(Float)
@@ -43,18 +44,80 @@ class MarketOrder(Base):
     location_id = Column(Integer)
     last_seen = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_market_orders_region_type_side_price", "region_id", "type_id", "is_buy", "price"),
+        Index("ix_market_orders_type_side_price", "type_id", "is_buy", "price"),
+        Index("ix_market_orders_location_type", "location_id", "type_id"),
+        Index("ix_market_orders_generation_type_side_price", "generation", "type_id", "is_buy", "price"),
+    )
+
+class MarketGeneration(Base):
+    __tablename__ = "market_generations"
+    generation = Column(Integer, primary_key=True)
+    region_id = Column(Integer, index=True)
+    state = Column(String)                  # building, published, retired, failed
+    order_count = Column(Integer, default=0)
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    published_at = Column(DateTime)
+    retired_at = Column(DateTime)
+
+    __table_args__ = {"sqlite_autoincrement": True}     # never reuse a generation id
+
+class MarketCurrent(Base):
+    __tablename__ = "market_current"
+    region_id = Column(Integer, primary_key=True)
+    generation = Column(Integer)            # the published generation readers see
+    published_at = Column(DateTime)
+
 class RegionVolume(Base):
     __tablename__ = "region_volumes"
     region_id = Column(Integer, primary_key=True)
     volume = Column(Float)
     last_updated = Column(DateTime)
 
+class MarketPrice(Base):
+    """ESI /markets/prices/: CCP's average and adjusted price per type."""
+    __tablename__ = "market_prices"
+    type_id = Column(Integer, primary_key=True)
+    average_price = Column(Float)
+    adjusted_price = Column(Float)
+    updated_at = Column(DateTime)
+
 class TypeInfo(Base):
     __tablename__ = "type_info"
     type_id = Column(Integer, primary_key=True)
     name = Column(String)
     volume = Column(Float)
 
+class CrawlRun(Base):
+    __tablename__ = "crawl_runs"
+    run_id = Column(Integer, primary_key=True)
+    crawl = Column(String, index=True)      # "market", "contracts"
+    state = Column(String)                  # running, complete
+    region_count = Column(Integer)
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    finished_at = Column(DateTime)
+
+class CrawlCheckpoint(Base):
+    __tablename__ = "crawl_checkpoints"
+    crawl = Column(String, primary_key=True)
+    region_id = Column(Integer, primary_key=True)
+    run_id = Column(Integer)
+    state = Column(String)                  # running, done, not_modified, failed
+    pages_done = Column(Integer, default=0)
+    total_pages = Column(Integer)
+    generation = Column(Integer)            # market generation being built, if any
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class CrawlPage(Base):
+    __tablename__ = "crawl_pages"
+    crawl = Column(String, primary_key=True)
+    region_id = Column(Integer, primary_key=True)
+    page = Column(Integer, primary_key=True)
+    etag = Column(String)
+    run_id = Column(Integer)
+    completed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 class UserToon(Base):
     __tablename__ = "user_toons"
     character_id = Column(Integer, primary_key=True, index=True)
@@ -87,6 +150,27 @@ class MarketStructure(Base):
     region_id = Column(Integer, nullable=True)
     type_id = Column(Integer, nullable=True)
 
+class NameEntry(Base):
+    __tablename__ = "name_index"
+    category = Column(String, primary_key=True)     # ESI category: systems, regions, stations, inventory_types, ...
+    entity_id = Column(BigInteger, primary_key=True, index=True)
+    name = Column(String, index=True)
+    name_lower = Column(String, index=True)
+    source = Column(String)                         # "sde" or "esi"
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class EntityName(Base):
+    __tablename__ = "entity_names"
+    entity_id = Column(BigInteger, primary_key=True)
+    name = Column(String, nullable=True)            # None when ESI could not resolve the ID
+    category = Column(String)                       # ESI /universe/names/ category, or "structure"
+    expires_at = Column(DateTime, index=True)
+
+class UnresolvedName(Base):
+    __tablename__ = "unresolved_names"
+    name_lower = Column(String, primary_key=True)   # a name ESI /universe/ids/ returned nothing for
+    expires_at = Column(DateTime, index=True)
+
 # ──────── Private Database Models ────────────────────────────────────────────────
 
 class Token(PrivateBase):
@@ -105,6 +189,72 @@ class Asset(PrivateBase):
     location_id = Column(Integer)
     quantity = Column(Integer)
     location_flag = Column(Integer)
+    name = Column(String)                           # player-given name of a container or ship
+
+    __table_args__ = (
+        Index("ix_assets_character_location", "character_id", "location_id"),
+        Index("ix_assets_character_type", "character_id", "type_id"),
+        Index("ix_assets_location", "location_id"),
+    )
+
+class AssetChange(PrivateBase):
+    """One inserted, updated or deleted asset, as seen by a diff-based asset sync."""
+    __tablename__ = "asset_changes"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    character_id = Column(Integer)
+    generation = Column(Integer)                    # AssetSyncState.generation the change produced
+    item_id = Column(BigInteger)
+    type_id = Column(Integer)
+    change = Column(String)                         # added, updated, removed
+    old_location_id = Column(BigInteger)
+    new_location_id = Column(BigInteger)
+    old_quantity = Column(Integer)
+    new_quantity = Column(Integer)
+    old_flag = Column(String)
+    new_flag = Column(String)
+    changed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_asset_changes_character_generation", "character_id", "generation"),
+        Index("ix_asset_changes_item", "item_id"),
+        Index("ix_asset_changes_changed_at", "changed_at"),
+    )
+
+class AssetNode(PrivateBase):
+    """An asset's place in the location hierarchy; rebuilt per character after each asset sync."""
+    __tablename__ = "asset_tree"
+    item_id = Column(BigInteger, primary_key=True)
+    character_id = Column(Integer)
+    type_id = Column(Integer)
+    quantity = Column(Integer)
+    parent_item_id = Column(BigInteger)             # container or ship holding it, None at the top
+    root_location_id = Column(BigInteger)           # station, structure or solar system it ultimately sits in
+    root_location_kind = Column(String)             # station, structure, solar_system, other
+    depth = Column(Integer)                         # 0 for items directly in the root location
+
+    __table_args__ = (
+        Index("ix_asset_tree_root_type", "root_location_id", "type_id"),
+        Index("ix_asset_tree_character", "character_id"),
+        Index("ix_asset_tree_parent", "parent_item_id"),
+    )
+
+class AssetLocationRollup(PrivateBase):
+    """Quantity of each type per root location, summed over the owner's characters."""
+    __tablename__ = "asset_location_rollup"
+    root_location_id = Column(BigInteger, primary_key=True)
+    type_id = Column(Integer, primary_key=True)
+    root_location_kind = Column(String)
+    quantity = Column(BigInteger)
+    item_count = Column(Integer)
+    character_count = Column(Integer)
+
+class AssetSyncState(PrivateBase):
+    __tablename__ = "asset_sync_state"
+    character_id = Column(Integer, primary_key=True)
+    generation = Column(Integer, default=0)         # bumped whenever a sync changes anything
+    item_count = Column(Integer)
+    synced_at = Column(DateTime)
+    changed_at = Column(DateTime)
 
 class PersonalBookmark(PrivateBase):
     __tablename__ = "bookmarks"
@@ -135,6 +285,7 @@ class SkillQueueEntry(PrivateBase):
     queue_position = Column(Integer, primary_key=True)
     skill_id = Column(Integer)
     finish_level = Column(Integer)
+    start_date = Column(DateTime)                   # None while the queue is paused
     finish_date = Column(DateTime)
 
 class IngameSkillState(PrivateBase):
@@ -164,6 +315,11 @@ class IndustryJob(PrivateBase):
     start_date = Column(DateTime)
     end_date = Column(DateTime)
 
+    __table_args__ = (
+        Index("ix_industry_jobs_character_activity_end", "character_id", "activity_id", "end_date"),
+        Index("ix_industry_jobs_facility", "facility_id"),
+    )
+
 class WalletTransaction(PrivateBase):
     __tablename__ = "wallet_transactions"
     id = Column(BigInteger, primary_key=True)
@@ -173,3 +329,69 @@ class WalletTransaction(PrivateBase):
     ref_type = Column(String)
     context_id = Column(BigInteger)
     context_id_type = Column(Integer)
+
+    __table_args__ = (
+        Index("ix_wallet_transactions_character_date", "character_id", "date"),
+        Index("ix_wallet_transactions_character_ref_type_date", "character_id", "ref_type", "date"),
+    )
+
+class WalletDaily(PrivateBase):
+    """Journal entries aggregated per character, day and ref_type; maintained by store_wallet_journal."""
+    __tablename__ = "wallet_daily"
+    character_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    ref_type = Column(String, primary_key=True)     # '' for entries without one
+    total = Column(Float, default=0.0)
+    income = Column(Float, default=0.0)             # sum of positive amounts
+    expense = Column(Float, default=0.0)            # sum of negative amounts
+    count = Column(Integer, default=0)
+    min_amount = Column(Float)
+    max_amount = Column(Float)
+
+    __table_args__ = (
+        Index("ix_wallet_daily_day_ref_type", "day", "ref_type"),
+    )
+
+class MarketTransaction(PrivateBase):
+    __tablename__ = "market_transactions"
+    transaction_id = Column(BigInteger, primary_key=True)
+    character_id = Column(Integer)
+    date = Column(DateTime)
+    type_id = Column(Integer)
+    quantity = Column(Integer)
+    unit_price = Column(Float)
+    is_buy = Column(Boolean)
+    location_id = Column(BigInteger)
+    client_id = Column(Integer)
+    journal_ref_id = Column(BigInteger)
+    is_personal = Column(Boolean)
+
+    __table_args__ = (
+        Index("ix_market_transactions_character_id", "character_id", "transaction_id"),
+    )
+
+class FifoLot(PrivateBase):
+    __tablename__ = "fifo_lots"
+    character_id = Column(Integer, primary_key=True)
+    type_id = Column(Integer, primary_key=True)
+    transaction_id = Column(BigInteger, primary_key=True)     # the buy this open lot came from
+    date = Column(DateTime)
+    quantity = Column(Integer)                                  # units still unmatched
+    unit_price = Column(Float)
+
+class FifoProgress(PrivateBase):
+    __tablename__ = "fifo_progress"
+    character_id = Column(Integer, primary_key=True)
+    last_transaction_id = Column(BigInteger)                    # newest transaction already matched
+    updated_at = Column(DateTime)
+
+class RealizedPnl(PrivateBase):
+    __tablename__ = "realized_pnl"
+    character_id = Column(Integer, primary_key=True)
+    type_id = Column(Integer, primary_key=True)
+    day = Column(DateTime, primary_key=True)
+    quantity = Column(Integer, default=0)                       # units sold against matched buys
+    revenue = Column(Float, default=0.0)
+    cost = Column(Float, default=0.0)
+    profit = Column(Float, default=0.0)
+    unmatched_quantity = Column(Integer, default=0)             # units sold with no buy on record
@@ -0,0 +1,244 @@
+# db/order_archive.py
+
+import os
+import re
+import shutil
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+ORDER_ARCHIVE = os.getenv("EVE_ORDER_ARCHIVE", "0") == "1"
+ORDER_ARCHIVE_FOLDER = os.getenv("EVE_ORDER_ARCHIVE_FOLDER", os.path.join("_publicData", "order_archive"))
+
+# Retention tiers as "<max age>:<resolution>", youngest first. Snapshots younger than the first tier
+# stay uncompressed (memory-mappable); older ones are compressed to .npz and thinned to one snapshot
+# per resolution bucket; anything older than the last tier is deleted.
+ORDER_ARCHIVE_RETENTION = os.getenv("EVE_ORDER_ARCHIVE_RETENTION", "7d:raw,30d:1h,365d:1d")
+
+# One snapshot = these columns, sorted by (type_id, is_buy, price), plus a CSR index
+# (types, offsets) so a type's rows are the slice offsets[i]:offsets[i + 1].
+COLUMNS = {
+    "order_id": np.int64,
+    "type_id": np.int32,
+    "price": np.float64,
+    "volume": np.int64,
+    "is_buy": np.bool_,
+    "location_id": np.int64,
+}
+
+STAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+_STAMP_RE = re.compile(r"^(\d{8}T\d{6}Z)(\.npz)?$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# ──────── Retention Policy ────────────────────────────────────────────────────
+
+def _seconds(text: str) -> int:
+    return int(text[:-1]) * _UNITS[text[-1]]
+
+def parse_retention(spec: str = ORDER_ARCHIVE_RETENTION) -> list:
+    """Parse a retention spec into [(max_age_seconds, resolution_seconds or 0 for raw), ...]."""
+    tiers = []
+    for part in spec.split(","):
+        age, resolution = part.strip().split(":")
+        tiers.append((_seconds(age), 0 if resolution == "raw" else _seconds(resolution)))
+    if not tiers or [t[0] for t in tiers] != sorted(t[0] for t in tiers):
+        raise ValueError(f"Invalid order archive retention '{spec}', expected ascending '<age>:<resolution>' tiers")
+    return tiers
+
+# ──────── Paths ───────────────────────────────────────────────────────────────
+
+def _stamp(taken_at: datetime) -> str:
+    return taken_at.astimezone(timezone.utc).strftime(STAMP_FORMAT)
+
+def _parse_stamp(stamp: str) -> datetime:
+    return datetime.strptime(stamp, STAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def snapshot_path(region_id: int, taken_at: datetime, compressed: bool = False) -> str:
+    """<folder>/<region_id>/<YYYY-MM-DD>/<stamp>/ for raw snapshots, <stamp>.npz once compressed."""
+    taken_at = taken_at.astimezone(timezone.utc)
+    name = _stamp(taken_at) + (".npz" if compressed else "")
+    return os.path.join(ORDER_ARCHIVE_FOLDER, str(int(region_id)), taken_at.strftime("%Y-%m-%d"), name)
+
+def archived_regions() -> list:
+    if not os.path.isdir(ORDER_ARCHIVE_FOLDER):
+        return []
+    return sorted(int(d) for d in os.listdir(ORDER_ARCHIVE_FOLDER) if d.isdigit())
+
+def list_snapshots(region_id: int, start: datetime = None, end: datetime = None) -> list:
+    """Return [(taken_at, path, compressed), ...] for a region, oldest first, limited to [start, end]."""
+    region_dir = os.path.join(ORDER_ARCHIVE_FOLDER, str(int(region_id)))
+    if not os.path.isdir(region_dir):
+        return []
+
+    start = _as_utc(start) if start else None
+    end = _as_utc(end) if end else None
+    snapshots = []
+    for day in sorted(os.listdir(region_dir)):
+        # skip whole date partitions outside the range
+        if start and day < start.strftime("%Y-%m-%d"):
+            continue
+        if end and day > end.strftime("%Y-%m-%d"):
+            continue
+        day_dir = os.path.join(region_dir, day)
+        for entry in sorted(os.listdir(day_dir)):
+            match = _STAMP_RE.match(entry)
+            if not match:
+                continue
+            taken_at = _parse_stamp(match.group(1))
+            if (start and taken_at < start) or (end and taken_at > end):
+                continue
+            snapshots.append((taken_at, os.path.join(day_dir, entry), bool(match.group(2))))
+    return snapshots
+
+# ──────── Writing ─────────────────────────────────────────────────────────────
+
+def _build_columns(orders: list[dict]) -> dict:
+    """Turn ESI order dicts into sorted column arrays plus the types/offsets index."""
+    columns = {
+        "order_id": np.fromiter((o["order_id"] for o in orders), COLUMNS["order_id"], len(orders)),
+        "type_id": np.fromiter((o["type_id"] for o in orders), COLUMNS["type_id"], len(orders)),
+        "price": np.fromiter((o["price"] for o in orders), COLUMNS["price"], len(orders)),
+        "volume": np.fromiter((o["volume_remain"] for o in orders), COLUMNS["volume"], len(orders)),
+        "is_buy": np.fromiter((o["is_buy_order"] for o in orders), COLUMNS["is_buy"], len(orders)),
+        "location_id": np.fromiter((o["location_id"] for o in orders), COLUMNS["location_id"], len(orders)),
+    }
+    order = np.lexsort((columns["price"], columns["is_buy"], columns["type_id"]))
+    columns = {name: col[order] for name, col in columns.items()}
+
+    types, starts = np.unique(columns["type_id"], return_index=True)
+    columns["types"] = types
+    columns["offsets"] = np.append(starts, len(orders)).astype(np.int64)
+    return columns
+
+def _write_raw(path: str, columns: dict):
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, col in columns.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), col)
+    shutil.rmtree(path, ignore_errors=True)     # re-archiving the same second replaces it
+    os.replace(tmp, path)
+
+def _write_compressed(path: str, columns: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **columns)
+    os.replace(tmp, path)
+
+def archive_snapshot(region_id: int, orders: list[dict], taken_at: datetime = None) -> str:
+    """
+    Write one region's order book as a raw columnar snapshot and apply retention to that region.
+    Returns the snapshot path.
+    """
+    taken_at = _as_utc(taken_at or datetime.now(timezone.utc))
+    path = snapshot_path(region_id, taken_at)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_raw(path, _build_columns(orders))
+    logger.info(f"[OrderArchive] Region {region_id}: archived {len(orders)} orders at {_stamp(taken_at)}")
+
+    apply_retention(region_id, now=taken_at)
+    return path
+
+# ──────── Retention ───────────────────────────────────────────────────────────
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+def apply_retention(region_id: int, now: datetime = None, tiers: list = None) -> dict:
+    """
+    Compress, downsample and expire a region's snapshots according to the retention tiers.
+    Within a downsampled tier the first snapshot of each resolution bucket is kept.
+    """
+    now = _as_utc(now or datetime.now(timezone.utc))
+    tiers = tiers or parse_retention()
+    stats = {"compressed": 0, "dropped": 0}
+    kept_buckets = set()
+
+    for taken_at, path, compressed in list_snapshots(region_id):
+        age = (now - taken_at).total_seconds()
+        tier = next((t for t in tiers if age < t[0]), None)
+
+        if tier is None:
+            _remove(path)
+            stats["dropped"] += 1
+            continue
+
+        resolution = tier[1]
+        if resolution == 0:
+            continue
+
+        bucket = (resolution, int(taken_at.timestamp()) // resolution)
+        if bucket in kept_buckets:
+            _remove(path)
+            stats["dropped"] += 1
+            continue
+        kept_buckets.add(bucket)
+
+        if not compressed:
+            columns = {name: np.load(os.path.join(path, f"{name}.npy")) for name in (*COLUMNS, "types", "offsets")}
+            _write_compressed(snapshot_path(region_id, taken_at, compressed=True), columns)
+            shutil.rmtree(path)
+            stats["compressed"] += 1
+
+    # drop emptied date partitions
+    region_dir = os.path.join(ORDER_ARCHIVE_FOLDER, str(int(region_id)))
+    for day in os.listdir(region_dir) if os.path.isdir(region_dir) else ():
+        day_dir = os.path.join(region_dir, day)
+        if os.path.isdir(day_dir) and not os.listdir(day_dir):
+            os.rmdir(day_dir)
+
+    if stats["compressed"] or stats["dropped"]:
+        logger.info(f"[OrderArchive] Region {region_id}: compressed {stats['compressed']}, dropped {stats['dropped']}")
+    return stats
+
+# ──────── Reading ─────────────────────────────────────────────────────────────
+
+def _open_snapshot(path: str, compressed: bool) -> dict:
+    """Raw snapshots are memory-mapped (no copy); compressed ones are inflated column by column on access."""
+    if compressed:
+        return np.load(path)
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in (*COLUMNS, "types", "offsets")}
+
+def _select(columns, type_ids) -> dict:
+    """Slice the rows of the requested types out of a snapshot via its types/offsets index."""
+    if type_ids is None:
+        return {name: columns[name] for name in COLUMNS}
+
+    types, offsets = columns["types"], columns["offsets"]
+    wanted = np.asarray(sorted(set(type_ids)), dtype=types.dtype)
+    idx = np.searchsorted(types, wanted)
+    idx = idx[(idx < len(types)) & (types[np.minimum(idx, len(types) - 1)] == wanted)]
+
+    if len(idx) == 1:
+        # a single type is one contiguous slice: a view into the mapped file
+        lo, hi = offsets[idx[0]], offsets[idx[0] + 1]
+        return {name: columns[name][lo:hi] for name in COLUMNS}
+
+    rows = np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in idx]) if len(idx) else np.empty(0, np.int64)
+    return {name: columns[name][rows] for name in COLUMNS}
+
+def iter_order_books(type_ids=None, start: datetime = None, end: datetime = None, region_ids=None):
+    """
+    Yield (region_id, taken_at, columns) for every archived snapshot in [start, end],
+    with columns restricted to type_ids and sorted by (type_id, is_buy, price).
+    """
+    for region_id in region_ids if region_ids is not None else archived_regions():
+        for taken_at, path, compressed in list_snapshots(region_id, start, end):
+            yield region_id, taken_at, _select(_open_snapshot(path, compressed), type_ids)
+
+def load_order_books(type_ids=None, start: datetime = None, end: datetime = None, region_ids=None) -> list:
+    """Return iter_order_books() as a list, ordered by snapshot time."""
+    books = list(iter_order_books(type_ids, start, end, region_ids))
+    books.sort(key=lambda b: (b[1], b[0]))
+    return books
@@ -0,0 +1,282 @@
+# db/search_index.py
+
+import re
+import logging
+import threading
+from difflib import get_close_matches
+from difflib import SequenceMatcher
+
+from sqlalchemy import select, text
+
+from db.database import get_private_session, get_public_session
+from db.models import Asset, AssetNode, PersonalBookmark, NameEntry, Structure
+from util.names import TYPE_CATEGORY, resolve_ids_to_names
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+# Document kinds; a document's rowid is ref_id * KIND_SLOTS + code, so it can be replaced in place.
+KINDS = {"asset": 0, "bookmark": 1, "structure": 2}
+KIND_SLOTS = 4
+
+# bm25 column weights: name, detail
+NAME_WEIGHT, DETAIL_WEIGHT = 10.0, 1.0
+
+FUZZY_THRESHOLD = 0.7       # minimum similarity for a typo match
+FUZZY_CANDIDATES = 500      # trigram-overlap candidates re-ranked per fuzzy query
+MAX_RESULTS = 200
+HIT_FANOUT = 20             # raw hits fetched per result; stacks of the same item in one place collapse into one
+
+# owner_id -> set of words in the owner's index, for typos that share no trigram with the right word
+_vocab = {}
+_vocab_lock = threading.Lock()
+
+# IDs per "IN (...)" filter, under SQLite's bound-parameter limit
+ID_CHUNK = 500
+
+# ──────── Documents ───────────────────────────────────────────────────────────
+
+def _rowid(kind: str, ref_id: int) -> int:
+    return ref_id * KIND_SLOTS + KINDS[kind]
+
+def _type_names(type_ids) -> dict:
+    type_ids = sorted(set(type_ids))
+    names = {}
+    with get_public_session() as db:
+        for i in range(0, len(type_ids), ID_CHUNK):
+            names.update(db.execute(
+                select(NameEntry.entity_id, NameEntry.name)
+                .where(NameEntry.category == TYPE_CATEGORY, NameEntry.entity_id.in_(type_ids[i:i + ID_CHUNK]))
+            ).all())
+    return names
+
+def _forget_vocab(owner_id: int) -> None:
+    with _vocab_lock:
+        _vocab.pop(owner_id, None)
+
+def _write(db, owner_id: int, kind: str, docs: list) -> None:
+    """Replace documents given as (ref_id, name, detail)."""
+    _forget_vocab(owner_id)
+    if docs:
+        db.execute(
+            text("INSERT OR REPLACE INTO search_index (rowid, name, detail, kind, ref_id) "
+                 "VALUES (:rowid, :name, :detail, :kind, :ref_id)"),
+            [{"rowid": _rowid(kind, ref_id), "name": name, "detail": detail or "", "kind": kind, "ref_id": ref_id}
+             for ref_id, name, detail in docs],
+        )
+
+def unindex(owner_id: int, kind: str, ref_ids: list) -> None:
+    if not ref_ids:
+        return
+    _forget_vocab(owner_id)
+    with get_private_session(owner_id) as db:
+        db.execute(text("DELETE FROM search_index WHERE rowid = :rowid"),
+                   [{"rowid": _rowid(kind, r)} for r in ref_ids])
+        db.commit()
+
+# ──────── Indexing ────────────────────────────────────────────────────────────
+
+def index_assets(owner_id: int, character_id: int, item_ids: list = None) -> int:
+    """
+    (Re)index a character's assets, or only the given items. An asset is found by its type name
+    and, for containers and ships, by the name its owner gave it.
+    """
+    if item_ids is not None and not item_ids:
+        return 0
+
+    with get_private_session(owner_id) as db:
+        query = select(Asset.item_id, Asset.type_id, Asset.name).where(Asset.character_id == character_id)
+        if item_ids is None:
+            rows = db.execute(query).all()
+            db.execute(text("DELETE FROM search_index WHERE rowid IN "
+                            "(SELECT item_id * :slots + :code FROM assets WHERE character_id = :cid)"),
+                       {"slots": KIND_SLOTS, "code": KINDS["asset"], "cid": character_id})
+        else:
+            rows = []
+            for i in range(0, len(item_ids), ID_CHUNK):
+                rows.extend(db.execute(query.where(Asset.item_id.in_(item_ids[i:i + ID_CHUNK]))).all())
+
+        types = _type_names(r.type_id for r in rows)
+        docs = []
+        for item_id, type_id, name in rows:
+            type_name = types.get(type_id, f"Type {type_id}")
+            docs.append((item_id, name, type_name) if name else (item_id, type_name, None))
+        _write(db, owner_id, "asset", docs)
+        db.commit()
+
+    index_structures(owner_id)
+    return len(docs)
+
+def index_bookmarks(owner_id: int, character_id: int) -> int:
+    """Reindex a character's bookmarks by label and notes."""
+    with get_private_session(owner_id) as db:
+        rows = db.execute(
+            select(PersonalBookmark.bookmark_id, PersonalBookmark.label, PersonalBookmark.notes)
+            .where(PersonalBookmark.character_id == character_id)
+        ).all()
+        _write(db, owner_id, "bookmark", [(bookmark_id, label or "", notes) for bookmark_id, label, notes in rows])
+        db.commit()
+    return len(rows)
+
+def index_structures(owner_id: int) -> int:
+    """Index the names of the structures the owner has assets in."""
+    with get_private_session(owner_id) as db:
+        ids = [r for (r,) in db.execute(
+            select(AssetNode.root_location_id).where(AssetNode.root_location_kind == "structure").distinct()
+        )]
+    docs = []
+    with get_public_session() as db:
+        for i in range(0, len(ids), ID_CHUNK):
+            docs.extend(db.execute(
+                select(Structure.structure_id, Structure.name, Structure.solar_system_id)
+                .where(Structure.structure_id.in_(ids[i:i + ID_CHUNK]), Structure.name.isnot(None))
+            ).all())
+    with get_private_session(owner_id) as db:
+        _write(db, owner_id, "structure", [(sid, name, None) for sid, name, _ in docs])
+        db.commit()
+    return len(docs)
+
+def rebuild_search_index(owner_id: int) -> int:
+    """Rebuild every document of an owner's search index from the stored tables."""
+    with get_private_session(owner_id) as db:
+        db.execute(text("DELETE FROM search_index"))
+        db.commit()
+        _forget_vocab(owner_id)
+        asset_chars = [c for (c,) in db.execute(select(Asset.character_id).distinct())]
+        bookmark_chars = [c for (c,) in db.execute(select(PersonalBookmark.character_id).distinct())]
+    count = sum(index_assets(owner_id, c) for c in asset_chars)
+    count += sum(index_bookmarks(owner_id, c) for c in bookmark_chars)
+    count += index_structures(owner_id)
+    logger.info(f"[Search] Rebuilt search index for owner {owner_id}: {count} documents")
+    return count
+
+def _ensure_built(db, owner_id: int) -> None:
+    """Build the index on first use for a DB whose data predates it."""
+    if db.execute(text("SELECT 1 FROM search_index LIMIT 1")).first() is None \
+            and db.execute(select(Asset.item_id).limit(1)).first() is not None:
+        rebuild_search_index(owner_id)
+
+# ──────── Searching ───────────────────────────────────────────────────────────
+
+def _phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+def _similarity(query: str, candidate: str) -> float:
+    """Best match of the query against any same-length window of the candidate (1.0 for a substring)."""
+    query, candidate = query.lower(), candidate.lower()
+    if query in candidate:
+        return 1.0
+    size = len(query)
+    windows = {candidate[i:i + size] for i in range(max(1, len(candidate) - size + 1))}
+    windows.update(re.findall(r"\w+", candidate))
+    return max(SequenceMatcher(None, query, w).ratio() for w in windows)
+
+def _query(db, where: str, params: dict, limit: int) -> list:
+    return db.execute(text(
+        f"SELECT kind, ref_id, name, detail, bm25(search_index, {NAME_WEIGHT}, {DETAIL_WEIGHT}) AS rank "
+        f"FROM search_index WHERE {where} ORDER BY rank LIMIT :limit"
+    ), {**params, "limit": limit}).all()
+
+def _matches(db, owner_id: int, query: str, kinds: list, limit: int, fuzzy: bool) -> list:
+    """Return [(score, kind, ref_id, name, detail)], best first."""
+    kind_filter = ""
+    params = {}
+    if kinds:
+        kind_filter = " AND kind IN (" + ", ".join(f":k{i}" for i in range(len(kinds))) + ")"
+        params = {f"k{i}": k for i, k in enumerate(kinds)}
+
+    if len(query) < 3:
+        # trigrams need three characters; short queries are prefix scans
+        rows = db.execute(text(
+            "SELECT kind, ref_id, name, detail FROM search_index WHERE name LIKE :q" + kind_filter
+            + " ORDER BY length(name) LIMIT :limit"
+        ), {**params, "q": f"{query}%", "limit": limit}).all()
+        return [(1.0, *r) for r in rows]
+
+    found = {(r[0], r[1]): (1.0, *r[:4]) for r in
+             _query(db, "search_index MATCH :q" + kind_filter, {**params, "q": _phrase(query)}, limit)}
+    if not fuzzy or len(found) >= limit:
+        return list(found.values())
+
+    # typo tolerance: any shared trigram makes a candidate, as does any indexed word close to the
+    # query (catches typos like "orka" that share no trigram with "orca"); re-ranked by similarity
+    lower = query.lower()
+    terms = {lower[i:i + 3] for i in range(len(lower) - 2)}
+    terms.update(get_close_matches(lower, _words(db, owner_id), n=5, cutoff=FUZZY_THRESHOLD))
+    candidates = _query(db, "search_index MATCH :q" + kind_filter,
+                        {**params, "q": " OR ".join(_phrase(t) for t in terms)}, FUZZY_CANDIDATES)
+    scored = []
+    for kind, ref_id, name, detail, _ in candidates:
+        if (kind, ref_id) in found:
+            continue
+        score = max(_similarity(query, name), _similarity(query, detail) if detail else 0.0)
+        if score >= FUZZY_THRESHOLD:
+            scored.append((score, kind, ref_id, name, detail))
+    scored.sort(key=lambda r: -r[0])
+    return list(found.values()) + scored[:limit - len(found)]
+
+def _words(db, owner_id: int) -> list:
+    with _vocab_lock:
+        words = _vocab.get(owner_id)
+    if words is None:
+        words = set()
+        for name, detail in db.execute(text("SELECT DISTINCT name, detail FROM search_index")):
+            words.update(re.findall(r"\w{3,}", f"{name} {detail}".lower()))
+        with _vocab_lock:
+            _vocab[owner_id] = words
+    return list(words)
+
+def _hydrate(db, matches: list) -> list:
+    """Attach where each hit is: owning character, root location and container for assets."""
+    assets = [m[2] for m in matches if m[1] == "asset"]
+    bookmarks = [m[2] for m in matches if m[1] == "bookmark"]
+    nodes, marks = {}, {}
+    for i in range(0, len(assets), ID_CHUNK):
+        nodes.update({n.item_id: n for n in db.scalars(select(AssetNode).where(AssetNode.item_id.in_(assets[i:i + ID_CHUNK])))})
+    for i in range(0, len(bookmarks), ID_CHUNK):
+        marks.update({b.bookmark_id: b for b in db.scalars(
+            select(PersonalBookmark).where(PersonalBookmark.bookmark_id.in_(bookmarks[i:i + ID_CHUNK])))})
+
+    results = []
+    stacks = {}     # identical assets in the same place -> their merged hit
+    for score, kind, ref_id, name, detail in matches:
+        hit = {"kind": kind, "id": ref_id, "name": name, "detail": detail or None, "score": round(score, 3)}
+        if kind == "asset" and ref_id in nodes:
+            node = nodes[ref_id]
+            place = (name, detail, node.character_id, node.parent_item_id, node.root_location_id)
+            if place in stacks:
+                stacks[place]["quantity"] += node.quantity or 0
+                stacks[place]["items"] += 1
+                continue
+            hit.update({"character_id": node.character_id, "type_id": node.type_id, "quantity": node.quantity or 0,
+                        "items": 1, "container_id": node.parent_item_id, "location_id": node.root_location_id})
+            stacks[place] = hit
+        elif kind == "bookmark" and ref_id in marks:
+            hit.update({"character_id": marks[ref_id].character_id, "location_id": marks[ref_id].location_id})
+        elif kind == "structure":
+            hit["location_id"] = ref_id
+        results.append(hit)
+
+    location_names = resolve_ids_to_names({h["location_id"] for h in results if h.get("location_id")})
+    for hit in results:
+        if hit.get("location_id"):
+            hit["location_name"] = location_names.get(hit["location_id"])
+    return results
+
+def search(owner_id: int, query: str, kinds: list = None, limit: int = 50, fuzzy: bool = True) -> list:
+    """
+    Search an owner's assets (by type or given name), bookmarks (label, notes) and structures,
+    across all their characters. Substring matches come first, then typo-tolerant ones.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    unknown = [k for k in kinds or [] if k not in KINDS]
+    if unknown:
+        raise ValueError(f"Unknown kind(s) {unknown}, expected some of {list(KINDS)}")
+
+    limit = max(1, min(limit, MAX_RESULTS))
+    with get_private_session(owner_id) as db:
+        _ensure_built(db, owner_id)
+        return _hydrate(db, _matches(db, owner_id, query, kinds, limit * HIT_FANOUT, fuzzy))[:limit]
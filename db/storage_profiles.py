@@ -0,0 +1,64 @@
+# db/storage_profiles.py
+
+import os
+import sqlite3
+import logging
+from sqlalchemy import event
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+# Named PRAGMA sets. WAL lets readers keep going while a fetcher writes, and
+# synchronous=NORMAL only fsyncs at checkpoints instead of on every commit. EVE_SQLITE_PROFILE
+# picks the default; market shards and the public bulk writers (get_public_ingest_session) use "ingest".
+PROFILES = {
+    "serving": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,           # negative = KiB, i.e. 64 MiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "ingest": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -256 * 1024,          # 256 MiB for large merges and index builds
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+        "wal_autocheckpoint": 10000,        # pages; fewer, larger checkpoints during bulk writes
+    },
+}
+
+DEFAULT_PROFILE = os.getenv("EVE_SQLITE_PROFILE", "serving")
+
+# ──────── Profile Application ─────────────────────────────────────────────────
+
+def apply_profile(dbapi_conn, profile: str = None):
+    """Apply a named storage profile's PRAGMAs to an open DBAPI (sqlite3) connection."""
+    name = profile or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown SQLite storage profile '{name}', expected one of {sorted(PROFILES)}")
+
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma, value in PROFILES[name].items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+def attach_profile(engine, profile: str = None):
+    """Apply a storage profile to every new connection an engine opens."""
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, connection_record):
+        apply_profile(dbapi_conn, profile)
+
+    return engine
+
+def connect_sqlite(path: str, profile: str = None, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect() with a storage profile applied."""
+    conn = sqlite3.connect(path, **kwargs)
+    apply_profile(conn, profile)
+    return conn
@@ -1,8 +1,8 @@
 # db/toon_map.py
 
 import os
-import sqlite3
 import logging
+from db.storage_profiles import connect_sqlite
 
 # ──────── Setup ─────────────────────────────────────────────────────────────
 logger = logging.getLogger(__name__)
@@ -12,7 +12,7 @@ PUBLIC_DB = os.getenv("EVE_PUBLIC_DATABASE_FILE", "_publicData/public.db")
 
 def ensure_user_toons_table():
     """Ensure the 'user_toons' table exists in the public database."""
-    with sqlite3.connect(PUBLIC_DB) as conn:
+    with connect_sqlite(PUBLIC_DB) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS user_toons (
@@ -26,7 +26,7 @@ def ensure_user_toons_table():
 def insert_user_toon(character_id: int, owner_id: int):
     """Insert or update a character-to-owner mapping."""
     ensure_user_toons_table()
-    with sqlite3.connect(PUBLIC_DB) as conn:
+    with connect_sqlite(PUBLIC_DB) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             INSERT OR REPLACE INTO user_toons (character_id, owner_id)
@@ -38,7 +38,7 @@ def insert_user_toon(character_id: int, owner_id: int):
 def get_linked_toons(owner_id: int) -> list:
     """Return a list of character IDs linked to a specific owner."""
     ensure_user_toons_table()
-    with sqlite3.connect(PUBLIC_DB) as conn:
+    with connect_sqlite(PUBLIC_DB) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT character_id FROM user_toons WHERE owner_id = ?
@@ -48,10 +48,23 @@ def get_linked_toons(owner_id: int) -> list:
     logger.debug(f"[ToonMap] Found {len(toon_list)} toons linked to owner {owner_id}")
     return toon_list
 
+def get_all_owners() -> dict:
+    """Return { owner_id: [character_id, ...] } for every owner in user_toons."""
+    ensure_user_toons_table()
+    with connect_sqlite(PUBLIC_DB) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT owner_id, character_id FROM user_toons ORDER BY owner_id, character_id")
+        rows = cursor.fetchall()
+    owners = {}
+    for owner_id, character_id in rows:
+        owners.setdefault(owner_id, []).append(character_id)
+    logger.debug(f"[ToonMap] Found {len(owners)} owners with {len(rows)} toons")
+    return owners
+
 def get_owner_for_character(character_id: int) -> int:
     """Given a character ID, return the associated owner ID."""
     ensure_user_toons_table()
-    with sqlite3.connect(PUBLIC_DB) as conn:
+    with connect_sqlite(PUBLIC_DB) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT owner_id FROM user_toons WHERE character_id = ?
@@ -0,0 +1,315 @@
+# fetchers/private/fleet_refresh.py
+
+"""
+Refresh private data for every owner in user_toons from one asyncio event loop.
+
+    python -m fetchers.private.fleet_refresh [--owners 1,2] [--endpoints assets,wallet]
+                                             [--concurrency 200] [--per-character 4] [--rate 150] [--json]
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+if __name__ == "__main__":
+    # as a CLI, config.yaml must be in os.environ before the imports below read their settings
+    from util.config import load_config
+    load_config()
+
+import aiohttp
+
+from db.toon_map import get_all_owners
+from util.utils import get_token
+from util.token_manager import token_manager
+from fetchers.private.refresh_owner import ENDPOINTS
+from fetchers.private.personal_wallet import latest_journal_id
+from fetchers.private.personal_assets import ASSET_NAMES_BATCH, parse_asset_names, attach_asset_names
+from fetchers.private.personal_transactions import latest_transaction_id
+
+logger = logging.getLogger(__name__)
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+ESI = "https://esi.evetech.net/latest"
+
+FLEET_CONCURRENCY = int(os.getenv("EVE_FLEET_CONCURRENCY", "200"))     # requests in flight, all characters
+FLEET_PER_CHARACTER = int(os.getenv("EVE_FLEET_PER_CHARACTER", "4"))   # requests in flight per character
+FLEET_RATE = float(os.getenv("EVE_FLEET_RATE", "150"))                 # requests started per second
+FLEET_WRITERS = int(os.getenv("EVE_FLEET_WRITERS", "4"))               # threads writing owner DBs
+
+MAX_RETRIES = 4
+ERROR_LIMIT_FLOOR = 10      # pause everything when ESI's error budget drops this low
+MAX_REPORTED_FAILURES = 50
+
+# ──────── Async HTTP ──────────────────────────────────────────────────────────
+
+class AsyncRateLimiter:
+    """Token bucket for coroutines: at most `rate` acquisitions per second."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class FleetClient:
+    """Authenticated ESI GETs under global and per-character concurrency limits and a global rate limit."""
+
+    def __init__(self, session: aiohttp.ClientSession, concurrency: int, per_character: int, rate: float):
+        self.session = session
+        self.in_flight = asyncio.Semaphore(concurrency)
+        self.per_character = defaultdict(lambda: asyncio.Semaphore(per_character))
+        self.limiter = AsyncRateLimiter(rate)
+        self.paused_until = 0.0
+        self.stats = Counter()
+
+    def _track_error_limit(self, headers):
+        remain = headers.get("X-ESI-Error-Limit-Remain")
+        reset = headers.get("X-ESI-Error-Limit-Reset")
+        if remain is not None and reset is not None and int(remain) < ERROR_LIMIT_FLOOR:
+            self.paused_until = max(self.paused_until, time.monotonic() + int(reset) + 1)
+            logger.warning(f"[FleetRefresh] ESI error budget at {remain}, pausing for {reset}s")
+
+    async def get(self, owner_id: int, char_id: int, path: str, params: dict = None) -> tuple:
+        """Return (json, headers) for one ESI GET, retrying rate limits and gateway errors."""
+        return await self.request("GET", owner_id, char_id, path, params)
+
+    async def post(self, owner_id: int, char_id: int, path: str, body) -> tuple:
+        return await self.request("POST", owner_id, char_id, path, body=body)
+
+    async def request(self, method: str, owner_id: int, char_id: int, path: str,
+                      params: dict = None, body=None) -> tuple:
+        backoff = 1
+        async with self.per_character[char_id], self.in_flight:
+            for attempt in range(1, MAX_RETRIES + 1):
+                delay = self.paused_until - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.limiter.acquire()
+
+                # Resolved per attempt: in a large fleet a request can start long after it was queued,
+                # past the ~20 minute token lifetime. The token manager refreshes it (once) if needed.
+                access_token = await asyncio.get_running_loop().run_in_executor(
+                    None, token_manager.access_token, owner_id, char_id
+                )
+                headers = {"Authorization": f"Bearer {access_token}", "Accept": "application/json"}
+
+                async with self.session.request(method, f"{ESI}{path}", headers=headers, params=params, json=body) as resp:
+                    self.stats["requests"] += 1
+                    self._track_error_limit(resp.headers)
+                    if resp.status in (420, 429, 502, 503, 504) and attempt < MAX_RETRIES:
+                        self.stats["retries"] += 1
+                        await asyncio.sleep(backoff)
+                        backoff *= 2
+                        continue
+                    resp.raise_for_status()
+                    return await resp.json(), resp.headers
+
+    async def get_paged(self, owner_id: int, char_id: int, path: str) -> list:
+        """Fetch page 1, then the remaining X-Pages concurrently."""
+        first, headers = await self.get(owner_id, char_id, path, {"page": 1})
+        pages = int(headers.get("X-Pages", 1))
+        rest = await asyncio.gather(*(self.get(owner_id, char_id, path, {"page": p}) for p in range(2, pages + 1)))
+        for data, _ in rest:
+            first.extend(data)
+        return first
+
+# ──────── Endpoint Fetchers ───────────────────────────────────────────────────
+
+async def _fetch_assets(client, owner_id, char_id):
+    assets = await client.get_paged(owner_id, char_id, f"/characters/{char_id}/assets/")
+    singletons = [a["item_id"] for a in assets if a.get("is_singleton")]
+    named = await asyncio.gather(*(
+        client.post(owner_id, char_id, f"/characters/{char_id}/assets/names/", singletons[i:i + ASSET_NAMES_BATCH])
+        for i in range(0, len(singletons), ASSET_NAMES_BATCH)
+    ))
+    attach_asset_names(assets, {k: v for data, _ in named for k, v in parse_asset_names(data).items()})
+    return assets
+
+async def _fetch_wallet(client, owner_id, char_id):
+    """Newest pages first, stopping at the first page that reaches an already-stored journal ID."""
+    since_id = await asyncio.get_running_loop().run_in_executor(None, latest_journal_id, owner_id, char_id)
+    path = f"/characters/{char_id}/wallet/journal/"
+    entries, page = [], 1
+    while True:
+        data, headers = await client.get(owner_id, char_id, path, {"page": page})
+        new = [e for e in data if since_id is None or e["id"] > since_id]
+        entries.extend(new)
+        if len(new) < len(data) or page >= int(headers.get("X-Pages", 1)):
+            return entries
+        page += 1
+
+async def _fetch_transactions(client, owner_id, char_id):
+    """Walk from_id batches backwards until one reaches an already-stored transaction ID."""
+    since_id = await asyncio.get_running_loop().run_in_executor(None, latest_transaction_id, owner_id, char_id)
+    path = f"/characters/{char_id}/wallet/transactions/"
+    transactions, params = [], None
+    while True:
+        data, _ = await client.get(owner_id, char_id, path, params)
+        new = [t for t in data if since_id is None or t["transaction_id"] > since_id]
+        transactions.extend(new)
+        if not new or len(new) < len(data):
+            return transactions
+        params = {"from_id": min(t["transaction_id"] for t in data) - 1}
+
+async def _fetch_skills(client, owner_id, char_id):
+    (skills, _), (queue, _) = await asyncio.gather(
+        client.get(owner_id, char_id, f"/characters/{char_id}/skills/"),
+        client.get(owner_id, char_id, f"/characters/{char_id}/skillqueue/"),
+    )
+    return skills.get("skills", []), queue
+
+async def _fetch_industry(client, owner_id, char_id):
+    return (await client.get(owner_id, char_id, f"/characters/{char_id}/industry/jobs/"))[0]
+
+async def _fetch_bookmarks(client, owner_id, char_id):
+    return (await client.get(owner_id, char_id, f"/characters/{char_id}/bookmarks/"))[0]
+
+# Same endpoint names and data shapes as refresh_owner.ENDPOINTS, whose store functions are reused.
+ASYNC_FETCHERS = {
+    "assets": _fetch_assets,
+    "wallet": _fetch_wallet,
+    "transactions": _fetch_transactions,
+    "skills": _fetch_skills,
+    "industry": _fetch_industry,
+    "bookmarks": _fetch_bookmarks,
+}
+
+# ──────── Fleet Refresh ───────────────────────────────────────────────────────
+
+def _item_count(data) -> int:
+    return sum(len(d) for d in data) if isinstance(data, tuple) else len(data)
+
+async def refresh_fleet(owner_ids: list = None, endpoints: list = None, concurrency: int = FLEET_CONCURRENCY,
+                        per_character: int = FLEET_PER_CHARACTER, rate: float = FLEET_RATE) -> dict:
+    """Refresh every (owner, character, endpoint) and return one aggregate report."""
+    names = endpoints or list(ASYNC_FETCHERS)
+    unknown = [n for n in names if n not in ASYNC_FETCHERS]
+    if unknown:
+        raise ValueError(f"Unknown endpoint(s) {unknown}, expected some of {list(ASYNC_FETCHERS)}")
+
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    owners = owner_ids or list(get_all_owners())
+
+    # Tokens come from the (thread-safe, cached) token manager; load all owners in parallel. Only the
+    # character list is used here: each request fetches its access token when it is actually sent.
+    token_sets = await asyncio.gather(
+        *(loop.run_in_executor(None, get_token, owner_id) for owner_id in owners), return_exceptions=True
+    )
+
+    by_endpoint = {name: Counter() for name in names}
+    failures = []
+    writers = ThreadPoolExecutor(max_workers=FLEET_WRITERS, thread_name_prefix="fleet-writer")
+    owner_locks = defaultdict(asyncio.Lock)     # one writer per owner DB at a time
+
+    def fail(owner_id, char_id, name, stage, error):
+        if name:
+            by_endpoint[name]["failed"] += 1
+        if len(failures) < MAX_REPORTED_FAILURES:
+            failures.append({"owner_id": owner_id, "character_id": char_id, "endpoint": name,
+                             "stage": stage, "error": str(error)})
+
+    async def run(client, owner_id, char_id, name):
+        t0 = time.perf_counter()
+        try:
+            data = await ASYNC_FETCHERS[name](client, owner_id, char_id)
+        except Exception as e:
+            fail(owner_id, char_id, name, "fetch", e)
+            return
+        by_endpoint[name]["fetch_ms"] += int((time.perf_counter() - t0) * 1000)
+        by_endpoint[name]["items"] += _item_count(data)
+
+        async with owner_locks[owner_id]:
+            try:
+                await loop.run_in_executor(writers, ENDPOINTS[name]["store"], owner_id, char_id, data)
+            except Exception as e:
+                fail(owner_id, char_id, name, "store", e)
+                return
+        by_endpoint[name]["ok"] += 1
+
+    tasks = []
+    characters = 0
+    timeout = aiohttp.ClientTimeout(total=120)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        client = FleetClient(session, concurrency, per_character, rate)
+        for owner_id, tokens in zip(owners, token_sets):
+            if isinstance(tokens, Exception):
+                fail(owner_id, None, None, "token", tokens)
+                continue
+            characters += len(tokens)
+            for char_id in tokens:
+                for name in names:
+                    tasks.append(run(client, owner_id, char_id, name))
+        logger.info(f"[FleetRefresh] {len(tasks)} tasks over {characters} characters of {len(owners)} owners")
+        await asyncio.gather(*tasks)
+
+    writers.shutdown(wait=True)
+    elapsed = time.perf_counter() - started
+    return {
+        "owners": len(owners),
+        "characters": characters,
+        "tasks": len(tasks),
+        "ok": sum(c["ok"] for c in by_endpoint.values()),
+        "failed": sum(c["failed"] for c in by_endpoint.values()),
+        "requests": client.stats["requests"],
+        "retries": client.stats["retries"],
+        "elapsed_s": round(elapsed, 3),
+        "by_endpoint": {name: dict(c) for name, c in by_endpoint.items()},
+        "failures": failures,
+    }
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Fleet refresh: {report['owners']} owners, {report['characters']} characters, {report['tasks']} tasks "
+        f"in {report['elapsed_s']:.1f}s ({report['requests']} requests, {report['retries']} retries)",
+        f"  ok {report['ok']}  failed {report['failed']}",
+    ]
+    for name, c in report["by_endpoint"].items():
+        lines.append(f"  {name:<10} ok {c.get('ok', 0):>6}  failed {c.get('failed', 0):>5}  items {c.get('items', 0):>9}")
+    for f in report["failures"]:
+        lines.append(f"  ! owner {f['owner_id']} char {f['character_id']} {f['endpoint']} ({f['stage']}): {f['error']}")
+    return "\n".join(lines)
+
+# ──────── CLI ─────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh private ESI data for every owner")
+    parser.add_argument("--owners", help="comma-separated owner IDs (default: all in user_toons)")
+    parser.add_argument("--endpoints", help=f"comma-separated subset of {','.join(ASYNC_FETCHERS)}")
+    parser.add_argument("--concurrency", type=int, default=FLEET_CONCURRENCY)
+    parser.add_argument("--per-character", type=int, default=FLEET_PER_CHARACTER)
+    parser.add_argument("--rate", type=float, default=FLEET_RATE)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(refresh_fleet(
+        owner_ids=[int(o) for o in args.owners.split(",")] if args.owners else None,
+        endpoints=args.endpoints.split(",") if args.endpoints else None,
+        concurrency=args.concurrency,
+        per_character=args.per_character,
+        rate=args.rate,
+    ))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+if __name__ == "__main__":
+    main()
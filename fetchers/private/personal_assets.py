@@ -1,16 +1,29 @@
 # fetchers/private/personal_assets.py
 
+import os
 import requests
 import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from util.utils import get_token
 from db.database import get_private_session
-from db.models import Asset
+from db.models import Asset, AssetChange, AssetSyncState
+from db.asset_tree import build_asset_tree
+from db.search_index import index_assets, unindex
 
 logger = logging.getLogger(__name__)
 
 ESI = "https://esi.evetech.net/latest"
 
+ASSET_NAMES_BATCH = 1000     # item IDs per /assets/names/ call
+
+ASSET_CHANGE_RETENTION = int(os.getenv("EVE_ASSET_CHANGE_RETENTION", "30"))     # days of change log kept
+
+# IDs per "IN (...)" delete, under SQLite's bound-parameter limit
+ID_CHUNK = 500
+
 # ──────── Fetching ─────────────────────────────────────────────────────────────
 
 def fetch_assets(char_id: int, access_token: str) -> list:
@@ -35,28 +48,153 @@ def fetch_assets(char_id: int, access_token: str) -> list:
         else:
             break
 
+    attach_asset_names(assets, fetch_asset_names(char_id, access_token, [a["item_id"] for a in assets if a.get("is_singleton")]))
     return assets
 
-# ──────── Storage ───────────────────────────────────────────────────────────────
-
-def store_assets(owner_id: int, char_id: int, assets: list):
-    """Store assets into owner's private database."""
-    db = get_private_session(owner_id)
+def fetch_asset_names(char_id: int, access_token: str, item_ids: list) -> dict:
+    """Return { item_id: name } for the items (containers, ships) a player has named."""
+    headers = {"Authorization": f"Bearer {access_token}"}
+    names = {}
+    for i in range(0, len(item_ids), ASSET_NAMES_BATCH):
+        resp = requests.post(f"{ESI}/characters/{char_id}/assets/names/", headers=headers,
+                             json=item_ids[i:i + ASSET_NAMES_BATCH])
+        resp.raise_for_status()
+        names.update(parse_asset_names(resp.json()))
+    return names
 
-    db.query(Asset).filter_by(character_id=char_id).delete()
+def parse_asset_names(entries: list) -> dict:
+    # ESI answers "None" for items that can be named but weren't
+    return {e["item_id"]: e["name"] for e in entries if e.get("name") and e["name"] != "None"}
 
+def attach_asset_names(assets: list, names: dict) -> None:
     for asset in assets:
-        db.add(Asset(
-            item_id=asset["item_id"],
-            character_id=char_id,
-            type_id=asset["type_id"],
-            location_id=asset["location_id"],
-            quantity=asset.get("quantity", 1),
-            location_flag=asset.get("location_flag", None),
+        if asset["item_id"] in names:
+            asset["name"] = names[asset["item_id"]]
+
+# ──────── Storage ───────────────────────────────────────────────────────────────
+
+def _diff_assets(stored: dict, incoming: dict) -> tuple:
+    """Return (added, updated, removed) item IDs between two { item_id: (type_id, location_id, quantity, flag, name) }."""
+    added = [i for i in incoming if i not in stored]
+    removed = [i for i in stored if i not in incoming]
+    updated = [i for i, row in incoming.items() if i in stored and stored[i] != row]
+    return added, updated, removed
+
+def store_assets(owner_id: int, char_id: int, assets: list) -> dict:
+    """
+    Sync a character's assets to a fresh ESI listing. Only inserted, changed and removed items are
+    written (in bulk, one transaction), each one is recorded in asset_changes, and the character's
+    asset generation is bumped and its asset tree rebuilt in that same transaction when anything changed. Returns the change counts.
+    """
+    now = datetime.utcnow()
+    incoming = {
+        a["item_id"]: (a["type_id"], a["location_id"], a.get("quantity", 1), a.get("location_flag"), a.get("name"))
+        for a in assets
+    }
+
+    with get_private_session(owner_id) as db:
+        stored = {
+            r[0]: tuple(r[1:]) for r in db.execute(
+                select(Asset.item_id, Asset.type_id, Asset.location_id, Asset.quantity, Asset.location_flag, Asset.name)
+                .where(Asset.character_id == char_id)
+            )
+        }
+        added, updated, removed = _diff_assets(stored, incoming)
+
+        state = db.get(AssetSyncState, char_id)
+        first_sync = state is None
+        if first_sync:
+            state = AssetSyncState(character_id=char_id, generation=0)
+            db.add(state)
+        state.item_count = len(incoming)
+        state.synced_at = now
+
+        if added or updated or removed:
+            state.generation = (state.generation or 0) + 1
+            state.changed_at = now
+
+            def row(item_id):
+                type_id, location_id, quantity, flag, name = incoming[item_id]
+                return {"item_id": item_id, "character_id": char_id, "type_id": type_id,
+                        "location_id": location_id, "quantity": quantity, "location_flag": flag, "name": name}
+
+            if added:
+                # an item handed over from another of the owner's characters already has a row
+                insert = sqlite_insert(Asset)
+                db.execute(insert.on_conflict_do_update(
+                    index_elements=["item_id"],
+                    set_={c: insert.excluded[c] for c in ("character_id", "type_id", "location_id", "quantity", "location_flag", "name")},
+                ), [row(i) for i in added])
+            if updated:
+                db.execute(update(Asset), [row(i) for i in updated])
+            for i in range(0, len(removed), ID_CHUNK):
+                db.execute(delete(Asset).where(Asset.item_id.in_(removed[i:i + ID_CHUNK])))
+
+            def change(kind, item_id, old, new):
+                return {
+                    "character_id": char_id, "generation": state.generation, "item_id": item_id,
+                    "type_id": (new or old)[0], "change": kind, "changed_at": now,
+                    "old_location_id": old and old[1], "new_location_id": new and new[1],
+                    "old_quantity": old and old[2], "new_quantity": new and new[2],
+                    "old_flag": old and old[3], "new_flag": new and new[3],
+                }
+
+            db.execute(sqlite_insert(AssetChange), (
+                [change("added", i, None, incoming[i]) for i in added]
+                + [change("updated", i, stored[i], incoming[i]) for i in updated]
+                + [change("removed", i, stored[i], None) for i in removed]
+            ))
+
+        db.execute(delete(AssetChange).where(AssetChange.changed_at < now - timedelta(days=ASSET_CHANGE_RETENTION)))
+        # same transaction as the generation bump, so a reader never sees a new generation with the old tree
+        if added or updated or removed or first_sync:
+            build_asset_tree(owner_id, char_id, db)
+        db.commit()
+
+    if added or updated or removed or first_sync:
+        if first_sync:
+            index_assets(owner_id, char_id)
+        else:
+            index_assets(owner_id, char_id, added + updated)
+            unindex(owner_id, "asset", removed)
+
+    unchanged = len(incoming) - len(added) - len(updated)
+    counts = {"added": len(added), "updated": len(updated), "removed": len(removed), "unchanged": unchanged}
+    logger.debug(f"[Assets] {char_id}: {counts}")
+    return counts
+
+def asset_generation(owner_id: int, character_id: int = None):
+    """
+    Return a character's asset generation, or for character_id=None a tuple of (character_id,
+    generation) over the owner's characters; either changes whenever the assets do.
+    """
+    with get_private_session(owner_id) as db:
+        if character_id is not None:
+            state = db.get(AssetSyncState, character_id)
+            return state.generation if state else 0
+        return tuple(tuple(r) for r in db.execute(
+            select(AssetSyncState.character_id, AssetSyncState.generation).order_by(AssetSyncState.character_id)
         ))
 
-    db.commit()
-    db.close()
+def asset_changes(owner_id: int, character_id: int = None, since_generation: int = None, limit: int = 1000) -> list:
+    """Return logged asset changes, newest first (for one character, optionally after a generation)."""
+    query = select(AssetChange)
+    if character_id is not None:
+        query = query.where(AssetChange.character_id == character_id)
+        if since_generation is not None:
+            query = query.where(AssetChange.generation > since_generation)
+
+    with get_private_session(owner_id) as db:
+        return [
+            {
+                "character_id": c.character_id, "generation": c.generation, "item_id": c.item_id,
+                "type_id": c.type_id, "change": c.change, "changed_at": c.changed_at.isoformat(),
+                "old_location_id": c.old_location_id, "new_location_id": c.new_location_id,
+                "old_quantity": c.old_quantity, "new_quantity": c.new_quantity,
+                "old_flag": c.old_flag, "new_flag": c.new_flag,
+            }
+            for c in db.scalars(query.order_by(AssetChange.id.desc()).limit(limit))
+        ]
 
 # ──────── Orchestrator ───────────────────────────────────────────────────────────
 
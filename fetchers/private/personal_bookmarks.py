@@ -7,6 +7,7 @@ from datetime import datetime
 from util.utils import get_token
 from db.database import get_private_session
 from db.models import PersonalBookmark
+from db.search_index import index_bookmarks
 
 logger = logging.getLogger(__name__)
 
@@ -33,18 +34,19 @@ def store_bookmarks(owner_id: int, char_id: int, bookmarks: list):
             bookmark_id     = bm["bookmark_id"],
             character_id    = char_id,
             created         = datetime.fromisoformat(bm["created"].replace("Z", "+00:00")),
-            creator_id      = bm["creator_id"],
+            folder_id       = bm.get("folder_id"),
+            item_id         = bm.get("item", {}).get("item_id"),
             label           = bm.get("label", ""),
             location_id     = bm["location_id"],
             notes           = bm.get("notes", ""),
-            x               = bm.get("coordinates", {}).get("x"),
-            y               = bm.get("coordinates", {}).get("y"),
-            z               = bm.get("coordinates", {}).get("z"),
+            coordinates     = bm.get("coordinates"),
         ))
 
     db.commit()
     db.close()
 
+    index_bookmarks(owner_id, char_id)
+
 # ──────── Orchestrator ───────────────────────────────────────────────────────────
 
 def update_personal_bookmarks(owner_id: int) -> None:
@@ -3,10 +3,12 @@
 import requests
 import logging
 from datetime import datetime
+from sqlalchemy import select, insert, update, delete
 
 from db.database import get_private_session
 from db.models import SkillRaw, SkillQueueEntry, IngameSkillState
 from util.utils import get_token
+from util.skills import derive_skill_state
 
 logger = logging.getLogger(__name__)
 
@@ -32,47 +34,77 @@ def fetch_skillqueue(char_id: int, access_token: str) -> list:
 
 # ──────── Storage ───────────────────────────────────────────────────────────────
 
-def store_skill_data(owner_id: int, char_id: int, raw_skills: list, queue: list):
-    """Store skills and skill queue into owner's private database."""
-    db = get_private_session(owner_id)
-
-    db.query(SkillRaw).filter_by(character_id=char_id).delete()
-    db.query(SkillQueueEntry).filter_by(character_id=char_id).delete()
-    db.query(IngameSkillState).filter_by(character_id=char_id).delete()
-
-    raw_map = {}
-    for skill in raw_skills:
-        db.add(SkillRaw(
-            character_id=char_id,
-            skill_id=skill["skill_id"],
-            active_level=skill["active_skill_level"],
-            skillpoints_in_skill=skill["skillpoints_in_skill"],
-            trained_skill_level=skill["trained_skill_level"],
-            skill_active=skill.get("active", True),
-        ))
-        raw_map[skill["skill_id"]] = skill
-
-    for entry in queue:
-        finish_time = datetime.fromisoformat(entry["finish_date"].replace("Z", "+00:00")) if "finish_date" in entry else None
-        db.add(SkillQueueEntry(
-            character_id=char_id,
-            queue_position=entry["queue_position"],
-            skill_id=entry["skill_id"],
-            finish_level=entry["finished_level"],
-            finish_date=finish_time,
-        ))
-
-    for sid, skill in raw_map.items():
-        db.add(IngameSkillState(
-            character_id=char_id,
-            skill_id=sid,
-            current_level=skill["active_skill_level"],
-            is_in_training=False,
-            training_finishes_at=None
-        ))
-
-    db.commit()
-    db.close()
+def _utc(value: str):
+    """ESI timestamp -> naive UTC datetime, as stored by SQLite."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None) if value else None
+
+def _sync_rows(db, model, key: str, char_id: int, desired: dict) -> int:
+    """
+    Make a character's rows of `model` equal `desired` ({ key value: column dict }), writing only
+    the rows that were added, changed or dropped. Returns the number of rows written.
+    """
+    columns = [c.name for c in model.__table__.columns if c.name not in ("character_id", key)]
+    current = {
+        row[0]: dict(zip(columns, row[1:]))
+        for row in db.execute(
+            select(getattr(model, key), *[getattr(model, c) for c in columns]).where(model.character_id == char_id)
+        )
+    }
+
+    added = [k for k in desired if k not in current]
+    changed = [k for k in desired if k in current and any(current[k][c] != desired[k].get(c) for c in columns)]
+    dropped = [k for k in current if k not in desired]
+
+    def row(k):
+        return {"character_id": char_id, key: k, **{c: desired[k].get(c) for c in columns}}
+
+    if added:
+        db.execute(insert(model), [row(k) for k in added])
+    if changed:
+        db.execute(update(model), [row(k) for k in changed])
+    if dropped:
+        db.execute(delete(model).where(model.character_id == char_id, getattr(model, key).in_(dropped)))
+    return len(added) + len(changed) + len(dropped)
+
+def store_skill_data(owner_id: int, char_id: int, raw_skills: list, queue: list) -> int:
+    """
+    Sync skills and the skill queue into owner's private database, writing only changed rows, and
+    derive each skill's usable level and training state from the queue. Returns rows written.
+    """
+    now = datetime.utcnow()
+    queue_rows = {
+        entry["queue_position"]: {
+            "skill_id": entry["skill_id"],
+            "finish_level": entry["finished_level"],
+            "start_date": _utc(entry.get("start_date")),
+            "finish_date": _utc(entry.get("finish_date")),
+        }
+        for entry in queue
+    }
+    levels = {skill["skill_id"]: skill["active_skill_level"] for skill in raw_skills}
+    state = derive_skill_state(
+        levels, [(q["skill_id"], q["finish_level"], q["start_date"], q["finish_date"]) for q in queue_rows.values()], now
+    )
+
+    with get_private_session(owner_id) as db:
+        written = _sync_rows(db, SkillRaw, "skill_id", char_id, {
+            skill["skill_id"]: {
+                "active_level": skill["active_skill_level"],
+                "skillpoints_in_skill": skill["skillpoints_in_skill"],
+                "trained_skill_level": skill["trained_skill_level"],
+                "skill_active": skill.get("active", True),
+            }
+            for skill in raw_skills
+        })
+        written += _sync_rows(db, SkillQueueEntry, "queue_position", char_id, queue_rows)
+        written += _sync_rows(db, IngameSkillState, "skill_id", char_id, {
+            sid: {"current_level": level, "is_in_training": training, "training_finishes_at": finishes}
+            for sid, (level, training, finishes) in state.items()
+        })
+        db.commit()
+
+    logger.debug(f"[Skills] {char_id}: {written} rows written")
+    return written
 
 # ──────── Orchestrator ───────────────────────────────────────────────────────────
 
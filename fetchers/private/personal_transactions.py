@@ -0,0 +1,94 @@
+# fetchers/private/personal_transactions.py
+
+import requests
+import logging
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db.database import get_private_session
+from db.models import MarketTransaction
+from util.utils import get_token
+from analysis.profit import update_fifo
+
+logger = logging.getLogger(__name__)
+
+ESI = "https://esi.evetech.net/latest"
+
+# ──────── Fetching ─────────────────────────────────────────────────────────────
+
+def fetch_market_transactions(char_id: int, access_token: str, since_id: int = None) -> list:
+    """
+    Fetch market transactions for a character, newest first. ESI returns batches ending at
+    from_id; batches are walked backwards until one reaches since_id (or history runs out).
+    """
+    url = f"{ESI}/characters/{char_id}/wallet/transactions/"
+    headers = {"Authorization": f"Bearer {access_token}"}
+    transactions = []
+    params = {}
+
+    while True:
+        resp = requests.get(url, headers=headers, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+
+        new = [t for t in data if since_id is None or t["transaction_id"] > since_id]
+        transactions.extend(new)
+        if not new or len(new) < len(data):
+            break       # history exhausted, or reached transactions we already have
+
+        params = {"from_id": min(t["transaction_id"] for t in data) - 1}
+
+    return transactions
+
+# ──────── Storage ───────────────────────────────────────────────────────────────
+
+def latest_transaction_id(owner_id: int, char_id: int):
+    """Return the newest stored transaction ID for a character, or None if none are stored."""
+    with get_private_session(owner_id) as db:
+        return db.query(func.max(MarketTransaction.transaction_id)) \
+            .filter(MarketTransaction.character_id == char_id).scalar()
+
+def store_transactions(owner_id: int, char_id: int, transactions: list):
+    """Bulk-insert new market transactions, then match them into FIFO lots and realized P&L."""
+    if transactions:
+        rows = [
+            {
+                "transaction_id": t["transaction_id"],
+                "character_id": char_id,
+                "date": datetime.fromisoformat(t["date"].replace("Z", "+00:00")),
+                "type_id": t["type_id"],
+                "quantity": t["quantity"],
+                "unit_price": t["unit_price"],
+                "is_buy": t["is_buy"],
+                "location_id": t.get("location_id"),
+                "client_id": t.get("client_id"),
+                "journal_ref_id": t.get("journal_ref_id"),
+                "is_personal": t.get("is_personal"),
+            }
+            for t in transactions
+        ]
+        with get_private_session(owner_id) as db:
+            db.execute(sqlite_insert(MarketTransaction).on_conflict_do_nothing(index_elements=["transaction_id"]), rows)
+            db.commit()
+
+    update_fifo(owner_id, char_id)
+
+# ──────── Orchestrator ───────────────────────────────────────────────────────────
+
+def sync_market_transactions(owner_id: int, char_id: int, access_token: str) -> list:
+    """Fetch only the transactions newer than what is stored for a character."""
+    return fetch_market_transactions(char_id, access_token, since_id=latest_transaction_id(owner_id, char_id))
+
+def fetch_all_transactions(owner_id: int):
+    """Fetch and store new market transactions for all characters owned by the given owner."""
+    tokens = get_token(owner_id)
+
+    for char_id, token_row in tokens.items():
+        logger.info(f"[fetch_all_transactions] Syncing market transactions for {char_id}")
+        try:
+            transactions = sync_market_transactions(owner_id, char_id, token_row["access_token"])
+            store_transactions(owner_id, char_id, transactions)
+            logger.info(f"[fetch_all_transactions] Stored {len(transactions)} new transactions for {char_id}")
+        except requests.HTTPError as e:
+            logger.error(f"[fetch_all_transactions] Failed to fetch transactions for {char_id}: {e}")
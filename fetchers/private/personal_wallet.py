@@ -3,58 +3,146 @@
 import requests
 import logging
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from db.database import get_private_session
-from db.models import WalletTransaction
+from db.models import WalletTransaction, WalletDaily
 from util.utils import get_token
 
 logger = logging.getLogger(__name__)
 
 ESI = "https://esi.evetech.net/latest"
 
+# IDs per "IN (...)" lookup, under SQLite's bound-parameter limit
+ID_CHUNK = 500
+
 # ──────── Fetching ─────────────────────────────────────────────────────────────
 
-def fetch_wallet_journal(char_id: int, access_token: str) -> list:
-    """Fetch wallet journal entries for a character."""
+def fetch_wallet_journal(char_id: int, access_token: str, since_id: int = None) -> list:
+    """
+    Fetch wallet journal entries for a character, newest page first. With since_id, paging stops
+    at the first page that reaches an already-stored entry and only newer entries are returned.
+    """
     url = f"{ESI}/characters/{char_id}/wallet/journal/"
     headers = {"Authorization": f"Bearer {access_token}"}
-    resp = requests.get(url, headers=headers)
-    resp.raise_for_status()
-    return resp.json()
+    entries = []
+    page = 1
+
+    while True:
+        resp = requests.get(url, headers=headers, params={"page": page})
+        resp.raise_for_status()
+        data = resp.json()
+
+        if since_id is None:
+            entries.extend(data)
+        else:
+            new = [e for e in data if _entry_id(e) > since_id]
+            entries.extend(new)
+            if len(new) < len(data):
+                break       # reached entries we already have
+
+        if page >= int(resp.headers.get("X-Pages", 1)):
+            break
+        page += 1
+
+    return entries
 
 # ──────── Storage ───────────────────────────────────────────────────────────────
 
+def _entry_id(entry: dict) -> int:
+    return entry.get("id") or entry.get("ref_id")
+
+def latest_journal_id(owner_id: int, char_id: int):
+    """Return the newest stored journal ID for a character, or None if none are stored."""
+    with get_private_session(owner_id) as db:
+        return db.query(func.max(WalletTransaction.id)).filter(WalletTransaction.character_id == char_id).scalar()
+
+def _known_ids(db, ids: list) -> set:
+    known = set()
+    for i in range(0, len(ids), ID_CHUNK):
+        chunk = ids[i:i + ID_CHUNK]
+        known.update(r for (r,) in db.query(WalletTransaction.id).filter(WalletTransaction.id.in_(chunk)))
+    return known
+
+def _daily_rows(char_id: int, rows: list) -> list:
+    """Aggregate journal rows into wallet_daily increments per (day, ref_type)."""
+    daily = {}
+    for row in rows:
+        key = (row["date"].date(), row["ref_type"] or "")
+        agg = daily.get(key)
+        if agg is None:
+            agg = daily[key] = {"character_id": char_id, "day": key[0], "ref_type": key[1], "total": 0.0,
+                                "income": 0.0, "expense": 0.0, "count": 0, "min_amount": None, "max_amount": None}
+        amount = row["amount"]
+        agg["count"] += 1
+        if amount is None:
+            continue
+        agg["total"] += amount
+        agg["income" if amount > 0 else "expense"] += amount
+        agg["min_amount"] = amount if agg["min_amount"] is None else min(agg["min_amount"], amount)
+        agg["max_amount"] = amount if agg["max_amount"] is None else max(agg["max_amount"], amount)
+    return list(daily.values())
+
 def store_wallet_journal(owner_id: int, char_id: int, entries: list):
-    """Store wallet journal entries into owner's private database."""
-    db = get_private_session(owner_id)
-
-    for entry in entries:
-        txn_id = entry.get("id") or entry.get("ref_id")
-        date = datetime.fromisoformat(entry["date"].replace("Z", "+00:00"))
-        db.merge(WalletTransaction(
-            id=txn_id,
-            character_id=char_id,
-            amount=entry.get("amount"),
-            date=date,
-            ref_type=entry.get("ref_type"),
-            context_id=entry.get("context_id"),
-            context_id_type=entry.get("context_id_type"),
-        ))
-
-    db.commit()
-    db.close()
+    """
+    Bulk-insert new wallet journal entries into owner's private database and fold them into the
+    wallet_daily aggregates, in one transaction. Entries already stored are skipped.
+    """
+    if not entries:
+        return
+
+    rows = [
+        {
+            "id": _entry_id(entry),
+            "character_id": char_id,
+            "amount": entry.get("amount"),
+            "date": datetime.fromisoformat(entry["date"].replace("Z", "+00:00")),
+            "ref_type": entry.get("ref_type"),
+            "context_id": entry.get("context_id"),
+            "context_id_type": entry.get("context_id_type"),
+        }
+        for entry in entries
+    ]
+    with get_private_session(owner_id) as db:
+        known = _known_ids(db, [r["id"] for r in rows])
+        rows = list({r["id"]: r for r in rows if r["id"] not in known}.values())
+        if not rows:
+            return
+
+        db.execute(sqlite_insert(WalletTransaction).on_conflict_do_nothing(index_elements=["id"]), rows)
+
+        insert = sqlite_insert(WalletDaily)
+        db.execute(insert.on_conflict_do_update(
+            index_elements=["character_id", "day", "ref_type"],
+            set_={
+                "total": WalletDaily.total + insert.excluded.total,
+                "income": WalletDaily.income + insert.excluded.income,
+                "expense": WalletDaily.expense + insert.excluded.expense,
+                "count": WalletDaily.count + insert.excluded.count,
+                "min_amount": func.min(func.coalesce(WalletDaily.min_amount, insert.excluded.min_amount),
+                                       func.coalesce(insert.excluded.min_amount, WalletDaily.min_amount)),
+                "max_amount": func.max(func.coalesce(WalletDaily.max_amount, insert.excluded.max_amount),
+                                       func.coalesce(insert.excluded.max_amount, WalletDaily.max_amount)),
+            },
+        ), _daily_rows(char_id, rows))
+        db.commit()
 
 # ──────── Orchestrator ───────────────────────────────────────────────────────────
 
+def sync_wallet_journal(owner_id: int, char_id: int, access_token: str) -> list:
+    """Fetch only the journal entries newer than what is stored for a character."""
+    return fetch_wallet_journal(char_id, access_token, since_id=latest_journal_id(owner_id, char_id))
+
 def fetch_all_wallets(owner_id: int):
-    """Fetch and store wallet journals for all characters owned by the given owner."""
+    """Fetch and store new wallet journal entries for all characters owned by the given owner."""
     tokens = get_token(owner_id)
 
     for char_id, token_row in tokens.items():
-        logger.info(f"[fetch_all_wallets] Fetching wallet journal for {char_id}")
+        logger.info(f"[fetch_all_wallets] Syncing wallet journal for {char_id}")
         try:
-            entries = fetch_wallet_journal(char_id, token_row["access_token"])
+            entries = sync_wallet_journal(owner_id, char_id, token_row["access_token"])
             store_wallet_journal(owner_id, char_id, entries)
-            logger.info(f"[fetch_all_wallets] Stored {len(entries)} transactions for {char_id}")
+            logger.info(f"[fetch_all_wallets] Stored {len(entries)} new journal entries for {char_id}")
         except requests.HTTPError as e:
             logger.error(f"[fetch_all_wallets] Failed to fetch wallet journal for {char_id}: {e}")
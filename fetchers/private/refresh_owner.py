@@ -0,0 +1,150 @@
+# fetchers/private/refresh_owner.py
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from util.utils import get_token
+from fetchers.private.personal_assets import fetch_assets, store_assets
+from fetchers.private.personal_bookmarks import fetch_bookmarks, store_bookmarks
+from fetchers.private.personal_industry_jobs import fetch_industry_jobs, store_jobs
+from fetchers.private.personal_skills import fetch_skills, fetch_skillqueue, store_skill_data
+from fetchers.private.personal_wallet import sync_wallet_journal, store_wallet_journal
+from fetchers.private.personal_transactions import sync_market_transactions, store_transactions
+
+logger = logging.getLogger(__name__)
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+REFRESH_WORKERS = int(os.getenv("EVE_REFRESH_WORKERS", "16"))
+
+def _per_character(fetch):
+    """Adapt a fetch(char_id, access_token) that doesn't need the owner's DB."""
+    return lambda owner_id, char_id, access_token: fetch(char_id, access_token)
+
+def _fetch_skills(owner_id: int, char_id: int, access_token: str) -> tuple:
+    return fetch_skills(char_id, access_token), fetch_skillqueue(char_id, access_token)
+
+def _store_skills(owner_id: int, char_id: int, data: tuple):
+    store_skill_data(owner_id, char_id, *data)
+
+# name -> fetch(owner_id, char_id, access_token), store(owner_id, char_id, data), rate (tasks started per second)
+ENDPOINTS = {
+    "assets":       {"fetch": _per_character(fetch_assets),        "store": store_assets,         "rate": 10},
+    "wallet":       {"fetch": sync_wallet_journal,                 "store": store_wallet_journal, "rate": 10},
+    "transactions": {"fetch": sync_market_transactions,            "store": store_transactions,   "rate": 10},
+    "skills":       {"fetch": _fetch_skills,                       "store": _store_skills,        "rate": 10},
+    "industry":     {"fetch": _per_character(fetch_industry_jobs), "store": store_jobs,           "rate": 10},
+    "bookmarks":    {"fetch": _per_character(fetch_bookmarks),     "store": store_bookmarks,      "rate": 5},
+}
+
+# ──────── Rate Limiting ───────────────────────────────────────────────────────
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# ──────── Orchestrator ────────────────────────────────────────────────────────
+
+def _item_count(data) -> int:
+    if isinstance(data, tuple):
+        return sum(_item_count(d) for d in data)
+    return len(data) if hasattr(data, "__len__") else 0
+
+def refresh_owner(owner_id: int, endpoints: list = None, workers: int = REFRESH_WORKERS) -> dict:
+    """
+    Refresh every (character × endpoint) pair for an owner. Fetches run concurrently on a bounded
+    pool under per-endpoint rate limits; a single writer thread stores results into the owner's DB.
+    Returns a report with per-task timings.
+    """
+    names = endpoints or list(ENDPOINTS)
+    unknown = [n for n in names if n not in ENDPOINTS]
+    if unknown:
+        raise ValueError(f"Unknown endpoint(s) {unknown}, expected some of {list(ENDPOINTS)}")
+
+    started = time.perf_counter()
+    tokens = get_token(owner_id)
+    limiters = {name: RateLimiter(ENDPOINTS[name]["rate"]) for name in names}
+    tasks = [(name, char_id) for char_id in tokens for name in names]
+    results = []
+    writes = queue.Queue()
+
+    def writer():
+        while True:
+            item = writes.get()
+            if item is None:
+                return
+            task, data = item
+            t0 = time.perf_counter()
+            try:
+                ENDPOINTS[task["endpoint"]]["store"](owner_id, task["character_id"], data)
+                task["status"] = "ok"
+            except Exception as e:
+                task["status"] = "store_failed"
+                task["error"] = str(e)
+                logger.error(f"[RefreshOwner] Storing {task['endpoint']} for {task['character_id']} failed: {e}")
+            task["store_s"] = round(time.perf_counter() - t0, 3)
+
+    def run(name: str, char_id: int):
+        task = {"endpoint": name, "character_id": char_id, "status": "pending", "fetch_s": None, "store_s": None}
+        results.append(task)
+        limiters[name].acquire()
+        t0 = time.perf_counter()
+        try:
+            data = ENDPOINTS[name]["fetch"](owner_id, char_id, tokens[char_id]["access_token"])
+        except Exception as e:
+            task["status"] = "fetch_failed"
+            task["error"] = str(e)
+            logger.error(f"[RefreshOwner] Fetching {name} for {char_id} failed: {e}")
+            return
+        finally:
+            task["fetch_s"] = round(time.perf_counter() - t0, 3)
+        task["items"] = _item_count(data)
+        writes.put((task, data))
+
+    writer_thread = threading.Thread(target=writer, name=f"refresh-writer-{owner_id}")
+    writer_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="refresh") as pool:
+            for future in [pool.submit(run, name, char_id) for name, char_id in tasks]:
+                future.result()
+    finally:
+        writes.put(None)
+        writer_thread.join()
+
+    elapsed = time.perf_counter() - started
+    failed = [t for t in results if t["status"] != "ok"]
+    fetch_total = sum(t["fetch_s"] or 0 for t in results)
+    logger.info(
+        f"[RefreshOwner] Owner {owner_id}: {len(results)} tasks over {len(tokens)} characters in {elapsed:.1f}s "
+        f"(sum of fetches {fetch_total:.1f}s), {len(failed)} failed"
+    )
+    return {
+        "owner_id": owner_id,
+        "characters": len(tokens),
+        "elapsed_s": round(elapsed, 3),
+        "fetch_total_s": round(fetch_total, 3),
+        "failed": len(failed),
+        "tasks": sorted(results, key=lambda t: (t["endpoint"], t["character_id"])),
+    }
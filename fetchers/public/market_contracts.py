@@ -4,38 +4,49 @@ import logging
 from datetime import datetime
 import requests
 
-from db.database import get_public_session
+from db.database import get_public_ingest_session
 from db.models import PublicContract
+from db.crawl_checkpoints import (
+    begin_crawl, finish_crawl, pending_regions, region_checkpoint, mark_region, mark_page_done, page_etag,
+)
 from util.utils import get_all_region_ids
 
 # ──────── Globals ───────────────────────────────────────────────────────────────
 logger = logging.getLogger(__name__)
 ESI = "https://esi.evetech.net/latest"
+CRAWL = "contracts"
 
 # ──────── Fetching ──────────────────────────────────────────────────────────────
 
+def fetch_contract_page(region_id: int, page: int, etag: str = None) -> tuple:
+    """
+    Fetch one page of public contracts, sending If-None-Match when an ETag is known.
+    Returns (data, total_pages, etag, not_modified); data is empty on 204, and total_pages is
+    None on a 304 without an X-Pages header.
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    resp = requests.get(f"{ESI}/contracts/public/{region_id}/", params={"page": page}, headers=headers)
+    pages = resp.headers.get("X-Pages")
+    if resp.status_code == 304:
+        return [], int(pages) if pages else None, etag, True
+    if resp.status_code == 204:
+        return [], 0, None, False
+
+    resp.raise_for_status()
+    return resp.json(), int(pages or page), resp.headers.get("ETag"), False
+
 def fetch_public_contracts(region_id: int) -> list[dict]:
     """Fetch all public contracts in a region, handling pagination."""
     all_contracts = []
     page = 1
-    url = f"{ESI}/contracts/public/{region_id}/"
 
     while True:
-        resp = requests.get(url, params={"page": page})
-        if resp.status_code == 204:
-            logger.info(f"[Contracts] Region {region_id}: no contracts (204) on page {page}")
-            break
-
-        resp.raise_for_status()
-        page_data = resp.json()
-
+        page_data, total_pages, _, _ = fetch_contract_page(region_id, page)
         if not page_data:
-            logger.info(f"[Contracts] Region {region_id}: empty page {page}, stopping early")
+            logger.info(f"[Contracts] Region {region_id}: no contracts on page {page}, stopping early")
             break
 
         all_contracts.extend(page_data)
-        total_pages = int(resp.headers.get("X-Pages", page))
-
         logger.info(f"[Contracts] Region {region_id}: fetched page {page}/{total_pages}")
 
         if page >= total_pages:
@@ -48,7 +59,7 @@ def fetch_public_contracts(region_id: int) -> list[dict]:
 
 def store_contracts(region_id: int, contracts: list[dict]) -> None:
     """Merge a list of contract dicts into the database."""
-    with get_public_session() as db:
+    with get_public_ingest_session() as db:
         for contract in contracts:
             db.merge(PublicContract(
                 id=contract["contract_id"],
@@ -65,18 +76,53 @@ def store_contracts(region_id: int, contracts: list[dict]) -> None:
 
 # ──────── Orchestration ──────────────────────────────────────────────────────────
 
-def fetch_all_public_contracts() -> None:
-    """Fetch and store public contracts for every EVE region."""
+def fetch_region_contracts(region_id: int, run_id: int) -> None:
+    """
+    Fetch and store a region's contracts page by page, checkpointing each page. Pages whose
+    ETag is unchanged are skipped, and an interrupted region continues after its last stored page.
+    """
+    checkpoint = region_checkpoint(CRAWL, region_id)
+    resume = checkpoint and checkpoint.run_id == run_id and checkpoint.state in ("running", "failed")
+    page = (checkpoint.pages_done or 0) + 1 if resume else 1
+    mark_region(CRAWL, region_id, run_id, "running", **({} if resume else {"pages_done": 0}))
+
+    unchanged = 0
+    # a 304 may carry no X-Pages: keep walking the page count stored by the last crawl until a 200 updates it
+    total_pages = max(page, (checkpoint.total_pages if checkpoint else None) or page)
+    while page <= total_pages:
+        page_data, pages, etag, not_modified = fetch_contract_page(region_id, page, page_etag(CRAWL, region_id, page))
+        if pages is not None:
+            total_pages = pages
+        if not_modified:
+            unchanged += 1
+        elif page_data:
+            store_contracts(region_id, page_data)
+        else:
+            break
+        mark_page_done(CRAWL, region_id, run_id, page, etag)
+        mark_region(CRAWL, region_id, run_id, "running", total_pages=total_pages)
+        logger.info(f"[Contracts] Region {region_id}: page {page}/{total_pages}{' (unchanged)' if not_modified else ''}")
+        page += 1
+
+    state = "not_modified" if unchanged and unchanged == total_pages else "done"
+    mark_region(CRAWL, region_id, run_id, state)
+
+def fetch_all_public_contracts(fresh: bool = False) -> None:
+    """Fetch and store public contracts for every EVE region, resuming an interrupted crawl unless fresh=True."""
     logger.info("[Contracts] Starting full public contracts fetch")
     region_ids = get_all_region_ids()
+    run_id, resumed = begin_crawl(CRAWL, region_ids, fresh=fresh)
 
-    for region_id in region_ids:
+    for region_id in pending_regions(CRAWL, run_id, region_ids):
         try:
             logger.info(f"[Contracts] === Region {region_id} ===")
-            contracts = fetch_public_contracts(region_id)
-            if contracts:
-                store_contracts(region_id, contracts)
+            fetch_region_contracts(region_id, run_id)
         except Exception as e:
             logger.exception(f"[Contracts] Failed fetching region {region_id}: {e}")
+            mark_region(CRAWL, region_id, run_id, "failed")
 
-    logger.info("[Contracts] Completed fetching all public contracts")
+    if not pending_regions(CRAWL, run_id, region_ids):
+        finish_crawl(run_id)
+        logger.info("[Contracts] Completed fetching all public contracts")
+    else:
+        logger.warning("[Contracts] Crawl finished with failed regions, the next run resumes them")
@@ -0,0 +1,50 @@
+# fetchers/public/market_prices.py
+
+import logging
+from datetime import datetime
+from sqlalchemy import func, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db.database import get_public_session, get_public_ingest_session
+from db.models import MarketPrice
+from fetchers.public.market_station import fetch_with_retries, ESI_BASE
+
+logger = logging.getLogger(__name__)
+
+# ──────── Fetching ─────────────────────────────────────────────────────────────
+
+def fetch_market_prices() -> list:
+    """Fetch CCP's average and adjusted prices for every traded type."""
+    resp = fetch_with_retries(f"{ESI_BASE}/markets/prices/", params={"datasource": "tranquility"})
+    resp.raise_for_status()
+    return resp.json()
+
+# ──────── Storage ───────────────────────────────────────────────────────────────
+
+def store_market_prices(prices: list) -> datetime:
+    """Replace the stored price list in one transaction. Returns the snapshot's timestamp."""
+    now = datetime.utcnow()
+    rows = [
+        {"type_id": p["type_id"], "average_price": p.get("average_price"),
+         "adjusted_price": p.get("adjusted_price"), "updated_at": now}
+        for p in prices
+    ]
+    with get_public_ingest_session() as db:
+        db.execute(delete(MarketPrice))
+        if rows:
+            db.execute(sqlite_insert(MarketPrice), rows)
+        db.commit()
+    logger.info(f"[MarketPrices] Stored {len(rows)} prices")
+    return now
+
+def price_snapshot():
+    """Return when the stored price list was fetched (None if never); changes with every refresh."""
+    with get_public_session() as db:
+        return db.query(func.max(MarketPrice.updated_at)).scalar()
+
+# ──────── Orchestrator ───────────────────────────────────────────────────────────
+
+def update_market_prices() -> int:
+    prices = fetch_market_prices()
+    store_market_prices(prices)
+    return len(prices)
@@ -1,30 +1,43 @@
 # fetchers/public/market_station.py
 
+import os
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import requests
 
-from db.database import get_public_session
 from db.models import MarketOrder
+from db.market_shards import get_market_session, sharding_enabled
+from db.market_generations import (
+    begin_generation, publish_generation, abandon_generation, collect_generations, generation_state,
+    generation_order_count,
+)
+from db.crawl_checkpoints import (
+    begin_crawl, finish_crawl, pending_regions, region_checkpoint, mark_region, mark_page_done, page_etag,
+)
+from db.order_archive import ORDER_ARCHIVE, archive_snapshot
 from util.utils import get_all_region_ids
 
 logger = logging.getLogger(__name__)
 
 ESI_BASE = "https://esi.evetech.net/latest"
 HEADERS = {"Accept": "application/json"}
+MARKET_WORKERS = int(os.getenv("EVE_MARKET_WORKERS", "1"))
+CRAWL = "market"
 
 # ──────── Fetching ─────────────────────────────────────────────────────────────
 
-def fetch_with_retries(url: str, params: dict, max_retries: int = 3) -> requests.Response:
+def fetch_with_retries(url: str, params: dict, max_retries: int = 3, headers: dict = None) -> requests.Response:
     """
     Fetch a URL with basic retry/backoff logic for ESI error codes.
     """
+    headers = {**HEADERS, **(headers or {})}
     backoff = 1
     for attempt in range(1, max_retries + 1):
         try:
-            resp = requests.get(url, headers=HEADERS, params=params)
+            resp = requests.get(url, headers=headers, params=params)
             if resp.status_code == 420:
                 logger.warning(f"420 rate limit on {url}, sleeping 5s (attempt {attempt})")
                 time.sleep(5)
@@ -39,35 +52,47 @@ def fetch_with_retries(url: str, params: dict, max_retries: int = 3) -> requests
             logger.warning(f"Request error on {url} (attempt {attempt}): {e}")
             time.sleep(backoff)
             backoff *= 2
-    return requests.get(url, headers=HEADERS, params=params)
+    return requests.get(url, headers=headers, params=params)
 
-def fetch_market_orders(region_id: int, page: int = 1) -> tuple[list, int]:
+def fetch_market_page(region_id: int, page: int = 1, etag: str = None) -> tuple:
     """
-    Fetch a single page of market orders for a region with retries.
-    Returns (data, total_pages).
+    Fetch a single page of market orders, sending If-None-Match when an ETag is known.
+    Returns (data, total_pages, etag, not_modified).
     """
     url = f"{ESI_BASE}/markets/{region_id}/orders/"
     params = {"order_type": "all", "page": page, "datasource": "tranquility"}
-    resp = fetch_with_retries(url, params)
+    resp = fetch_with_retries(url, params, headers={"If-None-Match": etag} if etag else None)
 
+    if resp.status_code == 304:
+        return [], int(resp.headers.get("X-Pages", 1)), etag, True
     if resp.status_code in (400, 403, 404):
         logger.warning(f"Bad response {resp.status_code} for region {region_id}, page {page}")
-        return [], 0
+        return [], 0, None, False
 
     resp.raise_for_status()
-    return resp.json(), int(resp.headers.get("X-Pages", 1))
+    return resp.json(), int(resp.headers.get("X-Pages", 1)), resp.headers.get("ETag"), False
+
+def fetch_market_orders(region_id: int, page: int = 1) -> tuple[list, int]:
+    """
+    Fetch a single page of market orders for a region with retries.
+    Returns (data, total_pages).
+    """
+    data, total_pages, _, _ = fetch_market_page(region_id, page)
+    return data, total_pages
 
 # ──────── Storage ───────────────────────────────────────────────────────────────
 
-def save_orders_to_db(region_id: int, orders: list[dict]) -> None:
+def save_orders_to_db(region_id: int, orders: list[dict], generation: int = 0) -> None:
     """
-    Save a list of market orders to the database for the given region.
+    Save a list of market orders to the database (or shard) for the given region,
+    tagged with the (unpublished) generation being ingested.
     """
     logger.debug(f"Saving {len(orders)} orders for region {region_id}")
-    with get_public_session() as db:
+    with get_market_session(region_id) as db:
         for order in orders:
             db_order = MarketOrder(
                 id=order["order_id"],
+                generation=generation,
                 region_id=region_id,
                 type_id=order["type_id"],
                 price=order["price"],
@@ -79,36 +104,130 @@ def save_orders_to_db(region_id: int, orders: list[dict]) -> None:
             db.merge(db_order)
         db.commit()
 
+def _pages_unchanged(region_id: int, total_pages: int) -> bool:
+    """Revalidate pages 2..N of a region against their stored ETags; True only if every one is still 304."""
+    if not total_pages:
+        return False
+    for page in range(2, total_pages + 1):
+        etag = page_etag(CRAWL, region_id, page)
+        if not etag:
+            return False
+        time.sleep(0.033)  # ESI rate limit avoidance
+        _, _, _, not_modified = fetch_market_page(region_id, page, etag)
+        if not not_modified:
+            logger.info(f"Region {region_id}: page {page}/{total_pages} changed since last crawl")
+            return False
+    return True
+
 # ──────── Orchestrator ───────────────────────────────────────────────────────────
 
-def fetch_all_market_data() -> None:
-    """
-    Fetch and store all market orders from all EVE regions.
+def fetch_region_market(region_id: int, run_id: int = None) -> None:
     """
-    region_ids = get_all_region_ids()
-    logger.info(f"Found {len(region_ids)} regions to process")
+    Fetch every page of market orders for one region into a new generation and publish it
+    once complete. Readers keep seeing the previous generation until then.
 
-    for region_id in region_ids:
-        logger.info(f"=== Fetching region {region_id} ===")
-        try:
-            first_page, total_pages = fetch_market_orders(region_id, page=1)
+    Inside a crawl run (run_id), progress is checkpointed per page: a region interrupted
+    mid-crawl continues its unpublished generation from the next page, and a region whose
+    pages are all unchanged since it was last published (ETag on every page) is skipped.
+    """
+    logger.info(f"=== Fetching region {region_id} ===")
+    checkpoint = region_checkpoint(CRAWL, region_id) if run_id is not None else None
+    generation = None
+    try:
+        if (checkpoint and checkpoint.run_id == run_id and checkpoint.state in ("running", "failed")
+                and checkpoint.generation and generation_state(checkpoint.generation) == "building"):
+            generation = checkpoint.generation
+            start_page, total_pages = checkpoint.pages_done + 1, checkpoint.total_pages
+            order_count, snapshot = None, None      # a resumed crawl is not a single snapshot, don't archive it
+            logger.info(f"Region {region_id}: resuming generation {generation} at page {start_page}/{total_pages}")
+            mark_region(CRAWL, region_id, run_id, "running")
+        else:
+            known_etag = None
+            if checkpoint and checkpoint.state in ("done", "not_modified"):
+                known_etag = page_etag(CRAWL, region_id, 1)
+
+            first_page, total_pages, etag, not_modified = fetch_market_page(region_id, 1, known_etag)
+            if not_modified and _pages_unchanged(region_id, checkpoint.total_pages):
+                logger.info(f"Region {region_id}: unchanged since last crawl (ETag), skipping")
+                if run_id is not None:
+                    mark_region(CRAWL, region_id, run_id, "not_modified")
+                return
+            if not_modified:
+                # page 1 is the same but a later page isn't; a generation is a full snapshot, so refetch it all
+                first_page, total_pages, etag, _ = fetch_market_page(region_id, 1)
             if not first_page:
                 logger.info(f"No market data for region {region_id}")
-                continue
-
-            save_orders_to_db(region_id, first_page)
-
-            for page in range(2, total_pages + 1):
-                time.sleep(0.033)  # ESI rate limit avoidance
-                page_data, _ = fetch_market_orders(region_id, page)
-                if not page_data:
-                    break
-                save_orders_to_db(region_id, page_data)
-
-                if total_pages < 50 or page % 6 == 0:
-                    logger.info(f"Region {region_id}: {100 * page / total_pages:.2f}% complete")
-
-        except Exception as e:
-            logger.error(f"Failed fetching market data for region {region_id}: {e}")
+                if run_id is not None:
+                    mark_region(CRAWL, region_id, run_id, "done", pages_done=0, total_pages=0, generation=None)
+                return
+
+            generation = begin_generation(region_id)
+            snapshot = list(first_page) if ORDER_ARCHIVE else None
+            save_orders_to_db(region_id, first_page, generation)
+            order_count = len(first_page)
+            if run_id is not None:
+                mark_region(CRAWL, region_id, run_id, "running", pages_done=0, total_pages=total_pages, generation=generation)
+                mark_page_done(CRAWL, region_id, run_id, 1, etag)
+            start_page = 2
+
+        for page in range(start_page, total_pages + 1):
+            time.sleep(0.033)  # ESI rate limit avoidance
+            page_data, _, etag, _ = fetch_market_page(region_id, page)
+            if not page_data:
+                raise RuntimeError(f"page {page}/{total_pages} came back empty")
+            save_orders_to_db(region_id, page_data, generation)
+            if order_count is not None:
+                order_count += len(page_data)
+            if snapshot is not None:
+                snapshot.extend(page_data)
+            if run_id is not None:
+                mark_page_done(CRAWL, region_id, run_id, page, etag)
+
+            if total_pages < 50 or page % 6 == 0:
+                logger.info(f"Region {region_id}: {100 * page / total_pages:.2f}% complete")
+
+        if order_count is None:
+            order_count = generation_order_count(region_id, generation)     # resumed: pages came from several runs
+        publish_generation(region_id, generation, order_count)
+        if run_id is not None:
+            mark_region(CRAWL, region_id, run_id, "done")
+        collect_generations(region_id)
+
+        if snapshot is not None:
+            archive_snapshot(region_id, snapshot)
+
+    except Exception as e:
+        logger.error(f"Failed fetching market data for region {region_id}: {e}")
+        if run_id is not None:
+            mark_region(CRAWL, region_id, run_id, "failed")     # generation kept for the resumed run
+        elif generation is not None:
+            abandon_generation(generation)
+
+def fetch_all_market_data(workers: int = None, fresh: bool = False) -> None:
+    """
+    Fetch and store all market orders from all EVE regions.
+    An interrupted crawl is resumed where it stopped unless fresh=True.
+    With sharded market storage, `workers` regions are ingested in parallel, each committing to its own file.
+    """
+    workers = workers or MARKET_WORKERS
+    if workers > 1 and not sharding_enabled():
+        logger.warning("Parallel market ingest without EVE_MARKET_SHARDING, writers will queue on public.db")
 
-    logger.info("Completed fetch of all market data")
+    region_ids = get_all_region_ids()
+    run_id, resumed = begin_crawl(CRAWL, region_ids, fresh=fresh)
+    todo = pending_regions(CRAWL, run_id, region_ids)
+    logger.info(f"Found {len(todo)}/{len(region_ids)} regions to process with {workers} worker(s)")
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="market") as pool:
+            list(pool.map(lambda r: fetch_region_market(r, run_id), todo))
+    else:
+        for region_id in todo:
+            fetch_region_market(region_id, run_id)
+
+    collect_generations()
+    if not pending_regions(CRAWL, run_id, region_ids):
+        finish_crawl(run_id)
+        logger.info("Completed fetch of all market data")
+    else:
+        logger.warning("Market crawl finished with failed regions, the next run resumes them")
@@ -7,7 +7,7 @@ import requests
 from datetime import datetime
 from typing import Optional
 
-from db.database import get_public_session
+from db.database import get_public_session, get_private_session
 from db.models import Structure, MarketStructure, MarketOrder, Asset, IndustryJob
 from util.utils import get_token
 
@@ -31,7 +31,7 @@ def fetch_public_structures() -> set[int]:
 def discover_private_structure_ids(owner_id: int) -> set[int]:
     """Discover potential private structure IDs from private assets and industry jobs."""
     ids = set()
-    with get_db_session(owner_id=owner_id) as session:
+    with get_private_session(owner_id) as session:
         for (loc,) in session.query(Asset.location_id).distinct():
             if loc and loc > INT32_MAX:
                 ids.add(loc)
@@ -93,7 +93,7 @@ def discover_structures(owner_id: int) -> None:
 
     market_structure_ids = []
 
-    with get_db_session(owner_id=owner_id) as db:
+    with get_public_session() as db:
         for sid in sorted(combined_ids):
             logger.info(f"[MarketStructure] ▶️ Scanning Structure {sid}")
 
@@ -124,6 +124,7 @@ def discover_structures(owner_id: int) -> None:
                     for order in orders:
                         db.merge(MarketOrder(
                             id=order["order_id"],
+                            generation=0,       # structure orders are not versioned
                             region_id=None,
                             type_id=order["type_id"],
                             price=order["price"],
@@ -7,7 +7,10 @@ import shutil
 import yaml
 import logging
 import time
-from util.sde import build_universe_table
+from util.sde import build_universe_table, write_sde_version
+from route.spatial_index import build_spatial_index
+from util.names import build_name_index
+from util.skill_index import build_skill_index
 
 logger = logging.getLogger(__name__)
 
@@ -111,7 +114,11 @@ def update_sde():
     unzip_sde()
     migrate_sde_inplace()
     cleanup()
+    write_sde_version()
     build_universe_table()
+    build_spatial_index()
+    build_name_index()
+    build_skill_index()
 
 # ──────── Run Script ─────────────────────────────────────────────────────────────
 
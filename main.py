@@ -16,11 +16,13 @@ try:
     import requests_oauthlib
     import jwt
     import yaml
+    import numpy
+    import aiohttp
 except ImportError:
     logger.warning("Missing dependencies. Installing from requirements.txt...")
     subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
 # load envs
-from util.utils import load_config
+from util.config import load_config
 load_config()
 
 
@@ -7,6 +7,7 @@ from collections import deque
 # Paths
 MODULE_DIR  = os.path.dirname(os.path.abspath(__file__))
 SYSTEM_GRAPH_FILE = os.path.join(MODULE_DIR, ".gitignore", "system_graph.json")
+SYSTEM_SECURITY_FILE = os.path.join(MODULE_DIR, ".gitignore", "system_security.json")
 
 SDE_UNIVERSE_FOLDER = "../_sde/universe/eve"
 # Use faster CLoader if available
@@ -58,6 +59,31 @@ def build_graph():
     return graph
 
 
+def build_security_map():
+    """Crawls the SDE_UNIVERSE_FOLDER and maps each solar system to its true security status."""
+    security = {}
+    for root, _, files in os.walk(SDE_UNIVERSE_FOLDER):
+        for file in files:
+            if file == "solarsystem.yaml":
+                with open(os.path.join(root, file), encoding="utf-8") as f:
+                    data = yaml.load(f, Loader=Loader)
+                security[data.get("solarSystemID")] = float(data.get("security", 0.0))
+    return security
+
+
+def save_security_map(security, path=SYSTEM_SECURITY_FILE):
+    """Saves the system security map to JSON on disk."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(security, f)
+
+
+def load_security_map(path=SYSTEM_SECURITY_FILE):
+    """Loads the system security map from JSON on disk, keyed by integer system ID."""
+    with open(path, encoding='utf-8') as f:
+        return {int(k): v for k, v in json.load(f).items()}
+
+
 def save_graph(graph, path=SYSTEM_GRAPH_FILE):
     """Saves the system graph to JSON on disk."""
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -95,6 +121,11 @@ if __name__ == "__main__":
         g = build_graph()
         save_graph(g)
         print(f"Graph saved to {SYSTEM_GRAPH_FILE} ({len(g)} systems) ")
+    if not os.path.exists(SYSTEM_SECURITY_FILE):
+        print("Building security map...")
+        sec = build_security_map()
+        save_security_map(sec)
+        print(f"Security map saved to {SYSTEM_SECURITY_FILE} ({len(sec)} systems) ")
     # Example usage
     graph = load_graph()
     start, end = list(graph.keys())[:2]
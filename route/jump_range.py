@@ -0,0 +1,146 @@
+# route/jump_range.py
+
+import os
+import logging
+from collections import deque
+from functools import lru_cache
+
+from route.buildSystemGraph import (
+    SYSTEM_GRAPH_FILE,
+    SYSTEM_SECURITY_FILE,
+    load_graph,
+    load_security_map,
+)
+
+logger = logging.getLogger(__name__)
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+RANGE_CACHE_SIZE = int(os.getenv("EVE_RANGE_CACHE_SIZE", "4096"))
+
+# Bands are inclusive ranges over the displayed (rounded) security status.
+SECURITY_BANDS = {
+    "any": (-1.0, 1.0),
+    "high": (0.5, 1.0),
+    "low": (0.1, 0.4),
+    "null": (-1.0, 0.0),
+}
+
+_graph = None
+_security = None
+_graph_stamp = None
+
+# ──────── Security Helpers ────────────────────────────────────────────────────
+
+def display_security(security: float) -> float:
+    """Round a true security status the way the game client displays it."""
+    if 0.0 < security < 0.05:
+        return 0.1
+    return round(security, 1)
+
+def normalize_band(band) -> tuple:
+    """Turn a band name ('high', 'low', 'null', 'any') or a (min, max) pair into a (min, max) tuple."""
+    if band is None:
+        band = "any"
+    if isinstance(band, str):
+        if band not in SECURITY_BANDS:
+            raise ValueError(f"Unknown security band '{band}', expected one of {sorted(SECURITY_BANDS)}")
+        return SECURITY_BANDS[band]
+    lo, hi = band
+    lo, hi = round(float(lo), 1), round(float(hi), 1)
+    if lo > hi:
+        raise ValueError(f"Invalid security band ({lo}, {hi}): min is greater than max")
+    return lo, hi
+
+def in_band(security: float, band: tuple) -> bool:
+    """Return True if a true security status falls inside a normalized band."""
+    sec = display_security(security)
+    return band[0] <= sec <= band[1]
+
+# ──────── Graph State ─────────────────────────────────────────────────────────
+
+def _file_stamp():
+    """Return the modification stamp of the graph and security files."""
+    try:
+        return os.stat(SYSTEM_GRAPH_FILE).st_mtime_ns, os.stat(SYSTEM_SECURITY_FILE).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"System graph not built, run route/buildSystemGraph.py first ({SYSTEM_GRAPH_FILE})"
+        )
+
+def _ensure_graph():
+    """Load the graph on first use and reload it (dropping cached ranges) when the files change."""
+    global _graph, _security, _graph_stamp
+
+    if _graph is not None and _graph_stamp is None:
+        return  # Graph was injected with set_graph(), not backed by files
+    stamp = _file_stamp()
+    if stamp == _graph_stamp:
+        return
+
+    _graph = {int(k): [int(n) for n in v] for k, v in load_graph().items()}
+    _security = load_security_map()
+    _graph_stamp = stamp
+    _range_query.cache_clear()
+    logger.info(f"[JumpRange] Loaded system graph ({len(_graph)} systems), range cache cleared")
+
+def set_graph(graph: dict, security: dict):
+    """Use an in-memory graph and security map instead of the on-disk files."""
+    global _graph, _security, _graph_stamp
+    _graph = {int(k): [int(n) for n in v] for k, v in graph.items()}
+    _security = {int(k): float(v) for k, v in security.items()}
+    _graph_stamp = None
+    _range_query.cache_clear()
+
+def invalidate_range_cache():
+    """Drop cached range results and force the graph to be reloaded from disk."""
+    global _graph, _security, _graph_stamp
+    _graph = _security = _graph_stamp = None
+    _range_query.cache_clear()
+
+def range_cache_info():
+    """Return the LRU statistics of the range cache."""
+    return _range_query.cache_info()
+
+# ──────── Range Queries ───────────────────────────────────────────────────────
+
+@lru_cache(maxsize=RANGE_CACHE_SIZE)
+def _range_query(origin: int, max_jumps: int, band: tuple) -> tuple:
+    """Breadth-first search out to max_jumps, only stepping into systems inside the band."""
+    rings = [(origin,)]
+    visited = {origin}
+    frontier = deque([origin])
+
+    for _ in range(max_jumps):
+        ring = []
+        for _ in range(len(frontier)):
+            sys_id = frontier.popleft()
+            for nbr in _graph.get(sys_id, ()):
+                if nbr in visited:
+                    continue
+                visited.add(nbr)
+                if not in_band(_security.get(nbr, -1.0), band):
+                    continue
+                ring.append(nbr)
+                frontier.append(nbr)
+        if not ring:
+            break
+        rings.append(tuple(sorted(ring)))
+
+    return tuple(rings)
+
+def systems_within_jumps(origin: int, max_jumps: int, security="any") -> dict:
+    """
+    Return { jumps: [system_id, ...] } for every system reachable from origin in at most max_jumps
+    stargate jumps, without ever entering a system outside the security band.
+    The origin itself is always returned at distance 0.
+    """
+    if max_jumps < 0:
+        raise ValueError("max_jumps must be zero or positive")
+    _ensure_graph()
+    origin = int(origin)
+    if origin not in _graph:
+        raise KeyError(f"Unknown solar system {origin}")
+
+    rings = _range_query(origin, int(max_jumps), normalize_band(security))
+    return {dist: list(ring) for dist, ring in enumerate(rings)}
@@ -1,9 +1,12 @@
 # route/route.py
 
 import os
+import hashlib
 import logging
 import requests
 from util.utils import resolve_names_to_ids
+from util.sde import sde_version
+from route.route_cache import RouteCache, route_cache
 
 ESI = "https://esi.evetech.net/latest"
 HEADERS = {"Accept": "application/json"}
@@ -11,22 +14,62 @@ HEADERS = {"Accept": "application/json"}
 MODULE_DIR  = os.path.dirname(os.path.abspath(__file__))
 JUMPGATE_PATH = os.path.join(MODULE_DIR, ".gitignore", "JUMPGATES.txt")
 
-def getRoute(origin, destination):
-    jump_pairs = []
-    all_keys = set()
+ROUTE_FLAGS = ("shortest", "secure", "insecure")
 
-    with open(JUMPGATE_PATH, 'r') as f:
-        for line in f:
-            a, b = line.strip().split(',')
-            jump_pairs.append((a, b))
-            all_keys.update([a, b])
+_bridges = (None, None, [])     # (file stamp, fingerprint, [(a_id, b_id), ...])
+
+def load_jump_bridges() -> tuple:
+    """
+    Return (fingerprint, [(system_id, system_id), ...]) for JUMPGATES.txt.
+    The file is only re-read and re-resolved when its size or mtime changes.
+    """
+    global _bridges
+    if not os.path.exists(JUMPGATE_PATH):
+        return "none", []
+
+    st = os.stat(JUMPGATE_PATH)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if stamp == _bridges[0]:
+        return _bridges[1], _bridges[2]
+
+    with open(JUMPGATE_PATH, 'rb') as f:
+        raw = f.read()
+    fingerprint = hashlib.sha1(raw).hexdigest()
 
-    all_keys.update([str(origin), str(destination)])
+    jump_pairs = []
+    for line in raw.decode("utf-8").splitlines():
+        if line.strip():
+            a, b = line.strip().split(',')
+            jump_pairs.append((a.strip(), b.strip()))
 
     # Identify string-based names (non-numeric)
-    names_to_resolve = [k for k in all_keys if not k.isdigit()]
+    names_to_resolve = list({k for pair in jump_pairs for k in pair if not k.isdigit()})
     name_to_id = resolve_names_to_ids(names_to_resolve)
 
+    def to_id(val):
+        return int(val) if val.isdigit() else name_to_id.get(val)
+
+    connections = [
+        (to_id(a), to_id(b))
+        for a, b in jump_pairs
+        if to_id(a) is not None and to_id(b) is not None
+    ]
+
+    _bridges = (stamp, fingerprint, connections)
+    logging.info(f"[Route] Loaded {len(connections)} jump bridges (fingerprint {fingerprint[:12]})")
+    return fingerprint, connections
+
+def getRoute(origin, destination, flag="shortest", avoid=None):
+    """
+    Return the list of system IDs from origin to destination (names or IDs), using our jump bridges.
+    Results are cached per (origin, destination, flag, avoid) and expire when JUMPGATES.txt or the SDE changes.
+    """
+    if flag not in ROUTE_FLAGS:
+        raise ValueError(f"Unknown route flag '{flag}', expected one of {ROUTE_FLAGS}")
+
+    names_to_resolve = [str(k) for k in (origin, destination, *(avoid or ())) if not str(k).isdigit()]
+    name_to_id = resolve_names_to_ids(names_to_resolve) if names_to_resolve else {}
+
     def to_id(val):
         return int(val) if str(val).isdigit() else name_to_id.get(val)
 
@@ -37,21 +80,30 @@ def getRoute(origin, destination):
     if origin_id is None or destination_id is None:
         logging.error("Origin or destination name could not be resolved.")
         return
+    avoid_ids = [to_id(a) for a in avoid or () if to_id(a) is not None]
 
-    connections = ",".join(
-        f"{to_id(a)}|{to_id(b)}"
-        for a, b in jump_pairs
-        if to_id(a) is not None and to_id(b) is not None
-    )
+    fingerprint, jump_pairs = load_jump_bridges()
+    key = RouteCache.make_key(origin_id, destination_id, flag, avoid_ids, fingerprint, sde_version())
+    cached = route_cache.get(key)
+    if cached is not None:
+        return cached
 
-    route_url = (
-        f"{ESI}/route/{origin_id}/{destination_id}/"
-        f"?connections={connections}&datasource=tranquility&flag=shortest"
-    )
+    params = {"datasource": "tranquility", "flag": flag}
+    if jump_pairs:
+        params["connections"] = ",".join(f"{a}|{b}" for a, b in jump_pairs)
+    if avoid_ids:
+        params["avoid"] = ",".join(str(a) for a in sorted(set(avoid_ids)))
+
+    resp = requests.get(f"{ESI}/route/{origin_id}/{destination_id}/", headers=HEADERS, params=params)
+    if not resp.ok:
+        logging.error(f"ROUTE RESPONSE {resp.status_code}: {resp.text}")
+        return
 
-    resp = requests.get(route_url, headers=HEADERS)
-    print(f"ROUTE RESPONSE {resp.status_code}: {resp.text}")
+    route = resp.json()
+    route_cache.put(key, route)
+    return route
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
-    getRoute(30000142, 30005133)
+    print(getRoute(30000142, 30005133))
+    print(route_cache.hit_rate())
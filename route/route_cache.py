@@ -0,0 +1,120 @@
+# route/route_cache.py
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from db.storage_profiles import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROUTE_CACHE_FILE = os.getenv("EVE_ROUTE_CACHE_FILE", os.path.join(MODULE_DIR, ".gitignore", "route_cache.db"))
+ROUTE_CACHE_SIZE = int(os.getenv("EVE_ROUTE_CACHE_SIZE", "2048"))
+ROUTE_CACHE_DISK = os.getenv("EVE_ROUTE_CACHE_DISK", "0") == "1"
+
+# ──────── Cache ───────────────────────────────────────────────────────────────
+
+class RouteCache:
+    """
+    Two-tier route cache: an in-memory LRU in front of an optional SQLite file.
+    Keys carry the jump-bridge fingerprint and SDE version, so entries from an older
+    bridge list or SDE are never matched and are pruned from disk on the next write.
+    """
+
+    def __init__(self, size: int = ROUTE_CACHE_SIZE, disk_path: str = None):
+        self.size = size
+        self.disk_path = disk_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None     # (bridge fingerprint, sde version) of the last write
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            with connect_sqlite(disk_path) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS route_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        bridge_fingerprint TEXT,
+                        sde_version TEXT,
+                        route TEXT
+                    )
+                """)
+
+    @staticmethod
+    def make_key(origin_id: int, destination_id: int, flag: str, avoid, bridge_fingerprint: str, sde_version: str) -> tuple:
+        return (int(origin_id), int(destination_id), flag, tuple(sorted(int(a) for a in avoid or ())), bridge_fingerprint, sde_version)
+
+    def get(self, key: tuple):
+        """Return the cached route for key, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+
+        if self.disk_path:
+            with connect_sqlite(self.disk_path) as conn:
+                row = conn.execute("SELECT route FROM route_cache WHERE cache_key = ?", (json.dumps(key),)).fetchone()
+            if row:
+                route = json.loads(row[0])
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                self._remember(key, route)
+                return route
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key: tuple, route: list):
+        """Store a route in memory and, if enabled, on disk."""
+        self._remember(key, route)
+        if not self.disk_path:
+            return
+
+        generation = key[-2:]
+        with connect_sqlite(self.disk_path) as conn:
+            if generation != self._generation:
+                conn.execute(
+                    "DELETE FROM route_cache WHERE bridge_fingerprint != ? OR sde_version != ?", generation
+                )
+                self._generation = generation
+            conn.execute(
+                "INSERT OR REPLACE INTO route_cache (cache_key, bridge_fingerprint, sde_version, route) VALUES (?, ?, ?, ?)",
+                (json.dumps(key), *generation, json.dumps(route)),
+            )
+
+    def _remember(self, key: tuple, route: list):
+        with self._lock:
+            self._memory[key] = route
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        """Drop every cached route from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if self.disk_path:
+            with connect_sqlite(self.disk_path) as conn:
+                conn.execute("DELETE FROM route_cache")
+
+    def hit_rate(self) -> dict:
+        """Return the hit/miss counters plus the overall and per-tier hit rates."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_hit_rate"] = stats["memory_hits"] / lookups if lookups else 0.0
+        return stats
+
+route_cache = RouteCache(disk_path=ROUTE_CACHE_FILE if ROUTE_CACHE_DISK else None)
@@ -0,0 +1,214 @@
+# route/spatial_index.py
+
+import os
+import json
+import math
+import heapq
+import logging
+
+from route.jump_range import in_band, normalize_band
+from util.sde import iter_solar_systems
+
+logger = logging.getLogger(__name__)
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+SPATIAL_INDEX_FILE = os.path.join(MODULE_DIR, ".gitignore", "system_positions.json")
+
+METERS_PER_LY = 9_460_730_472_580_800
+CELL_SIZE_LY = float(os.getenv("EVE_SPATIAL_CELL_LY", "2.0"))
+
+WORMHOLE_SYSTEM_ID_MIN = 31_000_000
+NO_CYNO_REGIONS = {10000070}            # Pochven
+JUMP_DRIVE_BAND = (-1.0, 0.4)           # Jump drives cannot enter high-sec
+
+# Jump fatigue model, in minutes
+MIN_FATIGUE = 10.0
+MAX_FATIGUE = 300.0
+MAX_COOLDOWN = 30.0
+
+_index = None
+_index_stamp = None
+
+# ──────── Build (SDE compile time) ────────────────────────────────────────────
+
+def _cell_of(x: float, y: float, z: float, cell_size: float) -> tuple:
+    return math.floor(x / cell_size), math.floor(y / cell_size), math.floor(z / cell_size)
+
+def build_spatial_index(path=SPATIAL_INDEX_FILE, cell_size=CELL_SIZE_LY) -> int:
+    """Extract k-space system coordinates (in light years) from the SDE and save them with their grid cells."""
+    systems = {}
+    cells = {}
+
+    for system in iter_solar_systems():
+        sys_id = system["system_id"]
+        if sys_id >= WORMHOLE_SYSTEM_ID_MIN:
+            continue
+        x, y, z = (c / METERS_PER_LY for c in system["center"])
+        systems[sys_id] = [x, y, z, system["security"], system["region_id"]]
+        cells.setdefault(",".join(map(str, _cell_of(x, y, z, cell_size))), []).append(sys_id)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"cell_size": cell_size, "systems": systems, "cells": cells}, f)
+
+    logger.info(f"[SpatialIndex] Indexed {len(systems)} systems into {len(cells)} cells at {path}")
+    return len(systems)
+
+# ──────── Index ───────────────────────────────────────────────────────────────
+
+class SpatialIndex:
+    """Uniform grid over system coordinates for fixed-radius light-year queries."""
+
+    def __init__(self, systems: dict, cell_size: float, cells: dict = None):
+        self.cell_size = cell_size
+        self.positions = {int(k): (v[0], v[1], v[2]) for k, v in systems.items()}
+        self.security = {int(k): v[3] for k, v in systems.items()}
+        self.region = {int(k): v[4] for k, v in systems.items()}
+
+        if cells is None:
+            self.cells = {}
+            for sys_id, (x, y, z) in self.positions.items():
+                self.cells.setdefault(_cell_of(x, y, z, cell_size), []).append(sys_id)
+        else:
+            self.cells = {tuple(map(int, k.split(","))): v for k, v in cells.items()}
+
+    def distance(self, a: int, b: int) -> float:
+        """Straight-line distance between two systems in light years."""
+        return math.dist(self.positions[a], self.positions[b])
+
+    def within(self, origin: int, radius_ly: float, security=None, region_id: int = None) -> list:
+        """Return [(system_id, ly), ...] within radius of origin, nearest first, excluding origin."""
+        if origin not in self.positions:
+            raise KeyError(f"Unknown k-space solar system {origin}")
+        band = normalize_band(security) if security is not None else None
+        ox, oy, oz = self.positions[origin]
+        cx, cy, cz = _cell_of(ox, oy, oz, self.cell_size)
+        reach = math.ceil(radius_ly / self.cell_size)
+        r2 = radius_ly * radius_ly
+
+        hits = []
+        for i in range(cx - reach, cx + reach + 1):
+            for j in range(cy - reach, cy + reach + 1):
+                for k in range(cz - reach, cz + reach + 1):
+                    for sys_id in self.cells.get((i, j, k), ()):
+                        x, y, z = self.positions[sys_id]
+                        d2 = (x - ox) ** 2 + (y - oy) ** 2 + (z - oz) ** 2
+                        if d2 > r2 or sys_id == origin:
+                            continue
+                        if region_id is not None and self.region[sys_id] != region_id:
+                            continue
+                        if band is not None and not in_band(self.security[sys_id], band):
+                            continue
+                        hits.append((sys_id, math.sqrt(d2)))
+
+        hits.sort(key=lambda h: h[1])
+        return hits
+
+def load_spatial_index(path=SPATIAL_INDEX_FILE) -> SpatialIndex:
+    """Return the spatial index, reloading it when the file on disk changes."""
+    global _index, _index_stamp
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Spatial index not built, run an SDE update first ({path})")
+
+    if _index is None or stamp != _index_stamp:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        _index = SpatialIndex(data["systems"], data["cell_size"], data["cells"])
+        _index_stamp = stamp
+        logger.info(f"[SpatialIndex] Loaded {len(_index.positions)} systems from {path}")
+    return _index
+
+# ──────── Queries ─────────────────────────────────────────────────────────────
+
+def systems_within_ly(origin: int, radius_ly: float, security=None, region_id: int = None) -> list:
+    """Return [(system_id, ly), ...] within radius_ly of origin, nearest first."""
+    return load_spatial_index().within(int(origin), radius_ly, security, region_id)
+
+def cyno_options(origin: int, jump_range_ly: float, region_id: int = None, security=JUMP_DRIVE_BAND) -> list:
+    """Return every system a jump drive can reach from origin, optionally limited to one region."""
+    index = load_spatial_index()
+    return [
+        (sys_id, ly) for sys_id, ly in index.within(int(origin), jump_range_ly, security, region_id)
+        if index.region[sys_id] not in NO_CYNO_REGIONS
+    ]
+
+def jump_fatigue(fatigue: float, ly: float, reduction: float = 0.0) -> tuple:
+    """
+    Apply one jump of ly light years to the current fatigue (minutes).
+    Returns (fatigue_after, cooldown), both in minutes.
+    """
+    effective = ly * (1.0 - reduction)
+    cooldown = min(MAX_COOLDOWN, max(fatigue / 10.0, 1.0 + effective))
+    fatigue_after = min(MAX_FATIGUE, max(fatigue, MIN_FATIGUE) * (1.0 + effective))
+    return fatigue_after, cooldown
+
+def plan_jump_route(
+    origin: int,
+    destination: int,
+    jump_range_ly: float,
+    fatigue_reduction: float = 0.0,
+    security=JUMP_DRIVE_BAND,
+    avoid=(),
+) -> dict:
+    """
+    Plan a jump-drive route that minimises the number of jumps, then the fatigue on arrival.
+    Midpoints must fall inside the security band and outside `avoid`.
+    Returns { route: [ {system_id, ly, fatigue, cooldown}, ... ], jumps, total_ly, fatigue } or None.
+    """
+    index = load_spatial_index()
+    origin, destination = int(origin), int(destination)
+    if destination not in index.positions:
+        raise KeyError(f"Unknown k-space solar system {destination}")
+    avoid = set(avoid)
+
+    # Labels are (jumps, fatigue, total_ly), ignoring fatigue decay between jumps.
+    # The queue is ordered A*-style by a jump lower bound: ceil(remaining ly / range).
+    def min_jumps_left(sys_id):
+        return math.ceil(index.distance(sys_id, destination) / jump_range_ly)
+
+    best = {origin: (0, 0.0, 0.0)}
+    previous = {origin: None}
+    queue = [(min_jumps_left(origin), 0.0, 0.0, 0, origin)]
+
+    while queue:
+        _, fatigue, total_ly, jumps, sys_id = heapq.heappop(queue)
+        if (jumps, fatigue, total_ly) != best.get(sys_id):
+            continue
+        if sys_id == destination:
+            break
+
+        for nbr, ly in index.within(sys_id, jump_range_ly, security):
+            if nbr in avoid or index.region[nbr] in NO_CYNO_REGIONS:
+                continue
+            fatigue_after, _ = jump_fatigue(fatigue, ly, fatigue_reduction)
+            label = (jumps + 1, fatigue_after, total_ly + ly)
+            if nbr not in best or label < best[nbr]:
+                best[nbr] = label
+                previous[nbr] = sys_id
+                heapq.heappush(queue, (label[0] + min_jumps_left(nbr), label[1], label[2], label[0], nbr))
+
+    if destination not in best:
+        return None
+
+    path = [destination]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    path.reverse()
+
+    route = []
+    fatigue = 0.0
+    for a, b in zip(path, path[1:]):
+        ly = index.distance(a, b)
+        fatigue, cooldown = jump_fatigue(fatigue, ly, fatigue_reduction)
+        route.append({"system_id": b, "ly": round(ly, 3), "fatigue": round(fatigue, 1), "cooldown": round(cooldown, 1)})
+
+    return {
+        "route": route,
+        "jumps": len(route),
+        "total_ly": round(sum(leg["ly"] for leg in route), 3),
+        "fatigue": route[-1]["fatigue"] if route else 0.0,
+    }
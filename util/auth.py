@@ -4,17 +4,19 @@ import os
 import json
 import time
 import shutil
-import sqlite3
 import requests
 import logging
+import threading
 from typing import Optional, Tuple
 from requests.auth import HTTPBasicAuth
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth2Session
 from cryptography.fernet import Fernet
 from ruamel.yaml import YAML
 import jwt
 from jwt import decode, get_unverified_header
 from jwt.algorithms import RSAAlgorithm
+from db.storage_profiles import connect_sqlite
 
 # ─────── Globals ─────────────────────────────────────────────────────────────
 logger = logging.getLogger(__name__)
@@ -29,34 +31,55 @@ JWKS_CACHE = os.path.join(PUBLIC_DATA_FOLDER, "jwks.json")
 
 TOKEN_URL = "https://login.eveonline.com/v2/oauth/token"
 AUTH_URL = "https://login.eveonline.com/v2/oauth/authorize"
+JWKS_URL = "https://login.eveonline.com/oauth/jwks"
+
+JWKS_MIN_REFETCH = 60       # seconds between JWKS downloads triggered by unknown kids
+
+# Pooled HTTP session for SSO calls (keep-alive instead of a new TLS handshake per refresh)
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+_fernet = None
 
 # ─────── Utility Functions ───────────────────────────────────────────────────
 def ensure_folder(path: str):
     os.makedirs(path, exist_ok=True)
 
 def get_encryption_key() -> Fernet:
-    """Load or create encryption key."""
+    """Load or create encryption key (read from disk once per process)."""
+    global _fernet
+    if _fernet is not None:
+        return _fernet
+
     ensure_folder(PUBLIC_DATA_FOLDER)
     if not os.path.exists(KEY_FILE):
         with open(KEY_FILE, "wb") as f:
             f.write(Fernet.generate_key())
     with open(KEY_FILE, "rb") as f:
-        return Fernet(f.read())
+        _fernet = Fernet(f.read())
+    return _fernet
 
 # ─────── Classes ─────────────────────────────────────────────────────────────
 class CredentialManager:
     """Handles loading and saving client credentials."""
+    _cache = (None, None)       # (credential file mtime, decrypted credentials)
+
     @staticmethod
     def load_credentials() -> Tuple[str, str, str, str]:
-        fernet = get_encryption_key()
-
+        """Return (client_id, client_secret, redirect_uri, scopes), decrypting the file only when it changes."""
         if not os.path.exists(CLIENT_CRED_FILE):
             logger.info("[CredentialManager] No credentials found. Setup required.")
-            return CredentialManager.setup_credentials(fernet)
+            return CredentialManager.setup_credentials(get_encryption_key())
+
+        mtime = os.stat(CLIENT_CRED_FILE).st_mtime_ns
+        if CredentialManager._cache[0] == mtime:
+            return CredentialManager._cache[1]
 
         with open(CLIENT_CRED_FILE, "rb") as f:
-            creds = json.loads(fernet.decrypt(f.read()).decode())
-            return creds["client_id"], creds["client_secret"], creds["redirect_uri"], creds["scopes"]
+            creds = json.loads(get_encryption_key().decrypt(f.read()).decode())
+        result = creds["client_id"], creds["client_secret"], creds["redirect_uri"], creds["scopes"]
+        CredentialManager._cache = (mtime, result)
+        return result
 
     @staticmethod
     def setup_credentials(fernet: Fernet) -> Tuple[str, str, str, str]:
@@ -98,7 +121,7 @@ class TokenDBManager:
         self._init_db()
 
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_sqlite(self.db_path)
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS tokens (
@@ -118,7 +141,7 @@ class TokenDBManager:
         conn.close()
 
     def save_tokens(self, character_id: int, access_token: str, refresh_token: str, expires_at: float, scopes: str):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_sqlite(self.db_path)
         cursor = conn.cursor()
         cursor.execute("""
             INSERT OR REPLACE INTO tokens (character_id, access_token, refresh_token, expires_at, scopes)
@@ -135,20 +158,61 @@ class TokenDBManager:
         path = os.path.join(PRIVATE_DATA_FOLDER, str(owner_id), f"{owner_id}.db")
         return path if os.path.exists(path) else None
 
+class JWKSCache:
+    """
+    SSO signing keys parsed once and kept by kid. The JWKS is only downloaded again when a token
+    names a kid we don't know (key rotation), at most once per JWKS_MIN_REFETCH seconds.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._loaded = False
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _parse(self, jwks: dict):
+        self._keys = {k["kid"]: RSAAlgorithm.from_jwk(json.dumps(k)) for k in jwks.get("keys", []) if "kid" in k}
+
+    def _fetch(self):
+        jwks = _http.get(JWKS_URL, timeout=10).json()
+        self._fetched_at = time.time()
+        ensure_folder(PUBLIC_DATA_FOLDER)
+        with open(JWKS_CACHE, "w") as f:
+            json.dump(jwks, f)
+        self._parse(jwks)
+        logger.info(f"[SSO] Fetched JWKS ({len(self._keys)} keys)")
+
+    def key(self, kid: str):
+        """Return the public key for a kid, refetching the JWKS if it's unknown."""
+        with self._lock:
+            if not self._loaded:
+                if os.path.exists(JWKS_CACHE):
+                    with open(JWKS_CACHE, "r") as f:
+                        self._parse(json.load(f))
+                self._loaded = True
+            if kid not in self._keys and time.time() - self._fetched_at > JWKS_MIN_REFETCH:
+                self._fetch()
+            if kid not in self._keys:
+                raise KeyError(f"Unknown JWT kid '{kid}'")
+            return self._keys[kid]
+
+jwks_cache = JWKSCache()
+
 class SSOManager:
     """Manages EVE SSO authentication flows."""
 
     @staticmethod
     def refresh_token(refresh_token: str) -> dict:
         client_id, client_secret, _, _ = CredentialManager.load_credentials()
-        r = requests.post(
+        r = _http.post(
             TOKEN_URL,
             data={
                 "grant_type": "refresh_token",
                 "refresh_token": refresh_token,
                 "client_id": client_id,
                 "client_secret": client_secret
-            }
+            },
+            timeout=30,
         )
         r.raise_for_status()
         token_data = r.json()
@@ -156,20 +220,15 @@ class SSOManager:
         return token_data
 
     @staticmethod
-    def validate_token(token: str, refresh_token: str) -> str:
-        if os.path.exists(JWKS_CACHE):
-            with open(JWKS_CACHE, "r") as f:
-                jwks = json.load(f)
-        else:
-            jwks = requests.get("https://login.eveonline.com/oauth/jwks").json()
-            ensure_folder(PUBLIC_DATA_FOLDER)
-            with open(JWKS_CACHE, "w") as f:
-                json.dump(jwks, f)
+    def verify_token(token: str) -> dict:
+        """Check an access token's signature, audience and expiry in memory; returns its claims."""
+        key = jwks_cache.key(get_unverified_header(token)["kid"])
+        return decode(token, key, algorithms=["RS256"], audience="EVE Online", options={"verify_exp": True})
 
+    @staticmethod
+    def validate_token(token: str, refresh_token: str) -> str:
         try:
-            kid = get_unverified_header(token)["kid"]
-            key = next(RSAAlgorithm.from_jwk(json.dumps(k)) for k in jwks["keys"] if k["kid"] == kid)
-            decode(token, key, algorithms=["RS256"], audience="EVE Online", options={"verify_exp": True})
+            SSOManager.verify_token(token)
             return token
         except Exception:
             refreshed = SSOManager.refresh_token(refresh_token)
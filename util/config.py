@@ -0,0 +1,39 @@
+# util/config.py
+
+import os
+import logging
+import yaml
+
+# Import nothing from the project here: config.yaml has to be loaded before modules that read
+# their settings from the environment at import time (db.database, db.storage_profiles...).
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config.yaml"
+
+# ──────── Config Loader ─────────────────────────────────────────────────────────
+
+def load_config(config_path: str = CONFIG_PATH) -> dict:
+    """
+    Loads Environment Variables from a config.yaml into os.environ.
+    Returns the full config dict.
+    """
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"Config file not found: {config_path}")
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+
+    env_vars = cfg.get("Environment Variables", {})
+    if not isinstance(env_vars, dict):
+        raise ValueError("Expected 'Environment Variables' to be a dictionary in config.yaml")
+
+    for key, value in env_vars.items():
+        if key not in os.environ:
+            if isinstance(value, list):
+                os.environ[key] = ",".join(str(v) for v in value)
+            else:
+                os.environ[key] = str(value)
+
+    logger.info(f"Loaded {len(env_vars)} environment variables from {config_path}")
+    return cfg
@@ -0,0 +1,360 @@
+# util/names.py
+
+import os
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import delete, insert
+
+from db.database import get_public_session
+from db.models import NameEntry, EntityName, Structure, UnresolvedName
+from util.sde import iter_item_names, iter_type_names
+
+logger = logging.getLogger(__name__)
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+ESI_BASE = "https://esi.evetech.net/latest"
+HEADERS = {"Accept": "application/json"}
+
+# invNames ID ranges for the static categories we index (named like ESI /universe/ids/ categories)
+STATIC_ID_RANGES = (
+    ("regions", 10_000_000, 20_000_000),
+    ("constellations", 20_000_000, 30_000_000),
+    ("systems", 30_000_000, 40_000_000),
+    ("stations", 60_000_000, 64_000_000),
+)
+TYPE_CATEGORY = "inventory_types"
+ESI_IDS_BATCH = 500
+
+ESI_NAMES_BATCH = 1000
+SQLITE_IN_BATCH = 900
+INT32_MAX = 2_147_483_647
+
+ID_CACHE_SIZE = int(os.getenv("EVE_NAME_CACHE_SIZE", "50000"))
+NAME_TTLS = {
+    "character": timedelta(days=7),
+    "corporation": timedelta(days=1),
+    "alliance": timedelta(days=1),
+    "structure": timedelta(days=1),
+    "faction": timedelta(days=30),
+}
+DEFAULT_NAME_TTL = timedelta(days=7)
+UNRESOLVED_TTL = timedelta(hours=1)
+
+_lock = threading.RLock()
+_by_name = None         # name  -> [(category, id)]
+_by_lower = None        # lower -> [(category, id, name)]
+_prefix_keys = None     # sorted [(lower, category, id, name)] for bisect prefix scans
+
+_id_lock = threading.Lock()
+_id_cache = OrderedDict()   # id -> (name, expires_at); LRU in front of entity_names
+
+# ──────── Build (SDE compile time) ────────────────────────────────────────────
+
+def category_for_id(item_id: int):
+    """Return the static category of an invNames item ID, or None if it is not indexed."""
+    for category, lo, hi in STATIC_ID_RANGES:
+        if lo <= item_id < hi:
+            return category
+    return None
+
+def build_name_index() -> int:
+    """Rebuild the SDE part of the name index (ESI-resolved names are kept)."""
+    now = datetime.utcnow()
+    rows = []
+    for item_id, name in iter_item_names():
+        category = category_for_id(item_id)
+        if category:
+            rows.append(_row(category, item_id, name, "sde", now))
+    for type_id, name in iter_type_names():
+        rows.append(_row(TYPE_CATEGORY, type_id, name, "sde", now))
+
+    with get_public_session() as db:
+        db.execute(delete(NameEntry).where(NameEntry.source == "sde"))
+        if rows:
+            db.execute(insert(NameEntry).prefix_with("OR REPLACE"), rows)
+        db.commit()
+
+    _reset()
+    logger.info(f"[Names] Indexed {len(rows)} SDE names")
+    return len(rows)
+
+def _row(category: str, entity_id: int, name: str, source: str, now: datetime) -> dict:
+    return {
+        "category": category,
+        "entity_id": entity_id,
+        "name": name,
+        "name_lower": name.lower(),
+        "source": source,
+        "updated_at": now,
+    }
+
+# ──────── In-Memory Index ─────────────────────────────────────────────────────
+
+def _reset():
+    global _by_name, _by_lower, _prefix_keys
+    with _lock:
+        _by_name = _by_lower = _prefix_keys = None
+
+def _ensure_loaded():
+    """Load the name index from the public database on first use."""
+    global _by_name, _by_lower, _prefix_keys
+    if _by_name is not None:
+        return
+
+    with _lock:
+        if _by_name is not None:
+            return
+        by_name, by_lower, keys = {}, {}, []
+        with get_public_session() as db:
+            for category, entity_id, name in db.query(NameEntry.category, NameEntry.entity_id, NameEntry.name):
+                lower = name.lower()
+                by_name.setdefault(name, []).append((category, entity_id))
+                by_lower.setdefault(lower, []).append((category, entity_id, name))
+                keys.append((lower, category, entity_id, name))
+        keys.sort()
+        _by_lower, _prefix_keys, _by_name = by_lower, keys, by_name
+        logger.info(f"[Names] Loaded {len(keys)} names into memory")
+
+def _remember(category: str, entity_id: int, name: str):
+    """Add a single name to the in-memory index."""
+    lower = name.lower()
+    with _lock:
+        if (category, entity_id) in _by_name.get(name, []):
+            return
+        _by_name.setdefault(name, []).append((category, entity_id))
+        _by_lower.setdefault(lower, []).append((category, entity_id, name))
+        bisect.insort(_prefix_keys, (lower, category, entity_id, name))
+
+# ──────── Lookups ─────────────────────────────────────────────────────────────
+
+def lookup_name(name: str, category: str = None, case_sensitive: bool = False) -> list:
+    """Return [(category, id, name), ...] matching a name exactly (or case-insensitively)."""
+    _ensure_loaded()
+    if case_sensitive:
+        matches = [(cat, eid, name) for cat, eid in _by_name.get(name, [])]
+    else:
+        matches = list(_by_lower.get(name.lower(), []))
+    if category:
+        matches = [m for m in matches if m[0] == category]
+    return matches
+
+def prefix_search(prefix: str, category: str = None, limit: int = 20) -> list:
+    """Return up to `limit` names starting with prefix (case-insensitive), shortest names first."""
+    _ensure_loaded()
+    lower = prefix.lower()
+    if not lower:
+        return []
+
+    results = []
+    start = bisect.bisect_left(_prefix_keys, (lower,))
+    for key, cat, eid, name in _prefix_keys[start:]:
+        if not key.startswith(lower):
+            break
+        if category and cat != category:
+            continue
+        results.append({"name": name, "id": eid, "category": cat})
+        if len(results) >= limit * 4:
+            break
+
+    results.sort(key=lambda r: (len(r["name"]), r["name"]))
+    return results[:limit]
+
+def resolve_names(names: list, category: str = None) -> dict:
+    """
+    Resolve names to IDs: { name: id }.
+    The local SDE index is tried first (exact, then case-insensitive); only unknown names go to ESI,
+    and whatever ESI returns is persisted so the next lookup stays local. Names ESI knows nothing
+    about are remembered for UNRESOLVED_TTL and not sent again until then.
+    """
+    now = datetime.utcnow()
+    resolved = {}
+    missing = []
+    for name in dict.fromkeys(names):
+        matches = lookup_name(name, category, case_sensitive=True) or lookup_name(name, category)
+        if matches:
+            resolved[name] = matches[0][1]
+        else:
+            missing.append(name)
+
+    if missing:
+        unresolved = _known_unresolved(missing, now)
+        missing = [name for name in missing if name.lower() not in unresolved]
+    if missing:
+        found, answered = _resolve_via_esi(missing)
+        for name in missing:
+            for cat, eid, _ in found.get(name.lower(), []):
+                if category is None or cat == category:
+                    resolved[name] = eid
+                    break
+        _remember_unresolved({n.lower() for n in answered} - set(found), now)
+        logger.info(f"[Names] Resolved {len(resolved)} names, {len(missing)} of them sent to ESI")
+
+    return resolved
+
+def _known_unresolved(names: list, now: datetime) -> set:
+    """Lowercased names ESI recently returned nothing for (negative cache)."""
+    lowers = sorted({n.lower() for n in names})
+    unresolved = set()
+    with get_public_session() as db:
+        for i in range(0, len(lowers), SQLITE_IN_BATCH):
+            unresolved.update(n for (n,) in db.query(UnresolvedName.name_lower).filter(
+                UnresolvedName.name_lower.in_(lowers[i:i + SQLITE_IN_BATCH]), UnresolvedName.expires_at > now,
+            ))
+    return unresolved
+
+def _remember_unresolved(lowers: set, now: datetime) -> None:
+    if not lowers:
+        return
+    with get_public_session() as db:
+        for name_lower in lowers:
+            db.merge(UnresolvedName(name_lower=name_lower, expires_at=now + UNRESOLVED_TTL))
+        db.commit()
+
+def _resolve_via_esi(names: list) -> tuple:
+    """
+    POST names to ESI /universe/ids/ and persist the results. Returns ({ lower: [(category, id, name)] },
+    the names ESI actually answered for); names in a failed batch are in neither.
+    """
+    now = datetime.utcnow()
+    found = {}
+    answered = []
+    for i in range(0, len(names), ESI_IDS_BATCH):
+        batch = names[i:i + ESI_IDS_BATCH]
+        try:
+            response = requests.post(
+                f"{ESI_BASE}/universe/ids/",
+                headers=HEADERS,
+                params={"datasource": "tranquility", "language": os.getenv("LANGUAGE", "en")},
+                json=batch,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.error(f"[Names] ESI name resolution failed for {len(batch)} names: {e}")
+            continue
+        answered.extend(batch)
+
+        with get_public_session() as db:
+            for category, entries in (response.json() or {}).items():
+                for entry in entries:
+                    db.merge(NameEntry(**_row(category, entry["id"], entry["name"], "esi", now)))
+                    _remember(category, entry["id"], entry["name"])
+                    found.setdefault(entry["name"].lower(), []).append((category, entry["id"], entry["name"]))
+            db.commit()
+    return found, answered
+
+# ──────── ID → Name ───────────────────────────────────────────────────────────
+
+def resolve_ids_to_names(ids) -> dict:
+    """
+    Resolve static and dynamic IDs (types, systems, characters, corporations, structures...) to names.
+    Returns { id: name } for every ID that could be resolved.
+    Lookups go: in-process LRU → name_index / entity_names / structures tables → ESI /universe/names/.
+    """
+    now = datetime.utcnow()
+    wanted = {int(i) for i in ids if i}
+    names = {}
+
+    with _id_lock:
+        for entity_id in wanted:
+            hit = _id_cache.get(entity_id)
+            if hit and hit[1] > now:
+                _id_cache.move_to_end(entity_id)
+                if hit[0] is not None:
+                    names[entity_id] = hit[0]
+    missing = wanted - names.keys() - _cached_unresolved(wanted, now)
+    if not missing:
+        return names
+
+    found = _names_from_db(missing, now)
+    missing -= found.keys()
+    if missing:
+        found.update(_names_from_esi(missing, now))
+
+    with _id_lock:
+        for entity_id, (name, expires_at) in found.items():
+            _id_cache[entity_id] = (name, expires_at)
+            _id_cache.move_to_end(entity_id)
+        while len(_id_cache) > ID_CACHE_SIZE:
+            _id_cache.popitem(last=False)
+
+    names.update({eid: name for eid, (name, _) in found.items() if name is not None})
+    return names
+
+def _cached_unresolved(ids: set, now: datetime) -> set:
+    """IDs the LRU knows ESI could not resolve (negative cache)."""
+    with _id_lock:
+        return {i for i in ids if i in _id_cache and _id_cache[i][0] is None and _id_cache[i][1] > now}
+
+def _names_from_db(ids: set, now: datetime) -> dict:
+    """Look IDs up in the persistent tables. Returns { id: (name, expires_at) }."""
+    static_expiry = now + DEFAULT_NAME_TTL
+    found = {}
+    id_list = sorted(ids)
+
+    with get_public_session() as db:
+        for i in range(0, len(id_list), SQLITE_IN_BATCH):
+            batch = id_list[i:i + SQLITE_IN_BATCH]
+            for entity_id, name in db.query(NameEntry.entity_id, NameEntry.name).filter(NameEntry.entity_id.in_(batch)):
+                found[entity_id] = (name, static_expiry)
+            for row in db.query(EntityName).filter(EntityName.entity_id.in_(batch), EntityName.expires_at > now):
+                found.setdefault(row.entity_id, (row.name, row.expires_at))
+            structures = [sid for sid in batch if sid > INT32_MAX and sid not in found]
+            if structures:
+                for sid, name in db.query(Structure.structure_id, Structure.name).filter(Structure.structure_id.in_(structures)):
+                    if name:
+                        found[sid] = (name, now + NAME_TTLS["structure"])
+
+    return found
+
+def _names_from_esi(ids: set, now: datetime) -> dict:
+    """Resolve IDs through ESI /universe/names/ (1,000 per call) and persist them with TTLs."""
+    # Structure IDs are rejected by /universe/names/; they can only come from the structures table.
+    unresolvable = {i for i in ids if i > INT32_MAX}
+    id_list = sorted(ids - unresolvable)
+    resolved = {}
+
+    for i in range(0, len(id_list), ESI_NAMES_BATCH):
+        for entry in _post_names(id_list[i:i + ESI_NAMES_BATCH]):
+            resolved[entry["id"]] = (entry["name"], entry["category"])
+
+    found = {}
+    with get_public_session() as db:
+        for entity_id in ids:
+            name, category = resolved.get(entity_id, (None, "structure" if entity_id in unresolvable else "unknown"))
+            ttl = NAME_TTLS.get(category, DEFAULT_NAME_TTL) if name else UNRESOLVED_TTL
+            db.merge(EntityName(entity_id=entity_id, name=name, category=category, expires_at=now + ttl))
+            found[entity_id] = (name, now + ttl)
+        db.commit()
+
+    logger.info(f"[Names] Resolved {len(resolved)}/{len(ids)} IDs through ESI")
+    return found
+
+def _post_names(batch: list) -> list:
+    """POST one batch to /universe/names/, splitting it when ESI rejects an invalid ID with 404."""
+    if not batch:
+        return []
+    try:
+        response = requests.post(
+            f"{ESI_BASE}/universe/names/",
+            headers=HEADERS,
+            params={"datasource": "tranquility"},
+            json=batch,
+        )
+    except requests.RequestException as e:
+        logger.error(f"[Names] ESI ID resolution failed for {len(batch)} IDs: {e}")
+        return []
+
+    if response.status_code == 404 and len(batch) > 1:
+        mid = len(batch) // 2
+        return _post_names(batch[:mid]) + _post_names(batch[mid:])
+    if not response.ok:
+        if len(batch) > 1 or response.status_code != 404:
+            logger.warning(f"[Names] /universe/names/ returned {response.status_code} for {len(batch)} IDs")
+        return []
+    return response.json()
@@ -1,6 +1,7 @@
 # util/sde.py
 
 import os
+import time
 import yaml
 import logging
 from db.database import get_public_session
@@ -12,8 +13,17 @@ logger = logging.getLogger(__name__)
 BASE_SDE_PATH = os.getenv("SDE_PATH", "_sde")
 TYPES_YAML_PATH = os.path.join(BASE_SDE_PATH, "fsd", "types.yaml")
 UNIVERSE_PATH = os.path.join(BASE_SDE_PATH, "fsd", "universe")
+NAMES_YAML_PATH = os.path.join(BASE_SDE_PATH, "bsd", "invNames.yaml")
+SDE_VERSION_FILE = os.path.join(BASE_SDE_PATH, "sde.version")
 
 _type_id_to_name = None
+_sde_version = (None, None)     # (file mtime, version string)
+
+# Use faster CLoader if available
+try:
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import SafeLoader as Loader
 
 # ──────── Loader ──────────────────────────────────────────────────────────────
 
@@ -41,6 +51,28 @@ def load_sde_data():
         logger.error("Unexpected types.yaml structure!")
         _type_id_to_name = {}
 
+# ──────── Version Stamp ───────────────────────────────────────────────────────
+
+def write_sde_version(version: str = None):
+    """Record which SDE build is installed (defaults to the current UTC timestamp)."""
+    version = version or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    os.makedirs(BASE_SDE_PATH, exist_ok=True)
+    with open(SDE_VERSION_FILE, "w", encoding="utf-8") as f:
+        f.write(version)
+    logger.info(f"SDE version stamped as {version}")
+
+def sde_version() -> str:
+    """Return the installed SDE version stamp, re-reading it only when the stamp file changes."""
+    global _sde_version
+    try:
+        mtime = os.stat(SDE_VERSION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return "unversioned"
+    if _sde_version[0] != mtime:
+        with open(SDE_VERSION_FILE, "r", encoding="utf-8") as f:
+            _sde_version = (mtime, f.read().strip())
+    return _sde_version[1]
+
 # ──────── Public API ──────────────────────────────────────────────────────────
 
 def name_from_id(type_id: int) -> str:
@@ -50,6 +82,57 @@ def name_from_id(type_id: int) -> str:
 
     return _type_id_to_name.get(type_id, f"Unknown TypeID {type_id}")
 
+def iter_item_names():
+    """Yield (item_id, name) for every entry of invNames.yaml (regions, systems, stations, celestials...)."""
+    if not os.path.exists(NAMES_YAML_PATH):
+        logger.error(f"invNames.yaml not found at {NAMES_YAML_PATH}")
+        return
+
+    with open(NAMES_YAML_PATH, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=Loader) or []
+
+    for row in data:
+        yield int(row["itemID"]), row["itemName"]
+
+def iter_type_names():
+    """Yield (type_id, name) for every type in types.yaml."""
+    if _type_id_to_name is None:
+        load_sde_data()
+    yield from _type_id_to_name.items()
+
+def iter_solar_systems():
+    """
+    Yield one dict per solar system in the SDE universe folder:
+    { system_id, name, constellation_id, region_id, security, center, stargates }
+    Region and constellation IDs are taken from the parent folders when the system file lacks them.
+    """
+    folder_ids = {}
+
+    for root, dirs, files in os.walk(UNIVERSE_PATH):
+        dirs.sort()
+        for marker, key in (("region.staticdata.yaml", "regionID"), ("constellation.staticdata.yaml", "constellationID")):
+            if marker in files:
+                with open(os.path.join(root, marker), "r", encoding="utf-8") as f:
+                    folder_ids[root] = yaml.load(f, Loader=Loader).get(key)
+
+        for file in files:
+            if file not in ("solarsystem.staticdata.yaml", "solarsystem.yaml"):
+                continue
+            with open(os.path.join(root, file), "r", encoding="utf-8") as f:
+                data = yaml.load(f, Loader=Loader)
+
+            constellation_dir = os.path.dirname(root)
+            system_id = int(data["solarSystemID"])
+            yield {
+                "system_id": system_id,
+                "name": data.get("solarSystemName", os.path.basename(root)),
+                "constellation_id": data.get("constellationID", folder_ids.get(constellation_dir)),
+                "region_id": data.get("regionID", folder_ids.get(os.path.dirname(constellation_dir))),
+                "security": float(data.get("security", 0.0)),
+                "center": data.get("center", [0.0, 0.0, 0.0]),
+                "stargates": data.get("stargates", {}),
+            }
+
 def build_universe_table():
     """Builds database tables from static data export for fast reference."""
     session = get_public_session()
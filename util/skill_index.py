@@ -0,0 +1,279 @@
+# util/skill_index.py
+
+import os
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import yaml
+
+from db.database import get_private_engine
+from db.toon_map import get_all_owners
+from util.sde import BASE_SDE_PATH, Loader
+
+logger = logging.getLogger(__name__)
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+TYPE_DOGMA_YAML_PATH = os.path.join(BASE_SDE_PATH, "fsd", "typeDogma.yaml")
+BLUEPRINTS_YAML_PATH = os.path.join(BASE_SDE_PATH, "fsd", "blueprints.yaml")
+SKILL_INDEX_PATH = os.path.join(BASE_SDE_PATH, "skill_index.npz")
+
+# (required skill attribute, its level attribute), primary to sextiary
+REQUIRED_SKILL_ATTRIBUTES = ((182, 277), (183, 278), (184, 279), (1285, 1286), (1289, 1287), (1290, 1288))
+
+# Blueprint activities whose skills gate building the product, in order of preference.
+BUILD_ACTIVITIES = ("manufacturing", "reaction")
+
+ACTIVITIES = ("use", "build")
+
+_index = (None, None)       # (file mtime, loaded index)
+_index_lock = threading.Lock()
+_matrices = {}              # owner_id -> (signature, character_ids, base levels, queue arrays)
+_matrix_lock = threading.Lock()
+
+# ──────── Build (SDE compile time) ────────────────────────────────────────────
+
+def _direct_requirements(type_dogma: dict) -> dict:
+    """Return { type_id: { skill_id: level } } from the required-skill dogma attributes."""
+    direct = {}
+    for type_id, dogma in type_dogma.items():
+        values = {a["attributeID"]: a["value"] for a in (dogma or {}).get("dogmaAttributes", [])}
+        reqs = {}
+        for skill_attr, level_attr in REQUIRED_SKILL_ATTRIBUTES:
+            skill_id = values.get(skill_attr)
+            if skill_id:
+                reqs[int(skill_id)] = max(reqs.get(int(skill_id), 0), int(values.get(level_attr, 1)))
+        if reqs:
+            direct[int(type_id)] = reqs
+    return direct
+
+def _flatten(reqs: dict, direct: dict, memo: dict, visiting: set = frozenset()) -> dict:
+    """Add every skill's own prerequisites (recursively) to a requirement set, keeping the highest level."""
+    flat = dict(reqs)
+    for skill_id in reqs:
+        if skill_id in visiting:
+            continue        # guard against cycles in bad data
+        if skill_id not in memo:
+            memo[skill_id] = _flatten(direct.get(skill_id, {}), direct, memo, visiting | {skill_id})
+        for prereq, level in memo[skill_id].items():
+            flat[prereq] = max(flat.get(prereq, 0), level)
+    return flat
+
+def _build_requirements(blueprints: dict, direct: dict, memo: dict) -> dict:
+    """Return { product type_id: flattened skills to build it } from the blueprints' activity skills."""
+    build = {}
+    for blueprint in blueprints.values():
+        activities = (blueprint or {}).get("activities", {})
+        for name in BUILD_ACTIVITIES:
+            activity = activities.get(name)
+            if not activity or not activity.get("products"):
+                continue
+            reqs = {}
+            for skill in activity.get("skills", []):
+                reqs[int(skill["typeID"])] = max(reqs.get(int(skill["typeID"]), 0), int(skill["level"]))
+            for product in activity["products"]:
+                build.setdefault(int(product["typeID"]), _flatten(reqs, direct, memo))
+            break
+    return build
+
+def _csr(requirements: dict, prefix: str) -> dict:
+    """Pack { type_id: { skill_id: level } } into sorted CSR arrays (types, offsets, skills, levels)."""
+    types = sorted(t for t, reqs in requirements.items() if reqs)
+    offsets = np.zeros(len(types) + 1, dtype=np.int64)
+    skills, levels = [], []
+    for i, type_id in enumerate(types):
+        for skill_id, level in sorted(requirements[type_id].items()):
+            skills.append(skill_id)
+            levels.append(level)
+        offsets[i + 1] = len(skills)
+    return {
+        f"{prefix}_types": np.array(types, dtype=np.int32),
+        f"{prefix}_offsets": offsets,
+        f"{prefix}_skills": np.array(skills, dtype=np.int32),
+        f"{prefix}_levels": np.array(levels, dtype=np.int8),
+    }
+
+def build_skill_index(path: str = SKILL_INDEX_PATH) -> int:
+    """
+    Flatten the SDE's required-skill attributes (with recursive prerequisites) and blueprint
+    skills into CSR arrays per type, saved as one .npz. Returns the number of types indexed.
+    """
+    for required in (TYPE_DOGMA_YAML_PATH, BLUEPRINTS_YAML_PATH):
+        if not os.path.exists(required):
+            logger.error(f"[SkillIndex] {required} not found, skill index not built")
+            return 0
+
+    with open(TYPE_DOGMA_YAML_PATH, "r", encoding="utf-8") as f:
+        direct = _direct_requirements(yaml.load(f, Loader=Loader) or {})
+    with open(BLUEPRINTS_YAML_PATH, "r", encoding="utf-8") as f:
+        blueprints = yaml.load(f, Loader=Loader) or {}
+
+    memo = {}
+    use = {type_id: _flatten(reqs, direct, memo) for type_id, reqs in direct.items()}
+    build = _build_requirements(blueprints, direct, memo)
+
+    arrays = {**_csr(use, "use"), **_csr(build, "build")}
+    arrays["skill_ids"] = np.unique(np.concatenate([arrays["use_skills"], arrays["build_skills"]])).astype(np.int32)
+
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    logger.info(f"[SkillIndex] Indexed {len(use)} usable and {len(build)} buildable types over "
+                f"{len(arrays['skill_ids'])} skills")
+    return len(use) + len(build)
+
+# ──────── Loading ─────────────────────────────────────────────────────────────
+
+def load_skill_index(path: str = SKILL_INDEX_PATH) -> dict:
+    """Return the skill index arrays, re-reading the file only when it changes."""
+    global _index
+    mtime = os.stat(path).st_mtime_ns
+    with _index_lock:
+        if _index[0] != mtime:
+            with np.load(path) as data:
+                index = {name: data[name] for name in data.files}
+            # requirement skills as columns of the character matrix
+            for activity in ACTIVITIES:
+                index[f"{activity}_columns"] = np.searchsorted(index["skill_ids"], index[f"{activity}_skills"])
+            _index = (mtime, index)
+        return _index[1]
+
+def type_requirements(type_id: int, activity: str = "use") -> dict:
+    """Return the flattened { skill_id: level } needed to use (or build) a type; {} if none."""
+    _check(activity)
+    index = load_skill_index()
+    types = index[f"{activity}_types"]
+    i = np.searchsorted(types, type_id)
+    if i >= len(types) or types[i] != type_id:
+        return {}
+    lo, hi = index[f"{activity}_offsets"][i:i + 2]
+    return dict(zip(index[f"{activity}_skills"][lo:hi].tolist(), index[f"{activity}_levels"][lo:hi].tolist()))
+
+# ──────── Character Skills ────────────────────────────────────────────────────
+
+def _owner_matrix(owner_id: int, skill_ids: np.ndarray) -> tuple:
+    """
+    Return (character_ids, base levels [characters × skills], queue arrays) for one owner, cached
+    until its skill_raw/skill_queue tables change.
+    """
+    conn = get_private_engine(owner_id).raw_connection()
+    try:
+        cursor = conn.cursor()
+        signature = (
+            cursor.execute("SELECT count(*), total(active_level), total(skillpoints_in_skill) FROM skill_raw").fetchone(),
+            cursor.execute("SELECT count(*), max(finish_date), total(finish_level) FROM skill_queue").fetchone(),
+            len(skill_ids),
+        )
+        with _matrix_lock:
+            cached = _matrices.get(owner_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1:]
+
+        raw = cursor.execute("SELECT character_id, skill_id, active_level FROM skill_raw").fetchall()
+        queue = cursor.execute(
+            "SELECT character_id, skill_id, finish_level, finish_date FROM skill_queue WHERE finish_date IS NOT NULL"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    raw = np.array(raw, dtype=np.int64).reshape(-1, 3)
+    character_ids = np.unique(raw[:, 0])
+    levels = np.zeros((len(character_ids), len(skill_ids)), dtype=np.int8)
+    rows = np.searchsorted(character_ids, raw[:, 0])
+    cols = np.searchsorted(skill_ids, raw[:, 1]).clip(max=max(len(skill_ids) - 1, 0))
+    known = skill_ids[cols] == raw[:, 1] if len(skill_ids) else np.zeros(len(raw), dtype=bool)
+    levels[rows[known], cols[known]] = raw[known, 2]
+
+    # queued levels, applied when projecting to a point in time
+    known_chars = set(character_ids.tolist())
+    queued = [(c, s, lvl, datetime.fromisoformat(str(d)).timestamp()) for c, s, lvl, d in queue if c in known_chars]
+    q = np.array(queued, dtype=np.float64).reshape(-1, 4)
+    q_cols = np.searchsorted(skill_ids, q[:, 1].astype(np.int64)).clip(max=max(len(skill_ids) - 1, 0))
+    q_known = skill_ids[q_cols] == q[:, 1] if len(skill_ids) else np.zeros(len(q), dtype=bool)
+    queue_arrays = (
+        np.searchsorted(character_ids, q[q_known, 0].astype(np.int64)),
+        q_cols[q_known],
+        q[q_known, 2].astype(np.int8),
+        q[q_known, 3],
+    )
+
+    entry = (signature, character_ids, levels, queue_arrays)
+    with _matrix_lock:
+        _matrices[owner_id] = entry
+    return entry[1:]
+
+def character_skill_matrix(owner_ids: list = None, at: datetime = None) -> tuple:
+    """
+    Return (character_ids, levels) for every character of the given owners (default all): one row
+    per character, one int8 column per skill in the index, with queued levels finished by `at`
+    (default now, UTC) already applied.
+    """
+    skill_ids = load_skill_index()["skill_ids"]
+    owners = owner_ids if owner_ids is not None else list(get_all_owners())
+    at_ts = (at or datetime.utcnow()).timestamp()
+
+    all_ids, blocks = [], []
+    for owner_id in owners:
+        character_ids, base, (rows, cols, lvls, finish) = _owner_matrix(owner_id, skill_ids)
+        levels = base.copy()
+        done = finish <= at_ts
+        np.maximum.at(levels, (rows[done], cols[done]), lvls[done])
+        all_ids.append(character_ids)
+        blocks.append(levels)
+
+    if not blocks:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, len(skill_ids)), dtype=np.int8)
+    return np.concatenate(all_ids), np.vstack(blocks)
+
+# ──────── Queries ─────────────────────────────────────────────────────────────
+
+def _check(activity: str):
+    if activity not in ACTIVITIES:
+        raise ValueError(f"Unknown activity '{activity}', expected one of {list(ACTIVITIES)}")
+
+def can_matrix(type_ids, activity: str = "use", owner_ids: list = None, at: datetime = None) -> tuple:
+    """
+    Return (character_ids, type_ids, bool matrix [characters × types]) of who meets the skill
+    requirements of each type, computed for all characters at once.
+    """
+    _check(activity)
+    index = load_skill_index()
+    character_ids, levels = character_skill_matrix(owner_ids, at)
+    type_ids = np.asarray(type_ids, dtype=np.int64)
+
+    types = index[f"{activity}_types"]
+    offsets = index[f"{activity}_offsets"]
+    pos = np.searchsorted(types, type_ids).clip(max=max(len(types) - 1, 0))
+    indexed = (types[pos] == type_ids) if len(types) else np.zeros(len(type_ids), dtype=bool)
+
+    result = np.ones((len(character_ids), len(type_ids)), dtype=bool)     # no requirements: anyone
+    if indexed.any():
+        # gather each indexed type's requirement entries, then AND them per type
+        starts = offsets[pos[indexed]]
+        lengths = offsets[pos[indexed] + 1] - starts
+        seg = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        entries = np.arange(lengths.sum()) + np.repeat(starts - seg, lengths)
+        met = levels[:, index[f"{activity}_columns"][entries]] >= index[f"{activity}_levels"][entries]
+        result[:, indexed] = np.logical_and.reduceat(met, seg, axis=1)
+    return character_ids, type_ids, result
+
+def characters_that_can(type_id: int, activity: str = "use", owner_ids: list = None, at: datetime = None) -> list:
+    """Return the IDs of the characters that can use (or build) a type."""
+    character_ids, _, ok = can_matrix([type_id], activity, owner_ids, at)
+    return character_ids[ok[:, 0]].tolist()
+
+def types_character_can(character_id: int, activity: str = "use", owner_ids: list = None, at: datetime = None) -> list:
+    """Return every indexed type a character can use (or build)."""
+    _check(activity)
+    index = load_skill_index()
+    character_ids, levels = character_skill_matrix(owner_ids, at)
+    matches = np.flatnonzero(character_ids == character_id)
+    if not len(matches):
+        raise ValueError(f"Unknown character {character_id}")
+    row = matches[0]
+
+    met = levels[row, index[f"{activity}_columns"]] >= index[f"{activity}_levels"]
+    ok = np.logical_and.reduceat(met, index[f"{activity}_offsets"][:-1]) if len(met) else np.zeros(0, dtype=bool)
+    return index[f"{activity}_types"][ok].tolist()
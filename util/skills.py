@@ -1,8 +1,9 @@
 # util/skills.py
 
 import logging
+from datetime import datetime
 from db.database import get_private_session
-from db.models import IngameSkillState
+from db.models import IngameSkillState, SkillQueueEntry
 
 logger = logging.getLogger(__name__)
 
@@ -12,23 +13,79 @@ ADV_MASS_PRODUCTION_ID = 24625
 LAB_OPERATION_ID = 3406
 ADV_LAB_OPERATION_ID = 24624
 
-def get_industry_queues(owner_id: int, character_id: int) -> dict:
+# ──────── Training State ──────────────────────────────────────────────────────
+
+def project_levels(levels: dict, queue: list, at: datetime) -> dict:
+    """
+    Apply every queued level finished by `at` to { skill_id: level }. Queue entries are
+    (skill_id, finish_level, start_date, finish_date); entries of a paused queue have no finish date.
+    """
+    projected = dict(levels)
+    for skill_id, finish_level, _, finish_date in queue:
+        if finish_date is not None and finish_date <= at:
+            projected[skill_id] = max(projected.get(skill_id, 0), finish_level)
+    return projected
+
+def training_now(queue: list, at: datetime):
+    """Return the queue entry in training at `at` (the first one not yet finished), or None if paused or empty."""
+    for entry in sorted(queue, key=lambda e: e[3] or datetime.max):
+        _, _, start_date, finish_date = entry
+        if finish_date is None or start_date is None:
+            return None
+        if finish_date > at:
+            return entry if start_date <= at else None
+    return None
+
+def derive_skill_state(levels: dict, queue: list, at: datetime) -> dict:
+    """Return { skill_id: (current_level, is_in_training, training_finishes_at) } as of `at`."""
+    projected = project_levels(levels, queue, at)
+    training = training_now(queue, at)
+    state = {sid: (level, False, None) for sid, level in projected.items()}
+    if training is not None:
+        skill_id, _, _, finish_date = training
+        state[skill_id] = (projected.get(skill_id, 0), True, finish_date)
+    return state
+
+def project_skill_levels(owner_id: int, character_id: int, at: datetime = None, db=None) -> dict:
     """
-    Return the max manufacturing and science job slots based on accurate in-game usable skill levels.
+    Return { skill_id: level } a character will have at `at` (default now, UTC), from the stored
+    levels plus the queue entries finished by then, so no refetch is needed between refreshes.
+    """
+    if db is None:
+        with get_private_session(owner_id) as db:
+            return project_skill_levels(owner_id, character_id, at, db)
+
+    levels = {
+        s.skill_id: s.current_level
+        for s in db.query(IngameSkillState).filter_by(character_id=character_id)
+    }
+    queue = [
+        (q.skill_id, q.finish_level, q.start_date, q.finish_date)
+        for q in db.query(SkillQueueEntry).filter_by(character_id=character_id)
+    ]
+    return project_levels(levels, queue, at or datetime.utcnow())
+
+# ──────── Industry ────────────────────────────────────────────────────────────
+
+def get_industry_queues(owner_id: int, character_id: int, db=None) -> dict:
+    """
+    Return the max manufacturing and science job slots based on accurate in-game usable skill levels,
+    projected to now through the skill queue.
+    Pass an open session as `db` to reuse it instead of opening a new one.
     Format: { "manuf": int, "science": int }
     """
-    with get_private_session(owner_id) as db:
-        skills = {
-            s.skill_id: s.current_level
-            for s in db.query(IngameSkillState).filter_by(character_id=character_id)
-        }
+    if db is None:
+        with get_private_session(owner_id) as db:
+            return get_industry_queues(owner_id, character_id, db)
+
+    skills = project_skill_levels(owner_id, character_id, db=db)
 
-        logger.debug(f"[Skills] Usable skills for {character_id}: {skills}")
+    logger.debug(f"[Skills] Usable skills for {character_id}: {skills}")
 
-        manuf_slots = 1 + skills.get(MASS_PRODUCTION_ID, 0) + skills.get(ADV_MASS_PRODUCTION_ID, 0)
-        science_slots = 1 + skills.get(LAB_OPERATION_ID, 0) + skills.get(ADV_LAB_OPERATION_ID, 0)
+    manuf_slots = 1 + skills.get(MASS_PRODUCTION_ID, 0) + skills.get(ADV_MASS_PRODUCTION_ID, 0)
+    science_slots = 1 + skills.get(LAB_OPERATION_ID, 0) + skills.get(ADV_LAB_OPERATION_ID, 0)
 
-        return {
-            "manuf": manuf_slots,
-            "science": science_slots,
-        }
+    return {
+        "manuf": manuf_slots,
+        "science": science_slots,
+    }
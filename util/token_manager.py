@@ -0,0 +1,197 @@
+# util/token_manager.py
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from util.auth import SSOManager, TokenDBManager
+from db.database import get_private_session
+from db.models import Token
+
+# ──────── Globals ─────────────────────────────────────────────────────────────
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REFRESH_MARGIN = int(os.getenv("EVE_TOKEN_REFRESH_MARGIN", "300"))       # seconds before expiry
+TOKEN_REFRESH_INTERVAL = int(os.getenv("EVE_TOKEN_REFRESH_INTERVAL", "60"))    # background sweep period
+TOKEN_REFRESH_WORKERS = int(os.getenv("EVE_TOKEN_REFRESH_WORKERS", "8"))
+TOKEN_BACKGROUND_REFRESH = os.getenv("EVE_TOKEN_BACKGROUND_REFRESH", "1") == "1"
+
+# A token this close to expiry is refreshed before being handed out rather than in the background.
+MIN_TOKEN_LIFETIME = 30
+
+# ──────── Token Manager ───────────────────────────────────────────────────────
+
+class TokenManager:
+    """
+    Process-wide token cache. Tokens are loaded from an owner's private DB once, kept in memory,
+    and refreshed shortly before they expire by a background thread. Concurrent refreshes of the
+    same character share one SSO call, and each refresh is written back to the DB once.
+    """
+
+    def __init__(self, margin: int = TOKEN_REFRESH_MARGIN, interval: int = TOKEN_REFRESH_INTERVAL):
+        self.margin = margin
+        self.interval = interval
+        self._tokens = {}           # owner_id -> { character_id: token dict }
+        self._token_dbs = {}        # owner_id -> TokenDBManager
+        self._inflight = {}         # character_id -> Future of the running refresh
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=TOKEN_REFRESH_WORKERS, thread_name_prefix="token-refresh")
+        self._worker = None
+        self._stop = threading.Event()
+
+    # ─── Loading ───
+
+    def _load(self, owner_id: int) -> dict:
+        with self._lock:
+            tokens = self._tokens.get(owner_id)
+        if tokens is not None:
+            return tokens
+
+        with get_private_session(owner_id) as session:
+            rows = {
+                t.character_id: {
+                    "access_token": t.access_token,
+                    "refresh_token": t.refresh_token,
+                    "expires_at": t.expires_at,
+                    "scopes": t.scopes,
+                }
+                for t in session.query(Token)
+            }
+        with self._lock:
+            return self._tokens.setdefault(owner_id, rows)
+
+    def _token_db(self, owner_id: int) -> TokenDBManager:
+        with self._lock:
+            token_db = self._token_dbs.get(owner_id)
+            if token_db is None:
+                token_db = self._token_dbs[owner_id] = TokenDBManager(owner_id)
+            return token_db
+
+    # ─── Refreshing ───
+
+    def refresh(self, owner_id: int, character_id: int, within: float = None) -> dict:
+        """
+        Refresh one character's token. Callers arriving while a refresh is running wait for its result;
+        with `within`, a token that another caller already renewed past that horizon is returned as is.
+        """
+        with self._lock:
+            current = self._tokens[owner_id][character_id]
+            if within is not None and (current["expires_at"] or 0) > time.time() + within:
+                return current
+            future = self._inflight.get(character_id)
+            leader = future is None
+            if leader:
+                future = self._inflight[character_id] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            refreshed = SSOManager.refresh_token(current["refresh_token"])
+            token = {
+                "access_token": refreshed["access_token"],
+                "refresh_token": refreshed.get("refresh_token", current["refresh_token"]),
+                "expires_at": refreshed.get("expires_at", time.time() + refreshed.get("expires_in", 1200)),
+                "scopes": refreshed.get("scope", current["scopes"]),
+            }
+            self._token_db(owner_id).save_tokens(character_id=character_id, **token)
+            with self._lock:
+                self._tokens[owner_id][character_id] = token
+            logger.info(f"[TokenManager] Refreshed token for {character_id}")
+            future.set_result(token)
+            return token
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(character_id, None)
+
+    def _refresh_many(self, owner_id: int, character_ids: list, within: float) -> dict:
+        """Refresh several characters in parallel; returns { character_id: token } for the ones that succeeded."""
+        futures = {cid: self._pool.submit(self.refresh, owner_id, cid, within) for cid in character_ids}
+        results = {}
+        for cid, future in futures.items():
+            try:
+                results[cid] = future.result()
+            except Exception as e:
+                logger.error(f"[TokenManager] Failed to refresh token for {cid}: {e}")
+        return results
+
+    def _expiring(self, owner_id: int, within: float) -> list:
+        deadline = time.time() + within
+        with self._lock:
+            return [cid for cid, t in self._tokens.get(owner_id, {}).items() if (t["expires_at"] or 0) < deadline]
+
+    # ─── Public API ───
+
+    def tokens(self, owner_id: int) -> dict:
+        """
+        Return { character_id: token dict } for an owner. Only tokens about to expire are refreshed
+        inline (in parallel); the rest are kept fresh by the background thread.
+        """
+        self._load(owner_id)
+        self.start()
+
+        urgent = self._expiring(owner_id, MIN_TOKEN_LIFETIME)
+        failed = set(urgent) - set(self._refresh_many(owner_id, urgent, MIN_TOKEN_LIFETIME)) if urgent else set()
+
+        with self._lock:
+            return {cid: dict(t) for cid, t in self._tokens[owner_id].items() if cid not in failed}
+
+    def access_token(self, owner_id: int, character_id: int) -> str:
+        """
+        Return one character's access token, refreshing it first (shared with concurrent callers)
+        if it is about to expire. For callers that send requests long after listing the tokens.
+        """
+        self._load(owner_id)
+        with self._lock:
+            token = self._tokens[owner_id][character_id]
+        if (token["expires_at"] or 0) < time.time() + MIN_TOKEN_LIFETIME:
+            token = self.refresh(owner_id, character_id, MIN_TOKEN_LIFETIME)
+        return token["access_token"]
+
+    def upsert(self, owner_id: int, character_id: int, access_token: str, refresh_token: str,
+               expires_at: float, scopes: str) -> None:
+        """Store a token from the SSO callback in memory and in the owner's DB."""
+        token = {"access_token": access_token, "refresh_token": refresh_token, "expires_at": expires_at, "scopes": scopes}
+        self._token_db(owner_id).save_tokens(character_id=character_id, **token)
+        with self._lock:
+            if owner_id in self._tokens:
+                self._tokens[owner_id][character_id] = token
+
+    def invalidate(self, owner_id: int = None) -> None:
+        """Forget cached tokens (for one owner or all) so they are reloaded from the DB."""
+        with self._lock:
+            if owner_id is None:
+                self._tokens.clear()
+            else:
+                self._tokens.pop(owner_id, None)
+
+    # ─── Background Refresh ───
+
+    def start(self) -> None:
+        """Start the background refresher (once per process)."""
+        if not TOKEN_BACKGROUND_REFRESH:
+            return
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name="token-manager", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                owners = list(self._tokens)
+            for owner_id in owners:
+                expiring = self._expiring(owner_id, self.margin)
+                if expiring:
+                    self._refresh_many(owner_id, expiring, self.margin)
+
+token_manager = TokenManager()
@@ -5,6 +5,8 @@ from webUI.auth_routes import auth_bp
 from webUI.dashboard_routes import dashboard_bp
 from webUI.update_personal_routes import update_personal_bp
 from webUI.update_public_routes import update_public_bp
+from webUI.route_routes import route_bp
+from webUI.lookup_routes import lookup_bp
 
 def create_app():
     app = Flask(__name__)
@@ -15,5 +17,7 @@ def create_app():
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(update_personal_bp)
     app.register_blueprint(update_public_bp)
+    app.register_blueprint(route_bp)
+    app.register_blueprint(lookup_bp)
 
     return app
@@ -9,6 +9,7 @@ from requests_oauthlib import OAuth2Session
 import jwt
 
 from util.auth import CredentialManager, TokenDBManager, SSOManager
+from util.token_manager import token_manager
 from db.toon_map import insert_user_toon, get_owner_for_character
 from db.db_initializer import initialize_private_database
 
@@ -71,13 +72,13 @@ def callback():
             if not db_path:
                 return "Error: Could not find private DB for owner.", 500
 
-            token_db = TokenDBManager(owner_id)  # <--- Token manager for the new character
-            token_db.save_tokens(
+            token_manager.upsert(
+                owner_id,
                 char_id,
-                token['access_token'],
-                token['refresh_token'],
-                token['expires_at'],
-                token.get('scope', '')
+                access_token=token['access_token'],
+                refresh_token=token['refresh_token'],
+                expires_at=token['expires_at'],
+                scopes=token.get('scope', '')
             )
 
             insert_user_toon(character_id=char_id, owner_id=owner_id)
@@ -99,7 +100,8 @@ def callback():
                 TokenDBManager(owner_id)  # Create new private DB
                 logger.info(f"[Auth] Created private DB for owner {owner_id}")
 
-            TokenDBManager(owner_id).save_tokens(
+            token_manager.upsert(
+                owner_id,
                 char_id,
                 access_token=token["access_token"],
                 refresh_token=token["refresh_token"],
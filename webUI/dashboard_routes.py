@@ -6,11 +6,31 @@ from db.database import get_private_session
 from db.models import IndustryJob, WalletTransaction, Asset, Bookmark
 from db.toon_map import get_linked_toons
 from util.sde import name_from_id
+from util.names import resolve_ids_to_names
 from analysis.job_slots import analyze_slots
 
 logger = logging.getLogger(__name__)
 dashboard_bp = Blueprint('dashboard', __name__)
 
+# Wallet journal context types whose IDs name an entity
+NAMED_CONTEXT_TYPES = {
+    "character_id", "corporation_id", "alliance_id", "station_id",
+    "structure_id", "system_id", "type_id", "eve_system",
+}
+
+def collect_entity_ids(linked_toons, industry_jobs, wallet_txns, assets) -> set:
+    """Gather every character, corporation, station and structure ID shown on the dashboard."""
+    ids = set(linked_toons)
+    for job in industry_jobs:
+        ids.update((job.installer_id, job.facility_id, job.output_location_id))
+    for txn in wallet_txns:
+        if txn.context_id and str(txn.context_id_type) in NAMED_CONTEXT_TYPES:
+            ids.add(txn.context_id)
+    for asset in assets:
+        ids.add(asset.location_id)
+    ids.discard(None)
+    return ids
+
 @dashboard_bp.route("/")
 def home():
     """Landing page (dashboard if logged in, basic page if not)."""
@@ -20,6 +40,7 @@ def home():
     bookmarks = []
     linked_toons = []
     slot_status = []
+    entity_names = {}
     char_id = None
     owner_id = None
     logged_in = False
@@ -43,6 +64,9 @@ def home():
 
         db.close()
 
+        # One batched lookup for every ID on the page (zero network calls when the cache is warm)
+        entity_names = resolve_ids_to_names(collect_entity_ids(linked_toons, industry_jobs, wallet_txns, assets))
+
         # Run slot analyzer and capture output
         slot_status = analyze_slots(owner_id)
 
@@ -60,5 +84,6 @@ def home():
         owner_id=owner_id,
         linked_toons=linked_toons,
         slot_status=slot_status,
-        name_from_id=name_from_id
+        name_from_id=name_from_id,
+        entity_name=lambda entity_id: entity_names.get(entity_id, entity_id),
     )
@@ -0,0 +1,82 @@
+# webUI/lookup_routes.py
+
+from flask import Blueprint, jsonify, request, session
+import logging
+
+from util.names import prefix_search, resolve_names
+from analysis.valuation import value_assets
+from db.search_index import search
+from util.skill_index import characters_that_can, types_character_can, type_requirements
+
+# ─────── Setup ────────────────────────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+lookup_bp = Blueprint('lookup', __name__, url_prefix="/lookup")
+
+MAX_SUGGESTIONS = 50
+
+# ─────── Routes ───────────────────────────────────────────────────────────────
+
+@lookup_bp.route("/autocomplete")
+def autocomplete():
+    """Return names starting with ?q=, optionally limited to ?category= (systems, stations, inventory_types...)."""
+    prefix = request.args.get("q", "").strip()
+    category = request.args.get("category") or None
+    limit = min(request.args.get("limit", 20, type=int), MAX_SUGGESTIONS)
+    return jsonify(prefix_search(prefix, category, limit))
+
+@lookup_bp.route("/ids", methods=["POST"])
+def names_to_ids():
+    """Resolve a JSON list of names to IDs, locally where possible."""
+    names = request.get_json(silent=True)
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        return jsonify({"error": "Expected a JSON list of names"}), 400
+    return jsonify(resolve_names(names, request.args.get("category") or None))
+
+@lookup_bp.route("/valuation")
+def valuation():
+    """ISK value of the owner's assets (?source=sell|buy|average|adjusted, ?regions=1,2, ?location=, ?top=)."""
+    owner_id = session.get("owner_id")
+    if not owner_id:
+        return "Unauthorized", 401
+    regions = [int(r) for r in request.args.get("regions", "").split(",") if r] or None
+    try:
+        result = value_assets(owner_id, request.args.get("source", "sell"), regions, request.args.get("location", type=int))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    top = request.args.get("top", 100, type=int)
+    return jsonify({**result, **{k: result[k][:top] for k in ("by_character", "by_location", "by_type")}})
+
+@lookup_bp.route("/search")
+def search_owner():
+    """Search the owner's assets, bookmarks and structures (?q=, ?kinds=asset,bookmark, ?limit=, ?fuzzy=0)."""
+    owner_id = session.get("owner_id")
+    if not owner_id:
+        return "Unauthorized", 401
+    kinds = [k for k in request.args.get("kinds", "").split(",") if k] or None
+    try:
+        results = search(owner_id, request.args.get("q", ""), kinds, request.args.get("limit", 50, type=int),
+                         fuzzy=request.args.get("fuzzy") != "0")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(results)
+
+@lookup_bp.route("/can")
+def can():
+    """Skill checks for the owner's characters: ?type= (who can use/build it) or ?character= (what it can), ?activity=use|build."""
+    owner_id = session.get("owner_id")
+    if not owner_id:
+        return "Unauthorized", 401
+    activity = request.args.get("activity", "use")
+    type_id = request.args.get("type", type=int)
+    character_id = request.args.get("character", type=int)
+    try:
+        if type_id is not None:
+            return jsonify({"type_id": type_id, "requirements": type_requirements(type_id, activity),
+                            "characters": characters_that_can(type_id, activity, [owner_id])})
+        if character_id is not None:
+            return jsonify({"character_id": character_id, "type_ids": types_character_can(character_id, activity, [owner_id])})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({"error": "Skill index not built, update the SDE first"}), 503
+    return jsonify({"error": "Expected ?type= or ?character="}), 400
@@ -0,0 +1,122 @@
+# webUI/route_routes.py
+
+from flask import Blueprint, jsonify, request
+import logging
+
+from route.jump_range import systems_within_jumps, range_cache_info
+from route.route import getRoute
+from route.route_cache import route_cache
+from route.spatial_index import JUMP_DRIVE_BAND, cyno_options, plan_jump_route
+
+# ─────── Setup ────────────────────────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+route_bp = Blueprint('route', __name__, url_prefix="/route")
+
+MAX_RANGE_JUMPS = 50
+MAX_JUMP_RANGE_LY = 12.0
+
+# ─────── Helpers ──────────────────────────────────────────────────────────────
+
+def parse_security_arg(raw: str):
+    """Parse a ?security= argument: a band name or a 'min,max' pair."""
+    if raw is None:
+        return "any"
+    if "," in raw:
+        lo, hi = raw.split(",", 1)
+        return float(lo), float(hi)
+    return raw
+
+# ─────── Routes ───────────────────────────────────────────────────────────────
+
+@route_bp.route("/range/<int:origin>")
+def jump_range(origin):
+    """Return systems within ?jumps=N of origin, grouped by distance and filtered by ?security=."""
+    try:
+        jumps = int(request.args.get("jumps", 5))
+        security = parse_security_arg(request.args.get("security"))
+        if not 0 <= jumps <= MAX_RANGE_JUMPS:
+            raise ValueError(f"jumps must be between 0 and {MAX_RANGE_JUMPS}")
+        rings = systems_within_jumps(origin, jumps, security)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    except FileNotFoundError as e:
+        logger.error(f"[RouteAPI] {e}")
+        return jsonify({"error": "System graph not available"}), 503
+
+    return jsonify({
+        "origin": origin,
+        "jumps": jumps,
+        "security": security,
+        "systems": rings,
+    })
+
+@route_bp.route("/cyno/<int:origin>")
+def cyno_range(origin):
+    """Return every cyno option within ?ly= light years of origin, optionally limited to ?region=."""
+    try:
+        radius = float(request.args.get("ly", 7.0))
+        region_id = request.args.get("region", type=int)
+        security = parse_security_arg(request.args.get("security")) if "security" in request.args else JUMP_DRIVE_BAND
+        if not 0 < radius <= MAX_JUMP_RANGE_LY:
+            raise ValueError(f"ly must be between 0 and {MAX_JUMP_RANGE_LY}")
+        options = cyno_options(origin, radius, region_id, security)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    except FileNotFoundError as e:
+        logger.error(f"[RouteAPI] {e}")
+        return jsonify({"error": "Spatial index not available"}), 503
+
+    return jsonify({
+        "origin": origin,
+        "ly": radius,
+        "systems": [{"system_id": sys_id, "ly": round(ly, 3)} for sys_id, ly in options],
+    })
+
+@route_bp.route("/jump/<int:origin>/<int:destination>")
+def jump_route(origin, destination):
+    """Plan a jump-drive route with ?ly= range and ?reduction= fatigue reduction (0.9 for jump freighters)."""
+    try:
+        radius = float(request.args.get("ly", 7.0))
+        reduction = float(request.args.get("reduction", 0.0))
+        security = parse_security_arg(request.args.get("security")) if "security" in request.args else JUMP_DRIVE_BAND
+        if not 0 < radius <= MAX_JUMP_RANGE_LY:
+            raise ValueError(f"ly must be between 0 and {MAX_JUMP_RANGE_LY}")
+        if not 0.0 <= reduction < 1.0:
+            raise ValueError("reduction must be between 0 and 1")
+        plan = plan_jump_route(origin, destination, radius, reduction, security)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    except FileNotFoundError as e:
+        logger.error(f"[RouteAPI] {e}")
+        return jsonify({"error": "Spatial index not available"}), 503
+
+    if plan is None:
+        return jsonify({"error": f"No jump route from {origin} to {destination} within {radius} ly"}), 404
+    return jsonify({"origin": origin, "destination": destination, **plan})
+
+@route_bp.route("/path/<origin>/<destination>")
+def stargate_route(origin, destination):
+    """Return the gate route (with jump bridges) between two systems, by name or ID. ?flag= and ?avoid=a,b."""
+    flag = request.args.get("flag", "shortest")
+    avoid = [a for a in request.args.get("avoid", "").split(",") if a]
+    try:
+        route = getRoute(origin, destination, flag, avoid)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if route is None:
+        return jsonify({"error": f"No route from {origin} to {destination}"}), 404
+    return jsonify({"origin": origin, "destination": destination, "flag": flag, "jumps": len(route) - 1, "route": route})
+
+@route_bp.route("/cache_stats")
+def cache_stats():
+    """Return hit-rate metrics for the route and jump-range caches."""
+    return jsonify({
+        "route": route_cache.hit_rate(),
+        "range": range_cache_info()._asdict(),
+    })
@@ -1,6 +1,6 @@
 # webUI/update_personal_routes.py
 
-from flask import Blueprint, redirect, url_for, session
+from flask import Blueprint, redirect, url_for, session, request, jsonify
 import logging
 
 # Private fetchers
@@ -9,6 +9,8 @@ from fetchers.private.personal_bookmarks import update_personal_bookmarks
 from fetchers.private.personal_industry_jobs import fetch_all_industry
 from fetchers.private.personal_skills import fetch_all_skills
 from fetchers.private.personal_wallet import fetch_all_wallets
+from fetchers.private.personal_transactions import fetch_all_transactions
+from fetchers.private.refresh_owner import refresh_owner
 
 # ──────── Setup ──────────────────────────────────────────────────────────────
 logger = logging.getLogger(__name__)
@@ -48,6 +50,16 @@ def update_wallet():
     logger.info(f"[UpdatePersonal] Fetched wallet transactions for owner {owner_id}")
     return redirect(url_for("dashboard.home"))
 
+@update_personal_bp.route("/transactions")
+def update_transactions():
+    """Trigger a refresh of market transactions and FIFO profit matching."""
+    owner_id = session.get("owner_id")
+    if not owner_id:
+        return "Unauthorized", 401
+    fetch_all_transactions(owner_id)
+    logger.info(f"[UpdatePersonal] Fetched market transactions for owner {owner_id}")
+    return redirect(url_for("dashboard.home"))
+
 @update_personal_bp.route("/skills")
 def update_skills():
     """Trigger a refresh of personal skills."""
@@ -67,3 +79,19 @@ def update_bookmarks():
     update_personal_bookmarks(owner_id)
     logger.info(f"[UpdatePersonal] Fetched bookmarks for owner {owner_id}")
     return redirect(url_for("dashboard.home"))
+
+@update_personal_bp.route("/all")
+def update_all():
+    """Refresh every endpoint for every character concurrently (?endpoints=assets,wallet to limit, ?report=1 for JSON timings)."""
+    owner_id = session.get("owner_id")
+    if not owner_id:
+        return "Unauthorized", 401
+    endpoints = [e for e in request.args.get("endpoints", "").split(",") if e] or None
+    try:
+        report = refresh_owner(owner_id, endpoints)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logger.info(f"[UpdatePersonal] Refreshed owner {owner_id} in {report['elapsed_s']}s ({report['failed']} failed)")
+    if request.args.get("report") == "1":
+        return jsonify(report)
+    return redirect(url_for("dashboard.home"))
@@ -1,13 +1,15 @@
 # webUI/update_public_routes.py
 
-from flask import Blueprint, redirect, url_for
+from flask import Blueprint, redirect, url_for, request, jsonify
 import logging
 
 # Public fetchers
 from fetchers.public.market_structure import discover_structures
 from fetchers.public.market_contracts import fetch_all_public_contracts as fetch_all_contracts
 from fetchers.public.market_station import fetch_all_market_data
+from fetchers.public.market_prices import update_market_prices
 from fetchers.public.static_data import update_sde
+from db.crawl_checkpoints import crawl_status
 
 # ─────── Setup ────────────────────────────────────────────────────────────────
 logger = logging.getLogger(__name__)
@@ -24,21 +26,33 @@ def update_public_structures():
 
 @update_public_bp.route("/contracts")
 def update_public_contracts():
-    """Update public contracts across all regions."""
-    fetch_all_contracts()
+    """Update public contracts across all regions (?fresh=1 restarts instead of resuming)."""
+    fetch_all_contracts(fresh=request.args.get("fresh") == "1")
     logger.info("[UpdatePublic] Public contracts fetch complete.")
     return redirect(url_for("dashboard.home"))
 
 @update_public_bp.route("/market")
 def update_public_market():
-    """Update public market orders across all regions."""
-    fetch_all_market_data()
+    """Update public market orders across all regions (?fresh=1 restarts instead of resuming)."""
+    fetch_all_market_data(fresh=request.args.get("fresh") == "1")
     logger.info("[UpdatePublic] Public market data fetch complete.")
     return redirect(url_for("dashboard.home"))
 
+@update_public_bp.route("/prices")
+def update_public_prices():
+    """Update CCP's average/adjusted price list (ESI /markets/prices/)."""
+    count = update_market_prices()
+    logger.info(f"[UpdatePublic] Stored {count} market prices.")
+    return redirect(url_for("dashboard.home"))
+
 @update_public_bp.route("/sde")
 def update_public_sde():
     """Download and update the Static Data Export (SDE)."""
     update_sde()
     logger.info("[UpdatePublic] Static Data Export update complete.")
     return redirect(url_for("dashboard.home"))
+
+@update_public_bp.route("/status")
+def update_public_status():
+    """Progress of the latest market/contracts crawl (?crawl= to pick one)."""
+    return jsonify(crawl_status(request.args.get("crawl") or None))